@@ -0,0 +1,112 @@
+"""
+Read-only analytics snapshot. Dashboard, report and export queries run inside
+analytics_reads(), and AnalyticsRouter (hr_app.routers) sends their reads to the 'analytics'
+database: a copy of the main database made with SQLite's online backup by
+`manage.py refresh_analytics_snapshot`. Their long aggregate scans then never hold up
+payroll writes on the main file. Results are as old as the snapshot.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_analytics_reads = ContextVar('analytics_reads', default=False)
+# (checked at, fresh) for snapshot_is_fresh()
+_freshness = [0.0, False]
+
+
+@contextmanager
+def analytics_reads():
+    """Reads in this block may come from the snapshot; also usable as a view decorator"""
+    token = _analytics_reads.set(True)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
+
+
+def iterate_analytics(iterable):
+    """Iterate under analytics_reads(), for streaming responses that query after the view returned.
+
+    Only producing each item runs inside the block, not the caller's code in between.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with analytics_reads():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+
+
+def in_analytics_reads():
+    return _analytics_reads.get()
+
+
+def snapshot_is_fresh():
+    """Whether the snapshot is usable, see check_snapshot(); checked at most once a second"""
+    now = time.monotonic()
+    if now - _freshness[0] > 1:
+        _freshness[:] = [now, check_snapshot()]
+    return _freshness[1]
+
+
+def latest_migration(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT COUNT(*), MAX(id) FROM django_migrations')
+        return cursor.fetchone()
+
+
+def check_snapshot():
+    """Whether the snapshot exists, is younger than ANALYTICS_SNAPSHOT_MAX_AGE and has the main database's schema"""
+    from .routers import ANALYTICS_DATABASE
+
+    try:
+        age = time.time() - os.stat(settings.ANALYTICS_SNAPSHOT_PATH).st_mtime
+    except OSError:
+        return False
+    if age >= settings.ANALYTICS_SNAPSHOT_MAX_AGE:
+        return False
+    # A snapshot taken before a migrate lacks its tables and columns until the next refresh
+    try:
+        return latest_migration(ANALYTICS_DATABASE) == latest_migration(DEFAULT_DB_ALIAS)
+    except DatabaseError:
+        return False
+
+
+def refresh_snapshot():
+    """Copy the main database to ANALYTICS_SNAPSHOT_PATH and swap the copy in; returns seconds taken.
+
+    The backup runs in one step, inside a single read transaction: in WAL mode writers carry
+    on meanwhile and the copy is consistent as of its start. It is written next to the
+    snapshot and renamed over it, so connections still reading the old file are unaffected.
+    """
+    started = time.monotonic()
+    target = Path(settings.ANALYTICS_SNAPSHOT_PATH)
+    temporary = target.with_name(target.name + '.tmp')
+    for leftover in (temporary, temporary.with_name(temporary.name + '-journal')):
+        leftover.unlink(missing_ok=True)
+
+    source = sqlite3.connect(settings.DATABASES['default']['NAME'], timeout=30)
+    try:
+        destination = sqlite3.connect(temporary)
+        try:
+            source.backup(destination)
+            # Readers open the snapshot read-only and immutable, which needs no -wal/-shm files
+            destination.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            destination.close()
+    finally:
+        source.close()
+    os.replace(temporary, target)
+    _freshness[0] = 0.0
+    return time.monotonic() - started
@@ -0,0 +1,134 @@
+"""
+Cold-data archival. `manage.py archive_history` moves closed attendance and payroll rows
+older than ARCHIVE_AFTER_DAYS into the archive database (see hr_app.routers), so the hot
+database holds a fixed window of history. Lists (ArchiveReadMixin with KeysetPagination),
+their exports and reports read the archive as well when their date range reaches below the model's
+ArchiveWatermark.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+from .models import Attendance, Payroll, ArchivedAttendance, ArchivedPayroll, ArchiveWatermark, ModelVersion
+from .routers import ARCHIVE_DATABASE
+
+ARCHIVES = {
+    Attendance: {
+        'archive': ArchivedAttendance,
+        'closed': lambda cutoff: Q(date__lt=cutoff),
+    },
+    Payroll: {
+        'archive': ArchivedPayroll,
+        # Pending and processed payrolls stay hot however old they are. So do payrolls with a
+        # pay slip: the pay slip list and PDF downloads only read the main database
+        'closed': lambda cutoff: Q(status='paid', period_end__lt=cutoff, pay_slip__isnull=True),
+    },
+}
+
+
+def get_archive_cutoff(today=None):
+    """First day of the month ARCHIVE_AFTER_DAYS ago, so months are archived whole"""
+    day = (today or timezone.localdate()) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    return day.replace(day=1)
+
+
+def raise_watermark(model, before):
+    watermark, created = ArchiveWatermark.objects.get_or_create(
+        label=model._meta.label_lower, defaults={'before': before}
+    )
+    if not created and watermark.before < before:
+        watermark.before = before
+        watermark.save(update_fields=['before'])
+
+
+def delete_rows(model, ids):
+    """Delete rows by primary key with plain SQL.
+
+    The rows live on in the archive, so no post_delete signals (which would record tombstones
+    and bump cache versions per row) and no ORM cascade collection: nothing references an
+    archived row, since payrolls with a pay slip are never closed.
+    """
+    if not ids:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} '
+            f'IN ({", ".join(["%s"] * len(ids))})',
+            list(ids),
+        )
+
+
+def archive_rows(model, cutoff, batch_size=None):
+    """Move the closed rows of `model` dated before `cutoff` to the archive; returns how many moved.
+
+    Each batch is copied in one archive transaction and then deleted in one hot transaction.
+    A crash in between leaves the batch in both databases; the next run copies it again (the
+    primary keys match, so nothing is duplicated) and deletes it. Rows that stop qualifying
+    in between (e.g. a payroll that just got its pay slip) stay hot and their copies are dropped.
+    """
+    config = ARCHIVES[model]
+    archived_model = config['archive']
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    queryset = model.objects.filter(config['closed'](cutoff)).order_by('pk')
+    moved = 0
+    while True:
+        batch = list(queryset[:batch_size])
+        if not batch:
+            break
+        if not moved:
+            # Readers must look in the archive before the first row gets there
+            raise_watermark(model, cutoff)
+        ids = [row.pk for row in batch]
+
+        with transaction.atomic(using=ARCHIVE_DATABASE):
+            archived_model.objects.bulk_create([archived_model.copy(row) for row in batch], ignore_conflicts=True)
+        with transaction.atomic():
+            # Checked again under the write lock, which holds off changes until the delete commits
+            closed = set(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+            delete_rows(model, closed)
+        reopened = [pk for pk in ids if pk not in closed]
+        if reopened:
+            archived_model.objects.filter(pk__in=reopened).delete()
+        moved += len(closed)
+
+    if moved:
+        # The rows are still listed, but cached responses may have been built without them
+        ModelVersion.bump(model)
+    return moved
+
+
+def get_archive_queryset(model):
+    return ARCHIVES[model]['archive'].objects.all()
+
+
+def select_related_paths(tree, prefix=''):
+    for name, subtree in tree.items():
+        if subtree:
+            yield from select_related_paths(subtree, f'{prefix}{name}__')
+        else:
+            yield prefix + name
+
+
+def restore_rows(queryset, archived):
+    """Archived rows as instances of the queryset's model, with its select/prefetch lookups applied"""
+    rows = [row.restore() for row in archived]
+    lookups = list(queryset._prefetch_related_lookups)
+    if isinstance(queryset.query.select_related, dict):
+        lookups += select_related_paths(queryset.query.select_related)
+    if rows and lookups:
+        prefetch_related_objects(rows, *lookups)
+    return rows
+
+
+def iterate_restored(queryset, archived, chunk_size):
+    """restore_rows() over `archived` a chunk at a time, for exports"""
+    chunk = []
+    for row in archived.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from restore_rows(queryset, chunk)
+            chunk = []
+    yield from restore_rows(queryset, chunk)
@@ -0,0 +1,160 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from django.conf import settings
+from django.contrib.auth.hashers import verify_password
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import User, Employee
+from .revocation import SESSION_ID_CLAIM, is_revoked
+
+
+def get_auth_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+# What get_cached_user() keeps of a user; the password hash and personal details stay in the
+# database and are loaded on first access
+CACHED_USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'role', 'department',
+    'updated_at',
+)
+
+
+def version_key(user_id):
+    return f'hr:auth-user-version:{user_id}'
+
+
+def get_version(cache, user_id):
+    """The user's current cache version, a random token so an evicted one is never reissued"""
+    token = uuid4().hex
+    if cache.add(version_key(user_id), token, None):
+        return token
+    return cache.get(version_key(user_id)) or token
+
+
+def invalidate_cached_user(user_id):
+    """Retire the user's cache entry once the current transaction commits.
+
+    Replacing the version after the commit means a request that loaded the old row can only
+    have stored it under the old version, which nothing reads any more.
+    """
+    def bump():
+        get_auth_cache().set(version_key(user_id), uuid4().hex, None)
+
+    transaction.on_commit(bump)
+
+
+def get_cached_user(user_id):
+    """The user with their employee profile attached, from cache or one query; None if there is no such user"""
+    cache = get_auth_cache()
+    key = f'hr:auth-user:{user_id}:{get_version(cache, user_id)}'
+    entry = cache.get(key)
+    if entry is None:
+        row = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list(*CACHED_USER_FIELDS, 'password', 'employee_profile__id')
+            .first()
+        )
+        if row is None:
+            return None
+        *values, password, employee_id = row
+        # A digest is enough for the revoked-token check; the hash itself is never cached
+        entry = (tuple(values), get_md5_hash_password(password), employee_id)
+        cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+
+    values, password_digest, employee_id = entry
+    # Only these fields and the profile's id are cached; any other field is loaded on first access.
+    # from_db() takes a partial row in the model's field order
+    fields = dict(zip(CACHED_USER_FIELDS, values))
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    user = User.from_db(router.db_for_read(User), names, [fields[name] for name in names])
+    user._password_digest = password_digest
+    employee = None
+    if employee_id is not None:
+        employee = Employee.from_db(user._state.db, ['id', 'user_id'], [employee_id, user.pk])
+        employee._state.fields_cache['user'] = user
+    user._state.fields_cache['employee_profile'] = employee
+    return user
+
+
+class LoginBusy(APIException):
+    status_code = 503
+    default_detail = _('Too many sign-ins in progress, please retry in a moment.')
+    default_code = 'login_busy'
+
+
+_hash_executor = None
+_hash_slots = None
+_hash_lock = threading.Lock()
+
+
+def get_hash_executor():
+    # Created lazily so each gunicorn worker gets its own threads after forking
+    global _hash_executor, _hash_slots
+    with _hash_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(max_workers=settings.LOGIN_HASH_WORKERS, thread_name_prefix='login-hash')
+            _hash_slots = threading.BoundedSemaphore(settings.LOGIN_HASH_WORKERS + settings.LOGIN_HASH_QUEUE)
+    return _hash_executor
+
+
+def verify_password_bounded(password, encoded):
+    """verify_password() on a small thread pool, so a login burst uses at most LOGIN_HASH_WORKERS cores.
+
+    PBKDF2 releases the GIL, so other requests keep running meanwhile. When LOGIN_HASH_QUEUE
+    logins are already waiting, fail fast with a 503 instead of piling up more.
+    """
+    executor = get_hash_executor()
+    if not _hash_slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        # An unknown user passes encoded='', which still runs one hash to hide the difference
+        return executor.submit(verify_password, password, encoded).result()
+    finally:
+        _hash_slots.release()
+
+
+def start_session(user):
+    """Refresh token for a new login; it and every token minted from it carry the session id"""
+    refresh = RefreshToken.for_user(user)
+    # Not the jti: rotation revokes the old refresh token's jti but keeps the session
+    refresh[SESSION_ID_CLAIM] = uuid4().hex
+    return refresh
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads the user and their employee id from cache instead of the database,
+    and rejects revoked tokens"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user._password_digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,114 @@
+import base64
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+
+
+def get_executor():
+    # Created lazily so each gunicorn worker gets its own threads after forking
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    return _executor
+
+
+def build_subrequest(request, method, path, body):
+    """A WSGIRequest for one batch entry, reusing the outer request's environ and authentication"""
+    url = urlsplit(path)
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items() if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH')}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    })
+    subrequest = WSGIRequest(environ)
+    # DRF skips its authenticators for forced credentials, so the JWT is only decoded once
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def encode_response(response):
+    entry = {'status': response.status_code, 'headers': dict(response.items())}
+    if hasattr(response, 'data'):
+        # Left unrendered; the batch response is rendered once as a whole
+        entry['body'] = response.data
+    else:
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        entry['body'] = base64.b64encode(content).decode()
+        entry['encoding'] = 'base64'
+    return entry
+
+
+def error_entry(status_code, message):
+    return {'status': status_code, 'headers': {}, 'body': {'error': message}}
+
+
+def dispatch(request, item):
+    """Run one batch entry through the URL resolver and return its encoded response"""
+    path = urlsplit(item['path']).path
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return error_entry(404, f'No endpoint matches {path}')
+
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None or not issubclass(view_class, APIView) or match.url_name == 'batch':
+        return error_entry(400, f'{path} cannot be called from a batch')
+
+    subrequest = build_subrequest(request, item['method'], item['path'], item.get('body'))
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Batch entry %s %s failed', item['method'], path)
+        return error_entry(500, 'Internal server error')
+    return encode_response(response)
+
+
+def _dispatch_in_thread(request, item):
+    # Mirrors request_started/request_finished so pool threads don't leak connections
+    close_old_connections()
+    try:
+        return dispatch(request, item)
+    finally:
+        close_old_connections()
+
+
+def run_batch(request, items):
+    """Dispatch entries in order; runs of consecutive reads go to the thread pool together"""
+    results = []
+    index = 0
+    while index < len(items):
+        end = index
+        while end < len(items) and items[end]['method'] in SAFE_METHODS:
+            end += 1
+
+        reads = items[index:end]
+        # Threads use their own connections, which can't see an open transaction's writes
+        if len(reads) > 1 and settings.BATCH_MAX_WORKERS > 1 and not connection.in_atomic_block:
+            results.extend(get_executor().map(lambda item: _dispatch_in_thread(request, item), reads))
+        elif reads:
+            results.extend(dispatch(request, item) for item in reads)
+        else:
+            # Writes run alone, in order, so later entries see their effects
+            results.append(dispatch(request, items[index]))
+            end = index + 1
+        index = end
+    return results
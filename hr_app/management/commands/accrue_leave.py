@@ -0,0 +1,50 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from hr_app.models import Change, Employee, LeaveBalance, ModelVersion
+
+class Command(BaseCommand):
+    help = 'Post the monthly leave accrual to every employee\'s LeaveBalance (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Accrue for the month containing this date (YYYY-MM-DD), defaults to today')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError('--date must be in YYYY-MM-DD format')
+        period = as_of.replace(day=1)
+
+        now = timezone.now()
+        with transaction.atomic():
+            # Make sure every employee has a ledger row for the year before posting
+            employee_ids = Employee.objects.values_list('id', flat=True)
+            LeaveBalance.objects.bulk_create(
+                [
+                    LeaveBalance(employee_id=employee_id, leave_type=leave_type, year=period.year)
+                    for employee_id in employee_ids.iterator()
+                    for leave_type in LeaveBalance.ACCRUAL_RATES
+                ],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+
+            # One UPDATE per leave type; rows already accrued for this month are skipped
+            for leave_type, rate in LeaveBalance.ACCRUAL_RATES.items():
+                updated = LeaveBalance.objects.filter(
+                    leave_type=leave_type, year=period.year
+                ).filter(
+                    Q(last_accrual_date__isnull=True) | Q(last_accrual_date__lt=period)
+                ).update(
+                    accrued=F('accrued') + rate, last_accrual_date=period, updated_at=now
+                )
+                self.stdout.write(f'{leave_type}: accrued {rate} days for {updated} employees')
+
+            # Bulk writes send no post_save, so invalidate cached balance responses and log the change here
+            ModelVersion.bump(LeaveBalance)
+            Change.record(LeaveBalance, LeaveBalance.objects.filter(updated_at=now).only('employee'))
+
+        self.stdout.write(self.style.SUCCESS(f'Leave accrual for {period:%Y-%m} complete'))
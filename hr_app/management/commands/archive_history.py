@@ -0,0 +1,40 @@
+import os
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from hr_app.analytics import refresh_snapshot
+from hr_app.archive import ARCHIVES, archive_rows, get_archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Move attendance and paid payrolls older than ARCHIVE_AFTER_DAYS (from the start of that month) '
+            'to the archive database. Run it periodically, e.g. monthly from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive rows dated before this day (YYYY-MM-DD) instead')
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Shrink the database file afterwards; without it the freed pages are '
+                                 'reused by new rows, so the file stops growing but does not shrink')
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = date.fromisoformat(options['before']) if options['before'] else get_archive_cutoff()
+        except ValueError:
+            raise CommandError('--before must be a date (YYYY-MM-DD)')
+
+        total = 0
+        for model in ARCHIVES:
+            moved = archive_rows(model, cutoff, options['batch_size'])
+            total += moved
+            self.stdout.write(f'{model._meta.verbose_name_plural}: moved {moved} rows dated before {cutoff}')
+
+        if options['vacuum']:
+            with connections['default'].cursor() as cursor:
+                cursor.execute('VACUUM')
+        if total and os.path.exists(settings.ANALYTICS_SNAPSHOT_PATH):
+            # The snapshot still has the moved rows, which reports would now count twice
+            refresh_snapshot()
+            self.stdout.write('Analytics snapshot refreshed')
+        self.stdout.write(self.style.SUCCESS('Archive up to date'))
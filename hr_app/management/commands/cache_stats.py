@@ -0,0 +1,25 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = 'Show size, hit rate and evictions of a shared (hr_app.shared_cache) cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument('--reset', action='store_true', help='Zero the hit/miss/set/eviction counters afterwards')
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not hasattr(cache, 'stats'):
+            raise CommandError(f"Cache '{options['alias']}' does not keep statistics")
+        stats = cache.stats()
+        hit_rate = 'n/a' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(f"entries:   {stats['entries']}")
+        self.stdout.write(f"size:      {stats['bytes'] / 1024 / 1024:.1f} of {stats['max_bytes'] / 1024 / 1024:.1f} MB")
+        self.stdout.write(f"hits:      {stats['hits']} ({hit_rate})")
+        self.stdout.write(f"misses:    {stats['misses']}")
+        self.stdout.write(f"sets:      {stats['sets']}")
+        self.stdout.write(f"evictions: {stats['evictions']}")
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
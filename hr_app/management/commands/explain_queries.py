@@ -0,0 +1,104 @@
+import json
+import re
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# EXPLAIN QUERY PLAN details that read a whole table (or a whole index) rather than searching it
+SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX (\w+))?')
+WHERE_RE = re.compile(r'\bWHERE\b')
+LIMIT_RE = re.compile(r'\bLIMIT\b')
+
+
+class Command(BaseCommand):
+    help = ('Replay queries recorded by the query middleware (QUERY_LOG_PATH) through '
+            'EXPLAIN QUERY PLAN and flag full table scans and temporary sorts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='Recorded queries (defaults to QUERY_LOG_PATH)')
+        parser.add_argument('--min-rows', type=int, default=0,
+                            help='Ignore scans of tables with fewer rows than this')
+        parser.add_argument('--all', action='store_true', help='Also list query shapes with no findings')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.QUERY_LOG_PATH
+        if not path:
+            raise CommandError('Pass a query log or set QUERY_LOG_PATH and record some requests first')
+
+        shapes = self.load(path)
+        aliases = {shape['alias'] for shape in shapes.values()}
+        unknown = aliases - set(connections)
+        if unknown:
+            raise CommandError(f"The log has queries for databases not configured here: {', '.join(sorted(unknown))}")
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('explain_queries reads SQLite query plans')
+        # Each shape is explained on the database it ran against
+        tables = {alias: set(connections[alias].introspection.table_names()) for alias in aliases}
+        row_counts = {}
+        flagged = 0
+        # Most executed shapes first: a scan there costs the most
+        for key, shape in sorted(shapes.items(), key=lambda item: -item[1]['count']):
+            connection = connections[shape['alias']]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + shape['sql'], shape['params'])
+                    plan = [row[3] for row in cursor.fetchall()]
+            except DatabaseError as error:
+                self.stdout.write(self.style.WARNING(f'Could not explain {key[:120]}: {error}'))
+                continue
+
+            # Scanning is the only option without a WHERE clause (plain list pages, counts), and
+            # an index scan under a LIMIT stops after a page of rows in index order
+            filtered = WHERE_RE.search(shape['sql'])
+            limited = LIMIT_RE.search(shape['sql'])
+            findings = []
+            for detail in plan:
+                match = SCAN_RE.match(detail)
+                if match and match.group(1) in tables[shape['alias']] and filtered and not (match.group(3) and limited):
+                    table = match.group(1)
+                    if (shape['alias'], table) not in row_counts:
+                        with connection.cursor() as cursor:
+                            cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                            row_counts[shape['alias'], table] = cursor.fetchone()[0]
+                    rows = row_counts[shape['alias'], table]
+                    if rows < options['min_rows']:
+                        continue
+                    kind = 'full index scan' if match.group(3) else 'full table scan'
+                    findings.append(f'{kind} of {table} ({rows} rows): {detail}')
+                elif detail.startswith('USE TEMP B-TREE'):
+                    findings.append(f'sort without an index: {detail}')
+
+            if findings:
+                flagged += 1
+            if findings or options['all']:
+                self.stdout.write(f"\n{shape['count']}x  {key if len(key) <= 300 else key[:300] + '...'}")
+                database = '' if shape['alias'] == DEFAULT_DB_ALIAS else f" on the {shape['alias']} database"
+                self.stdout.write(f"    from {', '.join(sorted(shape['requests'])[:5])}{database}")
+                for line in findings:
+                    self.stdout.write(self.style.WARNING(f'    {line}'))
+                if not findings:
+                    for detail in plan:
+                        self.stdout.write(f'    {detail}')
+
+        summary = f'\n{flagged} of {len(shapes)} query shapes scan a table or sort without an index'
+        self.stdout.write(self.style.WARNING(summary) if flagged else self.style.SUCCESS(summary))
+
+    def load(self, path):
+        """Recorded lines grouped by query fingerprint, with a sample statement for each"""
+        shapes = defaultdict(lambda: {'count': 0, 'requests': set()})
+        try:
+            with open(path) as log:
+                for line in log:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    shape = shapes[entry['fingerprint']]
+                    shape['count'] += entry['count']
+                    shape['requests'].add(entry['request'])
+                    shape.setdefault('sql', entry['sql'])
+                    shape.setdefault('params', entry['params'])
+                    shape.setdefault('alias', entry.get('alias', DEFAULT_DB_ALIAS))
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        return shapes
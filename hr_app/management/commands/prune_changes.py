@@ -0,0 +1,15 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hr_app.models import Change
+
+class Command(BaseCommand):
+    help = 'Delete change-feed log entries older than CHANGES_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.CHANGES_RETENTION_DAYS)
+        # The newest entry always stays, so ids (the feed's cursors) never start over
+        newest = Change.objects.order_by('-id').values_list('id', flat=True).first()
+        deleted, _ = Change.objects.filter(changed_at__lt=cutoff).exclude(id=newest).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change-log entries older than {cutoff:%Y-%m-%d}'))
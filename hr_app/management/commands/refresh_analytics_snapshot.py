@@ -0,0 +1,20 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from hr_app.analytics import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = ('Copy the main database to the read-only analytics snapshot (ANALYTICS_SNAPSHOT_PATH) '
+            'with an online backup. Run it from cron every few minutes, or keep it running with --interval.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, help='Keep running and refresh every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            seconds = refresh_snapshot()
+            self.stdout.write(f'Snapshot written to {settings.ANALYTICS_SNAPSHOT_PATH} in {seconds:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,99 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Collapse the parts of a statement that vary between otherwise identical queries
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+# Statements worth an EXPLAIN QUERY PLAN when recording (see the explain_queries command)
+EXPLAINABLE_RE = re.compile(r'\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+READ_RE = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return LITERAL_RE.sub('?', sql)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        # First statement, parameters and database alias seen for each fingerprint, kept when recording
+        self.samples = {} if settings.QUERY_LOG_PATH else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            if self.samples is not None and not many and key not in self.samples and EXPLAINABLE_RE.match(sql):
+                if not READ_RE.match(sql):
+                    # Writes carry what is being stored (password hashes, emails); the plan
+                    # only needs as many placeholders
+                    params = [None] * len(params or ())
+                self.samples[key] = (sql, params, context['connection'].alias)
+
+
+def record_queries(request, stats):
+    """Append this request's query shapes to QUERY_LOG_PATH, one JSON line each"""
+    lines = [
+        json.dumps({
+            'request': f'{request.method} {request.path}',
+            'fingerprint': key,
+            'count': stats.fingerprints[key],
+            'sql': sql,
+            'params': list(params or ()),
+            'alias': alias,
+        }, default=str)
+        for key, (sql, params, alias) in stats.samples.items()
+    ]
+    if lines:
+        with open(settings.QUERY_LOG_PATH, 'a') as log:
+            log.write('\n'.join(lines) + '\n')
+
+
+class QueryInstrumentationMiddleware:
+    """Counts queries and DB time per request and warns when one query shape repeats (N+1)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        threshold = settings.QUERY_REPEAT_WARNING_THRESHOLD
+        repeated = [(sql, count) for sql, count in stats.fingerprints.most_common() if count > threshold]
+        for sql, count in repeated:
+            logger.warning('%s %s ran the same query %d times: %s', request.method, request.path, count, sql)
+        if stats.samples:
+            record_queries(request, stats)
+
+        if self.should_expose(request):
+            response['X-DB-Query-Count'] = str(stats.count)
+            response['X-DB-Time-Ms'] = f'{stats.duration * 1000:.1f}'
+            response['X-DB-Repeated-Queries'] = str(sum(count for _, count in repeated))
+        return response
+
+    def should_expose(self, request):
+        if settings.DEBUG:
+            return True
+        # DRF copies the JWT-authenticated user back onto the Django request
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'admin'))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:17
+
+from datetime import date
+from decimal import Decimal
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import ExtractYear
+
+# LeaveBalance.ACCRUAL_RATES when this migration was written
+ACCRUAL_RATES = {
+    'annual': Decimal('1.75'),
+    'sick': Decimal('1.00'),
+}
+
+
+def backfill_balances(apps, schema_editor):
+    """Open this year's ledger as if accrue_leave had run every month, and post approved leave to it"""
+    Employee = apps.get_model('hr_app', 'Employee')
+    LeaveRequest = apps.get_model('hr_app', 'LeaveRequest')
+    LeaveBalance = apps.get_model('hr_app', 'LeaveBalance')
+
+    today = date.today()
+    period = today.replace(day=1)
+    balances = {}
+    for employee_id, hire_date in Employee.objects.values_list('id', 'hire_date').iterator():
+        # Accrual starts in the month of hire
+        first_month = hire_date.month if hire_date.year == today.year else 1
+        months = max(today.month - first_month + 1, 0) if hire_date <= today else 0
+        for leave_type, rate in ACCRUAL_RATES.items():
+            balances[employee_id, leave_type, today.year] = LeaveBalance(
+                employee_id=employee_id, leave_type=leave_type, year=today.year,
+                accrued=rate * months, last_accrual_date=period if months else None,
+            )
+
+    # Leave approved before the ledger existed, charged to the year it starts in
+    charges = LeaveRequest.objects.filter(status='approved', leave_type__in=ACCRUAL_RATES).annotate(
+        year=ExtractYear('start_date')
+    ).values('employee_id', 'leave_type', 'year').annotate(days=Sum('days_requested'))
+    for charge in charges:
+        key = (charge['employee_id'], charge['leave_type'], charge['year'])
+        if key not in balances:
+            balances[key] = LeaveBalance(employee_id=key[0], leave_type=key[1], year=key[2])
+        balances[key].used = charge['days']
+
+    LeaveBalance.objects.bulk_create(balances.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0005_leave_calendar_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('annual', 'Annual Leave'), ('sick', 'Sick Leave')], max_length=50)),
+                ('year', models.PositiveIntegerField()),
+                ('accrued', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('used', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('last_accrual_date', models.DateField(blank=True, null=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='hr_app.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'leave_type', 'year')},
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:20
+
+import django.db.models.deletion
+import hr_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0006_leavebalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='hr_app.expense'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='receipt_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='receipt',
+            field=models.FileField(blank=True, storage=hr_app.storage.ContentAddressedStorage(), upload_to=hr_app.storage.receipt_upload_to),
+        ),
+    ]
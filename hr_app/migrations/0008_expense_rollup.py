@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Expense = apps.get_model('hr_app', 'Expense')
+    Employee = apps.get_model('hr_app', 'Employee')
+    ExpenseRollup = apps.get_model('hr_app', 'ExpenseRollup')
+
+    Expense.objects.update(department=Subquery(
+        Employee.objects.filter(pk=OuterRef('employee_id')).values('user__department')[:1]
+    ))
+    buckets = Expense.objects.annotate(month=TruncMonth('submitted_date')).values(
+        'department', 'category', 'month', 'status'
+    ).annotate(count=Count('id'), total=Sum('amount'))
+    ExpenseRollup.objects.bulk_create([ExpenseRollup(**bucket) for bucket in buckets], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0007_expense_receipt_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='department',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(max_length=50)),
+                ('month', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('month', 'department', 'category', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
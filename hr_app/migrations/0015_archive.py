@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveWatermark',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('before', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('employee_id', models.PositiveBigIntegerField(db_index=True)),
+                ('date', models.DateField()),
+                ('check_in', models.TimeField(blank=True, null=True)),
+                ('check_out', models.TimeField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'id'], name='archived_attendance_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayroll',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('employee_id', models.PositiveBigIntegerField(db_index=True)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('base_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('overtime_rate', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('bonus', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('allowances', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('gross_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_deductions', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('net_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=20)),
+                ('processed_date', models.DateTimeField(blank=True, null=True)),
+                ('payment_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period_start', 'id'], name='archived_payroll_start_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPaySlip',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('pdf_file', models.CharField(blank=True, max_length=100, null=True)),
+                ('generated_date', models.DateTimeField()),
+                ('is_downloaded', models.BooleanField(default=False)),
+                ('download_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('payroll', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pay_slip', to='hr_app.archivedpayroll')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
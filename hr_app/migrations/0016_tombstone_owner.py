@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0015_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='owner',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0016_tombstone_owner'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ArchivedPaySlip',
+        ),
+    ]
@@ -0,0 +1,510 @@
+import hashlib
+import heapq
+from datetime import date
+from functools import cmp_to_key
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, models, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import mixins, serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .analytics import iterate_analytics
+
+_lookup_cache = {}
+
+
+def _relation_path(model, source_attrs):
+    """Follow a dotted serializer source through model relations.
+
+    Returns (lookup_parts, related_model, many) for the relation part of the path;
+    attributes after the last relation (fields, methods like get_full_name) are ignored.
+    """
+    parts, many = [], False
+    for attr in source_attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        parts.append(attr)
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return parts, model, many
+
+
+def _collect(serializer, model, prefix, in_prefetch, select, prefetch):
+    method_field_lookups = getattr(serializer, 'method_field_lookups', {})
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.SerializerMethodField):
+            # Method fields can't be introspected; serializers list what they traverse
+            for path in method_field_lookups.get(name, ()):
+                parts, _, many = _relation_path(model, path.split('__'))
+                if parts:
+                    (prefetch if in_prefetch or many else select).add(prefix + '__'.join(parts))
+            continue
+        if field.write_only or not getattr(field, 'source_attrs', None):
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(field, serializers.ManyRelatedField):
+            nested = None
+        elif isinstance(field, serializers.RelatedField):
+            # Primary keys are read from the local <fk>_id column; other related fields need the row
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+
+        parts, related_model, many = _relation_path(model, field.source_attrs)
+        if not parts:
+            continue
+        many = many or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField))
+        lookup = prefix + '__'.join(parts)
+        if in_prefetch or many:
+            prefetch.add(lookup)
+        else:
+            select.add(lookup)
+
+        if isinstance(nested, serializers.BaseSerializer):
+            _collect(nested, related_model, lookup + '__', in_prefetch or many, select, prefetch)
+
+
+def get_related_lookups(serializer):
+    """select_related/prefetch_related lookups needed to render a serializer without N+1 queries"""
+    model = serializer.Meta.model
+    # ?expand= swaps a primary-key field for a nested serializer under the same name, so the
+    # field classes are part of the key, not just the names
+    key = (type(serializer), tuple(
+        (name, type(getattr(field, 'child', field))) for name, field in serializer.fields.items()
+    ))
+    if key not in _lookup_cache:
+        select, prefetch = set(), set()
+        _collect(serializer, model, '', False, select, prefetch)
+        _lookup_cache[key] = (sorted(select), sorted(prefetch))
+    return _lookup_cache[key]
+
+
+class AutoPrefetchMixin:
+    """Applies the select_related/prefetch_related that the ViewSet's serializer will need"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer()
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        if not isinstance(serializer, serializers.ModelSerializer):
+            return queryset
+
+        select, prefetch = get_related_lookups(serializer)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+def get_deferrable_fields(serializer, queryset, keep=()):
+    """Concrete columns of the queryset's model that the serializer never reads"""
+    needed = {'pk', queryset.model._meta.pk.name, *keep}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        # Method fields and source='*' can touch any attribute, so nothing can be deferred
+        if isinstance(field, serializers.SerializerMethodField) or not field.source_attrs:
+            return []
+        needed.add(field.source_attrs[0])
+
+    # Relations traversed by select_related/prefetch_related need their key column
+    if isinstance(queryset.query.select_related, dict):
+        needed.update(queryset.query.select_related)
+    for lookup in queryset._prefetch_related_lookups:
+        needed.add(getattr(lookup, 'prefetch_through', lookup).split('__')[0])
+
+    return [
+        field.name for field in queryset.model._meta.concrete_fields
+        if field.name not in needed and not field.primary_key
+    ]
+
+
+class SparseFieldsMixin:
+    """Defers the columns left out by ?fields= so they are not read from the database either"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None or 'fields' not in self.request.query_params or self.request.method not in ('GET', 'HEAD'):
+            return queryset
+        serializer = self.get_serializer()
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        if not isinstance(serializer, serializers.ModelSerializer):
+            return queryset
+
+        # Keyset pagination reads its ordering columns from the last row
+        keep = [name.lstrip('-') for name in getattr(self, 'keyset_ordering', ())]
+        deferred = get_deferrable_fields(serializer, queryset, keep)
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class ArchiveReadMixin:
+    """Lists a model that archive_history moves to the archive database, including archived rows.
+
+    Lists accept ?start= and ?end= (YYYY-MM-DD) on `archive_date_field`. KeysetPagination
+    asks get_archive_queryset() for the archived rows that may belong on the page; there are
+    none when the range or the page stays above the model's ArchiveWatermark.
+    """
+    archive_date_field = 'date'
+
+    def get_date_range(self):
+        bounds = []
+        for name in ('start', 'end'):
+            value = self.request.query_params.get(name)
+            try:
+                bounds.append(date.fromisoformat(value) if value else None)
+            except ValueError:
+                raise serializers.ValidationError({name: 'Use YYYY-MM-DD.'})
+        return bounds
+
+    def filter_date_range(self, queryset):
+        start, end = self.get_date_range()
+        if start:
+            queryset = queryset.filter(**{f'{self.archive_date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{self.archive_date_field}__lte': end})
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.filter_date_range(super().filter_queryset(queryset))
+
+    def get_archive_queryset(self, last_row=None):
+        """Archived rows for this list, or None if they cannot reach the page.
+
+        `last_row` is the last row of a full page read from the hot database.
+        """
+        from .archive import get_archive_queryset
+        from .models import ArchiveWatermark
+
+        model = self.get_queryset().model
+        watermark = ArchiveWatermark.get(model)
+        if watermark is None:
+            return None
+        start, _ = self.get_date_range()
+        if start and start >= watermark:
+            return None
+        # Newest first: every archived row sorts after a page that ends at or above the watermark
+        newest_first = list(getattr(self, 'keyset_ordering', ()))[:1] == [f'-{self.archive_date_field}']
+        if newest_first and last_row is not None and getattr(last_row, self.archive_date_field) >= watermark:
+            return None
+        return self.filter_date_range(get_archive_queryset(model))
+
+
+def get_related_models(queryset):
+    """Every model whose rows end up in the queryset's results, following select/prefetch lookups"""
+    model = queryset.model
+    found = {model}
+
+    def walk_selected(model, tree):
+        for name, subtree in tree.items():
+            _, related_model, _ = _relation_path(model, [name])
+            if related_model is not model:
+                found.add(related_model)
+                walk_selected(related_model, subtree)
+
+    if isinstance(queryset.query.select_related, dict):
+        walk_selected(model, queryset.query.select_related)
+    for lookup in queryset._prefetch_related_lookups:
+        current = model
+        for name in getattr(lookup, 'prefetch_through', lookup).split('__'):
+            parts, current, _ = _relation_path(current, [name])
+            if not parts:
+                break
+            found.add(current)
+    return found
+
+
+class ResponseCacheMixin:
+    """Caches list/retrieve responses, keyed by URL, caller scope and the versions of the models shown.
+
+    Any write to one of those models bumps its ModelVersion, which changes the key, so a stale
+    entry is never served and entries need no TTL. `cache_scope = 'global'` shares entries between
+    users; the default keeps them per user because querysets may be filtered by the caller.
+    """
+    cache_scope = 'user'
+    cache_dependencies = ()
+
+    def get_cache_scope(self):
+        if self.cache_scope == 'global':
+            return 'global'
+        return f'user:{self.request.user.pk}'
+
+    def get_cache_key(self):
+        from .models import ModelVersion
+
+        models = get_related_models(self.get_queryset()) | set(self.cache_dependencies)
+        # Versions are read before the data, so a concurrent write can only make the entry fresher
+        versions = ModelVersion.get_versions(models)
+        raw = '|'.join([
+            type(self).__name__, self.action, self.get_cache_scope(), self.request.build_absolute_uri(),
+            *(f'{label}={version}' for label, version in versions),
+        ])
+        return 'hr:response:' + hashlib.sha256(raw.encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        key = self.get_cache_key()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+def ordering_key(ordering):
+    """Sort key for instances that follows an order_by() list such as ('-date', '-id')"""
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def compare(a, b):
+        for name, descending in fields:
+            x, y = getattr(a, name), getattr(b, name)
+            if x != y:
+                return (1 if x > y else -1) * (-1 if descending else 1)
+        return 0
+    return cmp_to_key(compare)
+
+
+def skip_repeated(rows):
+    # A snapshot taken before the last archive run still has the moved rows, which the
+    # merge then yields twice in a row
+    previous = None
+    for row in rows:
+        if previous is None or row.pk != previous.pk:
+            yield row
+        previous = row
+
+
+class StreamingExportMixin:
+    """Streams list responses negotiated as CSV/NDJSON (`?format=csv`) instead of paginating them.
+
+    Rows are read with iterator() and serialized a chunk at a time, so memory stays flat
+    however long the export is.
+    """
+    export_chunk_size = settings.EXPORT_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        from .renderers import StreamingExportRenderer
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        if isinstance(renderer, StreamingExportRenderer):
+            return self.stream_export(renderer)
+        return super().list(request, *args, **kwargs)
+
+    def export_rows(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keyset-paginated lists export in the order they list in
+        ordering = getattr(self, 'keyset_ordering', None)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        archived = self.get_archive_queryset() if hasattr(self, 'get_archive_queryset') else None
+        if archived is None:
+            # With chunk_size, iterator() also runs the queryset's prefetches once per chunk
+            return queryset.iterator(chunk_size=self.export_chunk_size)
+
+        from .archive import iterate_restored
+
+        # ArchiveReadMixin: merge in the archived rows, in the same order
+        ordering = ordering or ('-pk',)
+        rows = heapq.merge(
+            queryset.order_by(*ordering).iterator(chunk_size=self.export_chunk_size),
+            iterate_restored(queryset, archived.order_by(*ordering), self.export_chunk_size),
+            key=ordering_key(ordering),
+        )
+        return skip_repeated(rows)
+
+    def export_chunks(self, renderer):
+        # Honours ?fields=, which the serializer has already applied to its own field set
+        fields = [name for name, field in self.get_serializer().fields.items() if not field.write_only]
+        yield renderer.render_header(fields)
+
+        chunk = []
+        for row in self.export_rows():
+            chunk.append(row)
+            if len(chunk) == self.export_chunk_size:
+                yield renderer.render_rows(self.get_serializer(chunk, many=True).data, fields)
+                chunk = []
+        if chunk:
+            yield renderer.render_rows(self.get_serializer(chunk, many=True).data, fields)
+
+    def stream_export(self, renderer):
+        response = StreamingHttpResponse(
+            # Exports read the analytics snapshot (hr_app.analytics)
+            iterate_analytics(self.export_chunks(renderer)),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{renderer.format}"'
+        return response
+
+
+class ChangeFeedMixin:
+    """Scopes the change-log entries /api/changes/ (hr_app.changes) reports for this ViewSet's resource.
+
+    Deleted rows can't be filtered by get_queryset(), so ViewSets that narrow it per caller
+    narrow get_change_filter() the same way, on the Change's fields.
+    """
+
+    def get_change_filter(self):
+        return models.Q()
+
+
+def is_pk(value):
+    # bool is an int subclass, but true/false are not ids
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class BulkWriteMixin:
+    """`POST|PATCH|DELETE <resource>/bulk/`: create, partially update or delete a list of objects at once.
+
+    Each request is one transaction and is all-or-nothing; validation errors come back per item,
+    in payload order. bulk_create/bulk_update are used unless the model overrides save() or the
+    ViewSet overrides the matching perform_* hook, in which case every item goes through that
+    hook instead so its side effects still happen.
+    """
+    bulk_max_items = settings.BULK_MAX_ITEMS
+    bulk_batch_size = settings.BULK_BATCH_SIZE
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        payload = request.data
+        if not isinstance(payload, list) or not payload:
+            return Response({'error': 'Send a non-empty JSON list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(payload) > self.bulk_max_items:
+            return Response({'error': f'A bulk request may contain at most {self.bulk_max_items} items'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        handler = {'POST': self.bulk_create, 'PATCH': self.bulk_update, 'DELETE': self.bulk_destroy}[request.method]
+        try:
+            with transaction.atomic():
+                response = handler(payload)
+                if response.status_code >= 400:
+                    transaction.set_rollback(True)
+        except IntegrityError as e:
+            # e.g. two items in the payload that break the same unique constraint
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return response
+
+    def uses_bulk_queries(self, hook):
+        default_hook, model_method = {
+            'perform_create': (mixins.CreateModelMixin.perform_create, 'save'),
+            'perform_update': (mixins.UpdateModelMixin.perform_update, 'save'),
+            'perform_destroy': (mixins.DestroyModelMixin.perform_destroy, 'delete'),
+        }[hook]
+        model = self.get_queryset().model
+        return getattr(type(self), hook) is default_hook and getattr(model, model_method) is getattr(models.Model, model_method)
+
+    def get_bulk_queryset(self):
+        # Related rows are re-read for the response, and joins don't mix with FOR UPDATE
+        return self.get_queryset().select_related(None).prefetch_related(None).select_for_update()
+
+    def bulk_response(self, instances, status_code):
+        # Re-read through get_queryset() so the serializer's relations are prefetched
+        fetched = self.get_queryset().in_bulk([instance.pk for instance in instances])
+        rows = [fetched.get(instance.pk, instance) for instance in instances]
+        return Response(self.get_serializer(rows, many=True).data, status=status_code)
+
+    def bulk_errors(self, errors):
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_create(self, payload):
+        items = [self.get_serializer(data=item) for item in payload]
+        errors = [item.errors if not item.is_valid() else {} for item in items]
+        if any(errors):
+            return self.bulk_errors(errors)
+
+        if not self.uses_bulk_queries('perform_create'):
+            for item in items:
+                self.perform_create(item)
+            return self.bulk_response([item.instance for item in items], status.HTTP_201_CREATED)
+
+        from .models import Change, ModelVersion
+
+        model = self.get_queryset().model
+        instances = model.objects.bulk_create(
+            [model(**item.validated_data) for item in items], batch_size=self.bulk_batch_size
+        )
+        # bulk_create sends no post_save, so invalidate cached responses and log the change explicitly
+        ModelVersion.bump(model)
+        Change.record(model, instances)
+        return self.bulk_response(instances, status.HTTP_201_CREATED)
+
+    def bulk_update(self, payload):
+        ids = [item.get('id') if isinstance(item, dict) else None for item in payload]
+        instances = self.get_bulk_queryset().in_bulk([pk for pk in ids if is_pk(pk)])
+
+        items, errors = [], []
+        for pk, data in zip(ids, payload):
+            instance = instances.get(pk) if is_pk(pk) else None
+            if instance is None:
+                items.append(None)
+                errors.append({'id': ['Not found.']})
+                continue
+            self.check_object_permissions(self.request, instance)
+            item = self.get_serializer(instance, data=data, partial=True)
+            items.append(item)
+            errors.append(item.errors if not item.is_valid() else {})
+        if any(errors):
+            return self.bulk_errors(errors)
+
+        if not self.uses_bulk_queries('perform_update'):
+            for item in items:
+                self.perform_update(item)
+            return self.bulk_response([item.instance for item in items], status.HTTP_200_OK)
+
+        from .models import Change, ModelVersion
+
+        model = self.get_queryset().model
+        changed = {'updated_at'} if any(field.name == 'updated_at' for field in model._meta.fields) else set()
+        now = timezone.now()
+        for item in items:
+            for name, value in item.validated_data.items():
+                setattr(item.instance, name, value)
+                changed.add(name)
+            if 'updated_at' in changed:
+                item.instance.updated_at = now
+        # The same object may appear twice in the payload; later items win
+        unique = list({item.instance.pk: item.instance for item in items}.values())
+        if changed - {'updated_at'}:
+            model.objects.bulk_update(unique, sorted(changed), batch_size=self.bulk_batch_size)
+            ModelVersion.bump(model)
+            Change.record(model, unique)
+        return self.bulk_response(unique, status.HTTP_200_OK)
+
+    def bulk_destroy(self, payload):
+        if not all(is_pk(pk) for pk in payload):
+            return Response({'error': 'Send a list of integer ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        instances = self.get_bulk_queryset().in_bulk(payload)
+        errors = [{} if pk in instances else {'id': ['Not found.']} for pk in payload]
+        if any(errors):
+            return self.bulk_errors(errors)
+        for instance in instances.values():
+            self.check_object_permissions(self.request, instance)
+
+        if not self.uses_bulk_queries('perform_destroy'):
+            for instance in instances.values():
+                self.perform_destroy(instance)
+        else:
+            # A queryset delete still sends post_delete, so cache versions and the change log are kept
+            self.get_queryset().model.objects.filter(pk__in=list(instances)).delete()
+        return Response({'deleted': len(instances)}, status=status.HTTP_200_OK)
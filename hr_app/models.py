@@ -1,7 +1,11 @@
-from django.db import models
+import time
+from decimal import Decimal
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Greatest, Lower
 from django.utils import timezone
+from .storage import receipt_storage, receipt_upload_to, hash_file
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -10,8 +14,15 @@ class User(AbstractUser):
         ('employee', 'Employee'),
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='employee')
-    department = models.CharField(max_length=100, blank=True)
+    department = models.CharField(max_length=100, blank=True, db_index=True)
     avatar = models.URLField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive email lookup at login
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
@@ -32,6 +43,7 @@ class Employee(models.Model):
         ('rejected', 'Rejected'),
     ], default='pending')
     onboarding_completed_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.position}"
@@ -48,9 +60,16 @@ class Attendance(models.Model):
         ('half_day', 'Half Day'),
     ], default='present')
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['employee', 'date']
+        indexes = [
+            # Keyset pagination order for the attendance list
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+            # Dashboard attendance rate: both counts are answered from the index alone
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee} - {self.date}"
@@ -70,6 +89,14 @@ class Deduction(models.Model):
     effective_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Active recurring deductions of an employee (payroll calculation, pay slips)
+            models.Index(fields=['employee', 'is_recurring', 'effective_date', 'end_date'],
+                         name='deduction_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee} - {self.name}: ${self.amount}"
@@ -93,6 +120,15 @@ class Payroll(models.Model):
     ], default='pending')
     processed_date = models.DateTimeField(null=True, blank=True)
     payment_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order for the payroll list
+            models.Index(fields=['period_start', 'id'], name='payroll_period_start_id_idx'),
+            # Dashboard "recently processed" feed
+            models.Index(fields=['status', 'processed_date'], name='payroll_status_processed_idx'),
+        ]
 
     def calculate_gross_salary(self):
         """Calculate gross salary including overtime and allowances"""
@@ -161,6 +197,7 @@ class JobPosting(models.Model):
         ('filled', 'Filled'),
     ], default='active')
     posted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.title
@@ -187,6 +224,13 @@ class Candidate(models.Model):
     score = models.DecimalField(max_digits=3, decimal_places=1, validators=[MinValueValidator(0), MaxValueValidator(10)], default=0)
     applied_date = models.DateField(auto_now_add=True)
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Newest applications in a status (dashboard, recruitment pipeline)
+            models.Index(fields=['status', 'applied_date'], name='candidate_status_applied_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.job_posting.title}"
@@ -202,6 +246,7 @@ class Benefit(models.Model):
         ('other', 'Other'),
     ])
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -215,6 +260,7 @@ class EmployeeBenefit(models.Model):
         ('pending', 'Pending'),
         ('cancelled', 'Cancelled'),
     ], default='enrolled')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['employee', 'benefit']
@@ -234,7 +280,12 @@ class Expense(models.Model):
         ('medical', 'Medical'),
         ('other', 'Other'),
     ])
-    receipt = models.FileField(upload_to='receipts/', blank=True)
+    # Snapshot of the submitter's department, keeps ExpenseRollup buckets stable
+    department = models.CharField(max_length=100, blank=True)
+    receipt = models.FileField(upload_to=receipt_upload_to, storage=receipt_storage, blank=True)
+    # SHA-256 of the receipt; names the stored file and flags re-submitted receipts
+    receipt_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
     submitted_date = models.DateField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=[
         ('pending', 'Pending'),
@@ -244,10 +295,120 @@ class Expense(models.Model):
     ], default='pending')
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_expenses')
     approved_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    ROLLUP_FIELDS = {'department', 'category', 'submitted_date', 'status', 'amount'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the row contributes to ExpenseRollup so saves can post deltas
+        if not cls.ROLLUP_FIELDS & instance.get_deferred_fields():
+            instance._loaded_rollup_entry = instance.rollup_entry()
+        return instance
+
+    def rollup_entry(self):
+        """(department, category, month, status, amount) this expense contributes to ExpenseRollup"""
+        return (
+            self.department, self.category, self.submitted_date.replace(day=1),
+            self.status, Decimal(str(self.amount)),
+        )
+
+    def loaded_rollup_entry(self):
+        if self._state.adding:
+            return None
+        if hasattr(self, '_loaded_rollup_entry'):
+            return self._loaded_rollup_entry
+        stored = Expense.objects.filter(pk=self.pk).first()
+        return stored.rollup_entry() if stored else None
+
+    def stored_rollup_entry(self):
+        if self._state.adding:
+            return None
+        stored = Expense.objects.select_for_update().filter(pk=self.pk).only(*self.ROLLUP_FIELDS).first()
+        return stored.rollup_entry() if stored else None
+
+    @classmethod
+    def sync_rollups(cls, expenses):
+        """Post rollup deltas for expenses saved without save(), e.g. via bulk_update"""
+        ExpenseRollup.apply_changes(
+            (expense.loaded_rollup_entry(), expense.rollup_entry()) for expense in expenses
+        )
+        for expense in expenses:
+            expense._loaded_rollup_entry = expense.rollup_entry()
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.department:
+            self.department = self.employee.user.department
+
+        new_receipt = bool(self.receipt) and not self.receipt._committed
+        if new_receipt:
+            # Hash before the upload is written, the hash decides the storage path
+            self.receipt_hash = hash_file(self.receipt)
+            self.duplicate_of_id = Expense.objects.filter(
+                receipt_hash=self.receipt_hash
+            ).exclude(pk=self.pk).order_by('id').values_list('id', flat=True).first()
+
+        with transaction.atomic():
+            # The delta starts from the stored row, locked until commit: another request may have
+            # saved this expense since it was loaded here
+            previous_entry = self.stored_rollup_entry()
+            super().save(*args, **kwargs)
+            current_entry = self.rollup_entry()
+            ExpenseRollup.apply_changes([(previous_entry, current_entry)])
+        self._loaded_rollup_entry = current_entry
+
+        if new_receipt:
+            from .thumbnails import schedule_thumbnail
+            name, digest = self.receipt.name, self.receipt_hash
+            transaction.on_commit(lambda: schedule_thumbnail(name, digest))
 
     def __str__(self):
         return f"{self.employee} - {self.title} (${self.amount})"
 
+class ExpenseRollup(models.Model):
+    """Running count/total of expenses per department, category, month and status"""
+    department = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=50)
+    month = models.DateField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['month', 'department', 'category', 'status']
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """Apply (previous_entry, current_entry) pairs from Expense.rollup_entry(); None means absent"""
+        deltas = {}
+        for previous, current in changes:
+            if previous == current:
+                continue
+            for entry, sign in ((previous, -1), (current, 1)):
+                if entry is None:
+                    continue
+                key, amount = entry[:4], entry[4]
+                count, total = deltas.get(key, (0, Decimal('0')))
+                deltas[key] = (count + sign, total + sign * amount)
+
+        for (department, category, month, status), (count, total) in deltas.items():
+            if not count and not total:
+                continue
+            bucket = cls.objects.filter(department=department, category=category, month=month, status=status)
+            if bucket.update(count=models.F('count') + count, total=models.F('total') + total):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(department=department, category=category, month=month,
+                                       status=status, count=count, total=total)
+            except IntegrityError:
+                # Another request created the bucket first
+                bucket.update(count=models.F('count') + count, total=models.F('total') + total)
+
+    def __str__(self):
+        return f"{self.department} - {self.category} {self.month:%Y-%m} ({self.status}): {self.count}"
+
 class Project(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -269,6 +430,13 @@ class Project(models.Model):
         ('critical', 'Critical'),
     ], default='medium')
     progress = models.PositiveIntegerField(default=0, validators=[MaxValueValidator(100)])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Active-project count on the dashboard
+            models.Index(fields=['status'], name='project_status_idx'),
+        ]
 
     def update_status_based_on_tasks(self):
         """Update project status based on task completion status with weighted progress"""
@@ -341,6 +509,13 @@ class Task(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
     completed_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Open-task counts and status filters
+            models.Index(fields=['status'], name='task_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Update completed_date when status changes to completed
@@ -383,6 +558,7 @@ class PerformanceReview(models.Model):
         ('submitted', 'Submitted'),
         ('acknowledged', 'Acknowledged'),
     ], default='draft')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.employee} - {self.review_period_start} to {self.review_period_end}"
@@ -417,6 +593,7 @@ class Course(models.Model):
     ])
     is_active = models.BooleanField(default=True)
     created_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.title
@@ -435,6 +612,7 @@ class Enrollment(models.Model):
     progress_percentage = models.PositiveIntegerField(default=0, validators=[MaxValueValidator(100)])
     certificate_earned = models.BooleanField(default=False)
     score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['employee', 'course']
@@ -454,10 +632,22 @@ class TaxRecord(models.Model):
         ('filed', 'Filed'),
         ('paid', 'Paid'),
     ], default='pending')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.employee} - Tax Year {self.tax_year}"
 
+class LeaveRequestQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status__in=self.model.ACTIVE_STATUSES)
+
+    def overlapping(self, start_date, end_date):
+        """Requests whose [start_date, end_date] range intersects the given range"""
+        return self.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+    def for_department(self, department):
+        return self.filter(employee__user__department=department)
+
 class LeaveRequest(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_requests')
     leave_type = models.CharField(max_length=50, choices=[
@@ -482,16 +672,108 @@ class LeaveRequest(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_leaves')
     approved_date = models.DateTimeField(null=True, blank=True)
     comments = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Leave that still blocks the calendar; rejected/cancelled requests free the dates
+    ACTIVE_STATUSES = ['pending', 'approved']
+
+    objects = LeaveRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-employee overlap checks: equality on employee, range on start_date
+            models.Index(fields=['employee', 'start_date', 'end_date'], name='leave_employee_dates_idx'),
+            # Calendar lookups once the department has been narrowed via User.department
+            models.Index(fields=['start_date', 'end_date', 'status'], name='leave_dates_status_idx'),
+        ]
+
+    def ledger_entry(self):
+        """(employee_id, leave_type, year, days) charged to LeaveBalance while approved, else None"""
+        if self.status != 'approved':
+            return None
+        # Leave is charged to the year it starts in
+        return (self.employee_id, self.leave_type, self.start_date.year, self.days_requested)
 
     def __str__(self):
         return f"{self.employee} - {self.leave_type} ({self.start_date} to {self.end_date})"
 
+class LeaveBalance(models.Model):
+    """Per-employee leave ledger; accrued by the accrue_leave batch, debited on approval"""
+    # Days accrued per month for leave types that are balance-limited
+    ACCRUAL_RATES = {
+        'annual': Decimal('1.75'),
+        'sick': Decimal('1.00'),
+    }
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=50, choices=[
+        ('annual', 'Annual Leave'),
+        ('sick', 'Sick Leave'),
+    ])
+    year = models.PositiveIntegerField()
+    accrued = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    used = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    last_accrual_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ['employee', 'leave_type', 'year']
+
+    @property
+    def available(self):
+        return self.accrued - self.used
+
+    @classmethod
+    def tracks(cls, leave_type):
+        return leave_type in cls.ACCRUAL_RATES
+
+    @classmethod
+    def get_available(cls, employee_id, leave_type, year):
+        """Remaining days for one ledger row, or None if the leave type is not balance-limited"""
+        if not cls.tracks(leave_type):
+            return None
+        row = cls.objects.filter(
+            employee_id=employee_id, leave_type=leave_type, year=year
+        ).values_list('accrued', 'used').first()
+        if row is None:
+            return Decimal('0')
+        return row[0] - row[1]
+
+    @classmethod
+    def debit(cls, employee_id, leave_type, year, days):
+        """Atomically take days from the balance; returns False if it would go negative"""
+        if not cls.tracks(leave_type):
+            return True
+        # The guard and the decrement run as one UPDATE, so concurrent approvals can't overdraw
+        updated = cls.objects.filter(
+            employee_id=employee_id, leave_type=leave_type, year=year,
+            accrued__gte=models.F('used') + days
+        ).update(used=models.F('used') + days, updated_at=timezone.now())
+        if updated:
+            ModelVersion.bump(cls)
+            Change.record(cls, cls.objects.filter(employee_id=employee_id, leave_type=leave_type, year=year))
+        return updated == 1
+
+    @classmethod
+    def credit(cls, employee_id, leave_type, year, days):
+        """Return previously debited days, e.g. when approved leave is cancelled"""
+        if not cls.tracks(leave_type):
+            return
+        rows = cls.objects.filter(employee_id=employee_id, leave_type=leave_type, year=year)
+        rows.update(used=models.F('used') - days, updated_at=timezone.now())
+        ModelVersion.bump(cls)
+        Change.record(cls, rows)
+
+    def __str__(self):
+        return f"{self.employee} - {self.leave_type} {self.year}: {self.available} days"
+
 class PaySlip(models.Model):
     payroll = models.OneToOneField(Payroll, on_delete=models.CASCADE, related_name='pay_slip')
     pdf_file = models.FileField(upload_to='pay_slips/', null=True, blank=True)
     generated_date = models.DateTimeField(auto_now_add=True)
     is_downloaded = models.BooleanField(default=False)
     download_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Pay Slip - {self.payroll.employee} - {self.payroll.period_start}"
@@ -508,6 +790,157 @@ class Budget(models.Model):
         ('active', 'Active'),
         ('closed', 'Closed'),
     ], default='draft')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.department} - FY{self.fiscal_year}"
+
+class Change(models.Model):
+    """One write to a row, for the /api/changes/ feed; the autoincrement id is the feed's cursor.
+
+    Every save, bulk write and delete of a model with updated_at appends an entry. SQLite runs
+    one write transaction at a time, so ids are handed out in commit order: a reader that has
+    seen id N has seen every change up to N, however long the transaction that made it ran.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    # Employee the row belongs to, for ViewSets that show employees only their own rows
+    owner = models.PositiveBigIntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    @classmethod
+    def is_tracked(cls, model):
+        return any(field.name == 'updated_at' for field in model._meta.fields)
+
+    @classmethod
+    def record(cls, model, instances, deleted=False):
+        """Log writes to instances of `model`; call it from bulk paths that send no signals"""
+        if not cls.is_tracked(model):
+            return
+        label = model._meta.label_lower
+        cls.objects.bulk_create([
+            cls(model=label, object_id=instance.pk, owner=getattr(instance, 'employee_id', None), deleted=deleted)
+            for instance in instances
+        ], batch_size=500)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} {'deleted' if self.deleted else 'changed'} {self.changed_at}"
+
+class RevokedToken(models.Model):
+    """A revoked JWT id (jti) or login session id (sid); rows past expires_at can be pruned"""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.jti} until {self.expires_at}"
+
+class ModelVersion(models.Model):
+    """Change counter per model, bumped on every write; response cache keys embed it.
+
+    The response cache outlives the database, so versions must never repeat: each database
+    gets an epoch row (the time it was first migrated) and bumps never go below the clock,
+    so a recreated or restored database doesn't reissue versions that already have entries.
+    """
+    EPOCH = 'epoch'
+
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def next_version(cls):
+        return Greatest(models.F('version') + 1, models.Value(time.time_ns()),
+                        output_field=models.PositiveBigIntegerField())
+
+    @classmethod
+    def bump(cls, *model_classes):
+        for model in model_classes:
+            label = model._meta.label_lower
+            if cls.objects.filter(label=label).update(version=cls.next_version()):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(label=label, version=time.time_ns())
+            except IntegrityError:
+                cls.objects.filter(label=label).update(version=cls.next_version())
+
+    @classmethod
+    def start_epoch(cls, using=None):
+        """Give a new database its epoch; run after migrate and flush"""
+        cls.objects.using(using).get_or_create(label=cls.EPOCH, defaults={'version': time.time_ns()})
+
+    @classmethod
+    def get_versions(cls, model_classes):
+        labels = sorted({model._meta.label_lower for model in model_classes})
+        versions = dict(cls.objects.filter(label__in=[cls.EPOCH, *labels]).values_list('label', 'version'))
+        return [(cls.EPOCH, versions.get(cls.EPOCH, 0))] + [(label, versions.get(label, 0)) for label in labels]
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+class ArchiveWatermark(models.Model):
+    """Rows of a model dated before `before` may have been moved to the archive database"""
+    label = models.CharField(max_length=100, primary_key=True)
+    before = models.DateField()
+
+    @classmethod
+    def get(cls, model):
+        return cls.objects.filter(label=model._meta.label_lower).values_list('before', flat=True).first()
+
+class ArchivedRecord(models.Model):
+    """A row moved out of `hot_model` by archive_history; lives in the archive database (see hr_app.routers).
+
+    Keeps the hot row's primary key and column names, so restore() turns it back into a
+    `hot_model` instance for serializers written against that. Relations to rows that stay
+    in the hot database are plain ids.
+    """
+    hot_model = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def copy(cls, row):
+        return cls(**{field.attname: getattr(row, field.attname) for field in cls._meta.concrete_fields})
+
+    def restore(self):
+        names = [field.attname for field in self.hot_model._meta.concrete_fields]
+        return self.hot_model.from_db('default', names, [getattr(self, name) for name in names])
+
+class ArchivedAttendance(ArchivedRecord):
+    hot_model = Attendance
+
+    id = models.BigIntegerField(primary_key=True)
+    employee_id = models.PositiveBigIntegerField(db_index=True)
+    date = models.DateField()
+    check_in = models.TimeField(null=True, blank=True)
+    check_out = models.TimeField(null=True, blank=True)
+    status = models.CharField(max_length=20)
+    notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['date', 'id'], name='archived_attendance_date_idx')]
+
+class ArchivedPayroll(ArchivedRecord):
+    hot_model = Payroll
+
+    id = models.BigIntegerField(primary_key=True)
+    employee_id = models.PositiveBigIntegerField(db_index=True)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    base_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    overtime_hours = models.DecimalField(max_digits=5, decimal_places=2)
+    overtime_rate = models.DecimalField(max_digits=8, decimal_places=2)
+    bonus = models.DecimalField(max_digits=10, decimal_places=2)
+    allowances = models.DecimalField(max_digits=10, decimal_places=2)
+    gross_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    total_deductions = models.DecimalField(max_digits=10, decimal_places=2)
+    net_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)
+    processed_date = models.DateTimeField(null=True, blank=True)
+    payment_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['period_start', 'id'], name='archived_payroll_start_idx')]
@@ -0,0 +1,122 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from operator import attrgetter
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .archive import restore_rows
+
+
+class KeysetPagination(BasePagination):
+    """Pages on an indexed (column, id) pair with a WHERE clause instead of OFFSET, and skips COUNT(*).
+
+    The ViewSet picks the order with `keyset_ordering`, e.g. ('-date', '-id'); the last
+    column must be unique so every row has a distinct position.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        # One extra row tells us whether there is a next page without counting
+        rows = list(queryset[:self.page_size + 1])
+        # Views with an archive database (ArchiveReadMixin) add the archived rows that fall on this page
+        if hasattr(view, 'get_archive_queryset'):
+            archived = view.get_archive_queryset(rows[-1] if len(rows) > self.page_size else None)
+            if archived is not None:
+                archived = archived.order_by(*self.ordering)
+                if position is not None:
+                    archived = archived.filter(self.after(position))
+                rows = self.merge(rows, restore_rows(queryset, archived[:self.page_size + 1]))
+        self.next_position = self.get_position(rows[self.page_size - 1]) if len(rows) > self.page_size else None
+        return rows[:self.page_size]
+
+    def merge(self, *pages):
+        rows = [row for page in pages for row in page]
+        # Stable sorts from the last ordering column to the first give the combined order
+        for name, descending in reversed(self.fields()):
+            rows.sort(key=attrgetter(name), reverse=descending)
+        return rows[:self.page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def after(self, position):
+        """Rows strictly after `position` in the ordering: (a, b) < (x, y) spelled out for the ORM"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields(), position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # Repeat the bound on the leading column so the index range scan starts at the cursor
+        name, descending = self.fields()[0]
+        return Q(**{f'{name}__{"lte" if descending else "gte"}': position[0]}) & condition
+
+    def get_position(self, row):
+        return [self.model._meta.get_field(name).value_to_string(row) for name, _ in self.fields()]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(b64decode(encoded.encode('ascii'), validate=True).decode('utf-8'))
+            fields = self.fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [self.model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except (BinasciiError, UnicodeError, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        encoded = b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,128 @@
+import csv
+import io
+import re
+from abc import ABCMeta, abstractmethod
+from decimal import Decimal
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """Types the fast encoders don't handle natively, mapped the same way as DRF's JSONEncoder"""
+    # Serializers already coerce DecimalFields to strings; raw Decimals come from aggregates
+    if type(obj) is Decimal:
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson, which encodes dates, datetimes and dicts in C"""
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Pretty printing (e.g. the browsable API) keeps the stdlib path
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=self.options)
+        # Same strict-JavaScript-subset escaping as JSONRenderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+def msgpack_default(obj):
+    # msgpack has no date type; send the same ISO strings the JSON API uses
+    value = encode_default(obj)
+    if value is obj:
+        raise TypeError(f'Cannot serialize {type(obj).__name__}')
+    return value
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Compact binary rendering, chosen with `Accept: application/msgpack` or ?format=msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
+
+
+class StreamingExportRenderer(BaseRenderer, metaclass=ABCMeta):
+    """Base for export formats that list endpoints stream row by row (see StreamingExportMixin).
+
+    render() covers everything else (detail views, errors) by rendering the rows in one go.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = data.get('results', [data])
+        rows = list(data)
+        fields = list(dict.fromkeys(name for row in rows for name in row))
+        return self.render_header(fields) + self.render_rows(rows, fields)
+
+    def render_header(self, fields):
+        return b''
+
+    @abstractmethod
+    def render_rows(self, rows, fields):
+        """Bytes for a chunk of serialized rows, with the values in `fields` order"""
+
+
+def flatten_value(value):
+    # Nested serializers (e.g. ?expand=) become a JSON string inside the cell
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value, default=encode_default).decode()
+    return value
+
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+NUMBER = re.compile(r'[+-]?\d+(\.\d+)?')
+
+
+def escape_formula(value):
+    # A leading quote makes the cell plain text; numbers (e.g. negative amounts) stay numbers
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+class CSVRenderer(StreamingExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def write(self, values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(values)
+        return buffer.getvalue().encode(self.charset)
+
+    def render_header(self, fields):
+        return self.write([[escape_formula(name) for name in fields]])
+
+    def render_rows(self, rows, fields):
+        return self.write([escape_formula(flatten_value(row.get(name))) for name in fields] for row in rows)
+
+
+class NDJSONRenderer(StreamingExportRenderer):
+    """One JSON object per line"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_rows(self, rows, fields):
+        return b''.join(
+            orjson.dumps(row, default=encode_default, option=FastJSONRenderer.options) + b'\n' for row in rows
+        )
@@ -0,0 +1,375 @@
+import hashlib
+import json
+from datetime import date
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg, Count, F, Max, Min, Sum, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import TruncMonth, TruncYear
+from django.http import HttpResponse, StreamingHttpResponse
+import orjson
+from rest_framework import serializers
+from .models import (
+    User, Employee, Attendance, Payroll, Expense, PerformanceReview, LeaveRequest, ModelVersion, ArchiveWatermark
+)
+from .analytics import iterate_analytics
+from .archive import ARCHIVES, get_archive_queryset
+from .renderers import FastJSONRenderer, encode_default
+
+# Everything a report spec may reference. Dimensions are grouping expressions, measures are
+# the numeric columns that sum/avg/min/max may aggregate; count is always available.
+REPORT_SOURCES = {
+    'employees': {
+        'model': Employee,
+        'date_field': 'hire_date',
+        'dimensions': {
+            'department': F('user__department'),
+            'position': F('position'),
+            'onboarding_status': F('onboarding_status'),
+            'month': TruncMonth('hire_date'),
+            'year': TruncYear('hire_date'),
+        },
+        'measures': ['salary'],
+        'depends_on': [User],
+    },
+    'attendance': {
+        'model': Attendance,
+        'date_field': 'date',
+        'dimensions': {
+            'department': F('employee__user__department'),
+            'employee': F('employee_id'),
+            'status': F('status'),
+            'month': TruncMonth('date'),
+            'year': TruncYear('date'),
+        },
+        'measures': [],
+        'depends_on': [Employee, User],
+    },
+    'payroll': {
+        'model': Payroll,
+        'date_field': 'period_start',
+        'dimensions': {
+            'department': F('employee__user__department'),
+            'employee': F('employee_id'),
+            'status': F('status'),
+            'month': TruncMonth('period_start'),
+            'year': TruncYear('period_start'),
+        },
+        'measures': ['base_salary', 'bonus', 'allowances', 'gross_salary', 'total_deductions', 'net_salary'],
+        'depends_on': [Employee, User],
+    },
+    'expenses': {
+        'model': Expense,
+        'date_field': 'submitted_date',
+        'dimensions': {
+            'department': F('department'),
+            'category': F('category'),
+            'status': F('status'),
+            'month': TruncMonth('submitted_date'),
+            'year': TruncYear('submitted_date'),
+        },
+        'measures': ['amount'],
+        'depends_on': [],
+    },
+    'performance-reviews': {
+        'model': PerformanceReview,
+        'date_field': 'review_period_end',
+        'dimensions': {
+            'department': F('employee__user__department'),
+            'employee': F('employee_id'),
+            'status': F('status'),
+            'month': TruncMonth('review_period_end'),
+            'year': TruncYear('review_period_end'),
+        },
+        'measures': ['overall_rating'],
+        'depends_on': [Employee, User],
+    },
+    'leave-requests': {
+        'model': LeaveRequest,
+        'date_field': 'start_date',
+        'dimensions': {
+            'department': F('employee__user__department'),
+            'employee': F('employee_id'),
+            'leave_type': F('leave_type'),
+            'status': F('status'),
+            'month': TruncMonth('start_date'),
+            'year': TruncYear('start_date'),
+        },
+        'measures': ['days_requested'],
+        'depends_on': [Employee, User],
+    },
+}
+
+AGGREGATES = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+DATE_DIMENSIONS = {'month', 'year'}
+
+
+def describe_sources():
+    """What Reporting.tsx may put in a spec, for building its pickers"""
+    return {
+        name: {
+            'dimensions': list(source['dimensions']),
+            'measures': ['count'] + [f'{aggregate}:{field}' for field in source['measures'] for aggregate in AGGREGATES],
+            'filters': [name for name in source['dimensions'] if name not in DATE_DIMENSIONS] + ['start', 'end'],
+        }
+        for name, source in REPORT_SOURCES.items()
+    }
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({name: 'Use YYYY-MM-DD.'})
+
+
+def compile_report(spec):
+    """Validate a spec against REPORT_SOURCES and build its single GROUP BY query.
+
+    Returns (normalized_spec, queryset); the queryset yields one dict per group, keyed by
+    dimension and measure names. When the date range reaches archived rows it is an
+    ArchivedReport, which runs the query on both databases and merges the groups.
+    """
+    if not isinstance(spec, dict):
+        raise serializers.ValidationError('A report spec must be a JSON object.')
+    source_name = spec.get('source')
+    if source_name not in REPORT_SOURCES:
+        raise serializers.ValidationError({'source': f'Must be one of {", ".join(REPORT_SOURCES)}.'})
+    source = REPORT_SOURCES[source_name]
+
+    group_by = spec.get('group_by') or []
+    if not isinstance(group_by, list) or any(name not in source['dimensions'] for name in group_by):
+        raise serializers.ValidationError({'group_by': f'Must be a list drawn from {", ".join(source["dimensions"])}.'})
+    group_by = list(dict.fromkeys(group_by))
+
+    measures = spec.get('measures') or ['count']
+    if not isinstance(measures, list):
+        raise serializers.ValidationError({'measures': 'Must be a list.'})
+    # (output name, aggregate, field)
+    parsed_measures = []
+    for measure in dict.fromkeys(measures):
+        if measure == 'count':
+            parsed_measures.append(('count', 'count', None))
+            continue
+        aggregate, _, field = str(measure).partition(':')
+        if aggregate not in AGGREGATES or field not in source['measures']:
+            raise serializers.ValidationError({'measures': f'Unknown measure {measure!r}.'})
+        parsed_measures.append((f'{aggregate}_{field}', aggregate, field))
+
+    filters = spec.get('filters') or {}
+    if not isinstance(filters, dict):
+        raise serializers.ValidationError({'filters': 'Must be an object.'})
+    parsed_filters = {}
+    for name, value in sorted(filters.items()):
+        if name in ('start', 'end'):
+            parsed_filters[name] = parse_date(value, name)
+        elif name in source['dimensions'] and name not in DATE_DIMENSIONS:
+            parsed_filters[name] = value if isinstance(value, list) else [value]
+        else:
+            raise serializers.ValidationError({'filters': f'Cannot filter on {name!r}.'})
+
+    normalized = {
+        'source': source_name,
+        'group_by': group_by,
+        'measures': [name for name, _, _ in parsed_measures],
+        'filters': dict(sorted(filters.items())),
+    }
+    if source['model'] in ARCHIVES:
+        watermark = ArchiveWatermark.get(source['model'])
+        start = parsed_filters.get('start')
+        if watermark is not None and (start is None or start < watermark):
+            return normalized, ArchivedReport(source, group_by, parsed_measures, parsed_filters)
+    queryset = group_rows(source['model'].objects.all(), source, source['dimensions'], group_by,
+                          parsed_filters, get_aggregates(parsed_measures))
+    return normalized, queryset
+
+
+def get_aggregates(measures, partial=False):
+    aggregates = {}
+    for name, aggregate, field in measures:
+        if aggregate == 'count':
+            aggregates[name] = Count('pk')
+        elif aggregate == 'avg' and partial:
+            # Averages over two databases are combined from their sums and counts
+            aggregates[f'{name}__sum'] = Sum(field)
+            aggregates[f'{name}__count'] = Count(field)
+        else:
+            aggregates[name] = AGGREGATES[aggregate](field)
+    return aggregates
+
+
+def group_rows(queryset, source, dimensions, group_by, filters, aggregates):
+    """The GROUP BY query over one table; dimension values come back as dim_<name>"""
+    # Dimensions are annotated under a prefix so names like "status" don't clash with model fields
+    queryset = queryset.annotate(**{f'dim_{name}': expression for name, expression in dimensions.items()
+                                    if name in group_by or name in filters})
+    for name, value in filters.items():
+        if name == 'start':
+            queryset = queryset.filter(**{f'{source["date_field"]}__gte': value})
+        elif name == 'end':
+            queryset = queryset.filter(**{f'{source["date_field"]}__lte': value})
+        else:
+            queryset = queryset.filter(**{f'dim_{name}__in': value})
+
+    columns = [f'dim_{name}' for name in group_by]
+    if columns:
+        return queryset.values(*columns).annotate(**aggregates).order_by(*columns)
+    # A constant grouping key gives no GROUP BY, so the totals come back as a single row
+    return queryset.values(dim_total=Value(1)).annotate(**aggregates).order_by()
+
+
+class ArchivedReport:
+    """A report over the hot table and its archive (see hr_app.archive), merged group by group.
+
+    The archive has no employees or users to join, so a dimension reached through a relation
+    (department) is grouped by the relation's key there and looked up in the hot database.
+    Queries run when iterated, like a queryset's.
+    """
+
+    def __init__(self, source, group_by, measures, filters):
+        self.source = source
+        self.group_by = group_by
+        self.measures = measures
+        self.filters = filters
+        self.aggregates = get_aggregates(measures, partial=True)
+
+    def iterator(self, chunk_size=None):
+        groups = {}
+        hot = group_rows(self.source['model'].objects.all(), self.source, self.source['dimensions'],
+                         self.group_by, self.filters, self.aggregates)
+        for row in hot.iterator(chunk_size=chunk_size):
+            self.add(groups, tuple(row[f'dim_{name}'] for name in self.group_by), row)
+        for key, row in self.archived_groups():
+            self.add(groups, key, row)
+
+        # Same order as the single-database ORDER BY, NULLs first
+        for key in sorted(groups, key=lambda key: [(value is not None, value) for value in key]):
+            row = {f'dim_{name}': value for name, value in zip(self.group_by, key)}
+            for name, aggregate, _ in self.measures:
+                if aggregate == 'avg':
+                    total, count = groups[key][f'{name}__sum'], groups[key][f'{name}__count']
+                    row[name] = total / count if count else None
+                else:
+                    row[name] = groups[key][name]
+            yield row
+
+    def add(self, groups, key, row):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {name: row[name] for name in self.aggregates}
+            return
+        for name, aggregate, _ in self.measures:
+            for column in ([f'{name}__sum', f'{name}__count'] if aggregate == 'avg' else [name]):
+                old, new = group[column], row[column]
+                if old is None or new is None:
+                    group[column] = new if old is None else old
+                elif aggregate == 'min':
+                    group[column] = min(old, new)
+                elif aggregate == 'max':
+                    group[column] = max(old, new)
+                else:
+                    group[column] = old + new
+
+    def archived_groups(self):
+        """(group key, partial aggregates) from the archive database"""
+        model = self.source['model']
+        dimensions, relations = {}, {}
+        for name, expression in self.source['dimensions'].items():
+            if isinstance(expression, F) and LOOKUP_SEP in expression.name:
+                relation, path = expression.name.split(LOOKUP_SEP, 1)
+                relations[name] = (model._meta.get_field(relation), path)
+            else:
+                dimensions[name] = expression
+
+        queryset = get_archive_queryset(model)
+        filters = {}
+        for name, value in self.filters.items():
+            if name in relations:
+                field, path = relations[name]
+                keys = field.related_model.objects.filter(**{f'{path}__in': value}).values_list('pk', flat=True)
+                queryset = queryset.filter(**{f'{field.attname}__in': list(keys)})
+            else:
+                filters[name] = value
+
+        # Group by the relation keys in place of the dimensions they lead to
+        group_by = []
+        for name in self.group_by:
+            if name in relations:
+                field = relations[name][0]
+                dimensions[field.attname] = F(field.attname)
+                name = field.attname
+            if name not in group_by:
+                group_by.append(name)
+        rows = list(group_rows(queryset, self.source, dimensions, group_by, filters, self.aggregates))
+
+        lookups = {}
+        for name in self.group_by:
+            if name in relations:
+                field, path = relations[name]
+                keys = {row[f'dim_{field.attname}'] for row in rows}
+                lookups[name] = dict(field.related_model.objects.filter(pk__in=keys).values_list('pk', path))
+        for row in rows:
+            yield tuple(
+                lookups[name].get(row[f'dim_{relations[name][0].attname}']) if name in relations else row[f'dim_{name}']
+                for name in self.group_by
+            ), row
+
+
+def get_report_cache_key(spec):
+    source = REPORT_SOURCES[spec['source']]
+    # Any write to the models behind the report changes the key, as for cached API responses
+    versions = ModelVersion.get_versions([source['model'], *source['depends_on']])
+    raw = json.dumps([spec, versions], sort_keys=True, default=str)
+    return 'hr:report:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def encode(value):
+    return orjson.dumps(value, default=encode_default, option=FastJSONRenderer.options)
+
+
+def report_chunks(spec, queryset, cache_key):
+    """The report as a JSON document, written a few hundred groups at a time"""
+    limit = settings.REPORT_MAX_GROUPS
+    chunks = [encode(spec)[:-1] + b',"results":[']
+    yield chunks[0]
+
+    rows = []
+    count = 0
+    truncated = False
+    for row in queryset.iterator(chunk_size=500):
+        if count == limit:
+            truncated = True
+            break
+        rows.append(encode({
+            **{name: row[f'dim_{name}'] for name in spec['group_by']},
+            **{name: row[name] for name in spec['measures']},
+        }))
+        count += 1
+        if len(rows) == 500:
+            chunks.append((b',' if count > 500 else b'') + b','.join(rows))
+            yield chunks[-1]
+            rows = []
+    if rows:
+        chunks.append((b',' if count > len(rows) else b'') + b','.join(rows))
+        yield chunks[-1]
+
+    chunks.append(b'],"truncated":' + (b'true' if truncated else b'false') + b'}')
+    yield chunks[-1]
+    # Only reached when the whole report was sent; at most REPORT_MAX_GROUPS rows, so it's bounded
+    caches[settings.RESPONSE_CACHE_ALIAS].set(cache_key, b''.join(chunks), settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def report_response(spec, queryset):
+    cache_key = get_report_cache_key(spec)
+    content = caches[settings.RESPONSE_CACHE_ALIAS].get(cache_key)
+    if content is not None:
+        response = HttpResponse(content, content_type='application/json')
+        response['X-Cache'] = 'HIT'
+        return response
+
+    # Streams after reports_view has returned, so its analytics_reads() is applied to each step
+    response = StreamingHttpResponse(
+        iterate_analytics(report_chunks(spec, queryset, cache_key)), content_type='application/json'
+    )
+    response['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,106 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import RevokedToken
+
+GENERATION_KEY = 'hr:revocation-generation'
+# Copied from the login's refresh token into every token minted from it, so logout can revoke them all
+SESSION_ID_CLAIM = 'sid'
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about `error_rate` false positives at `capacity` items"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class RevocationList:
+    """Per-process bloom filter over RevokedToken, rebuilt when it ages out or another process revokes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.generation = None
+        self.built_at = 0
+
+    def get_generation(self):
+        return caches[settings.REVOCATION_CACHE_ALIAS].get(GENERATION_KEY, 0)
+
+    def get_filter(self):
+        generation = self.get_generation()
+        if (self.bloom is None or generation != self.generation
+                or time.monotonic() - self.built_at > settings.REVOCATION_FILTER_MAX_AGE):
+            with self.lock:
+                self.rebuild(generation)
+        return self.bloom
+
+    def rebuild(self, generation):
+        # The generation is read before the rows, so a revocation racing with this rebuild
+        # leaves the generation changed and triggers another one
+        ids = list(RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True))
+        bloom = BloomFilter(capacity=len(ids) + settings.REVOCATION_FILTER_HEADROOM)
+        for token_id in ids:
+            bloom.add(token_id)
+        self.bloom, self.generation, self.built_at = bloom, generation, time.monotonic()
+
+    def added(self, token_ids):
+        """Called after a revocation commits: take effect here at once, and make other processes rebuild"""
+        bloom = self.bloom
+        if bloom is not None:
+            for token_id in token_ids:
+                bloom.add(token_id)
+        cache = caches[settings.REVOCATION_CACHE_ALIAS]
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, None)
+
+
+revocation_list = RevocationList()
+
+
+def token_ids(token):
+    """The ids a token can be revoked by: its own jti and the login session (sid) it belongs to"""
+    return [value for value in (token.get(api_settings.JTI_CLAIM), token.get(SESSION_ID_CLAIM)) if value]
+
+
+def is_revoked(token):
+    ids = token_ids(token)
+    bloom = revocation_list.get_filter()
+    # The common case: the filter rules every id out and no query is needed
+    if not any(token_id in bloom for token_id in ids):
+        return False
+    return RevokedToken.objects.filter(jti__in=ids).exists()
+
+
+def revoke(ids, expires_at):
+    """Revoke token/session ids until `expires_at`, after which the tokens are expired anyway"""
+    ids = list(dict.fromkeys(ids))
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(jti=token_id, expires_at=expires_at) for token_id in ids], ignore_conflicts=True
+    )
+    transaction.on_commit(lambda: revocation_list.added(ids))
@@ -0,0 +1,46 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from .analytics import in_analytics_reads, snapshot_is_fresh
+
+ARCHIVE_DATABASE = 'archive'
+ANALYTICS_DATABASE = 'analytics'
+
+# Models whose rows live in the archive database (hr_app.models.ArchivedRecord subclasses).
+# archivedpayslip no longer exists, but migrations that touch it must still run there
+ARCHIVED_MODELS = {'archivedattendance', 'archivedpayroll', 'archivedpayslip'}
+
+
+class ArchiveRouter:
+    """Keeps the archived models in the archive database and everything else out of it"""
+
+    def is_archived(self, app_label, model_name):
+        return app_label == 'hr_app' and model_name in ARCHIVED_MODELS
+
+    def db_for_read(self, model, **hints):
+        if self.is_archived(model._meta.app_label, model._meta.model_name):
+            return ARCHIVE_DATABASE
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archived = self.is_archived(app_label, model_name)
+        if db == ARCHIVE_DATABASE:
+            return archived
+        return False if archived else None
+
+
+class AnalyticsRouter:
+    """Sends reads made inside analytics_reads() to the read-only snapshot (see hr_app.analytics).
+
+    Writes, reads inside a transaction (they must see its writes) and everything else use
+    the main database, as do analytic reads while the snapshot is missing or stale.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not in_analytics_reads() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return ANALYTICS_DATABASE if snapshot_is_fresh() else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The snapshot is a copy of the migrated main database
+        return False if db == ANALYTICS_DATABASE else None
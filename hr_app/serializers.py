@@ -1,15 +1,72 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.db import models
+from django.db.models.functions import Lower
 from .models import (
     User, Employee, Attendance, Payroll, Deduction, PaySlip, JobPosting, Candidate,
     Benefit, EmployeeBenefit, Expense, Project, ProjectTeam, Task,
-    PerformanceReview, KPIMetric, Course, Enrollment, TaxRecord, Budget, LeaveRequest
+    PerformanceReview, KPIMetric, Course, Enrollment, TaxRecord, Budget, LeaveRequest,
+    LeaveBalance
 )
-
-class UserSerializer(serializers.ModelSerializer):
+from .storage import receipt_storage, receipt_thumbnail_name
+from .authentication import verify_password_bounded
+
+
+def parse_field_list(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer that honours ?fields=a,b and ?expand=relation on GET requests.
+
+    Only the top-level serializer of a response is reshaped; nested serializers render in full.
+    `expand` swaps a primary-key relation for the registered serializer of the related model.
+    """
+
+    def is_response_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD') or not self.is_response_root():
+            return fields
+
+        for name in parse_field_list(request.query_params.get('expand')):
+            field = fields.get(name)
+            many = isinstance(field, serializers.ManyRelatedField)
+            if not (many or isinstance(field, serializers.PrimaryKeyRelatedField)):
+                continue
+            # Fields aren't bound yet, so source is only set when declared explicitly
+            source = field.source or name
+            related_model = self.Meta.model._meta.get_field(source).related_model
+            serializer_class = get_model_serializer(related_model)
+            if serializer_class is not None:
+                kwargs = {'source': source} if source != name else {}
+                fields[name] = serializer_class(many=many, read_only=True, **kwargs)
+
+        requested = parse_field_list(request.query_params.get('fields'))
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+
+def get_model_serializer(model):
+    """The serializer used to expand relations to `model`, None if there isn't one"""
+    for serializer_class in DynamicFieldsModelSerializer.__subclasses__():
+        if serializer_class.Meta.model is model:
+            return serializer_class
+    return None
+
+class UserSerializer(DynamicFieldsModelSerializer):
     password = serializers.CharField(write_only=True)
     employee_id = serializers.SerializerMethodField()
+    # Relations read by the method fields, picked up by AutoPrefetchMixin
+    method_field_lookups = {'employee_id': ['employee_profile']}
 
     class Meta:
         model = User
@@ -34,44 +91,67 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if email and password:
-            try:
-                user = User.objects.get(email=email)
-                if user.check_password(password):
-                    if user.is_active:
-                        data['user'] = user
-                    else:
-                        raise serializers.ValidationError('User account is disabled.')
-                else:
-                    raise serializers.ValidationError('Invalid credentials.')
-            except User.DoesNotExist:
+            # Served by the LOWER(email) index
+            user = User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).order_by('pk').first()
+            is_correct, must_update = verify_password_bounded(password, user.password if user else '')
+            if not is_correct:
                 raise serializers.ValidationError('Invalid credentials.')
+            if must_update:
+                # Same upgrade check_password() does when the hasher or its work factor changed
+                user.set_password(password)
+                user.save(update_fields=['password'])
+            if user.is_active:
+                data['user'] = user
+            else:
+                raise serializers.ValidationError('User account is disabled.')
         else:
             raise serializers.ValidationError('Must include email and password.')
 
         return data
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.RegexField(r'^/', max_length=2000)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'A batch may contain at most {settings.BATCH_MAX_REQUESTS} requests.')
+        return value
+
+class EmployeeSerializer(DynamicFieldsModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = Employee
         fields = '__all__'
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
 
     class Meta:
         model = Attendance
         fields = '__all__'
 
-class DeductionSerializer(serializers.ModelSerializer):
+class DeductionSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
 
     class Meta:
         model = Deduction
         fields = '__all__'
 
-class PayrollSerializer(serializers.ModelSerializer):
+def recurring_deductions_prefetch(lookup='employee__deductions'):
+    """Prefetch used by PayrollSerializer.get_deductions_breakdown instead of one query per payroll"""
+    return models.Prefetch(
+        lookup,
+        queryset=Deduction.objects.filter(is_recurring=True),
+        to_attr='recurring_deductions',
+    )
+
+class PayrollSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     department = serializers.CharField(source='employee.user.department', read_only=True)
     position = serializers.CharField(source='employee.position', read_only=True)
@@ -83,6 +163,16 @@ class PayrollSerializer(serializers.ModelSerializer):
         read_only_fields = ('gross_salary', 'total_deductions', 'net_salary', 'processed_date', 'payment_date')
 
     def get_deductions_breakdown(self, obj):
+        recurring = getattr(obj.employee, 'recurring_deductions', None)
+        if recurring is not None:
+            # Filled by recurring_deductions_prefetch(), filter the period in Python
+            deductions = [
+                deduction for deduction in recurring
+                if deduction.effective_date <= obj.period_end
+                and (deduction.end_date is None or deduction.end_date >= obj.period_start)
+            ]
+            return DeductionSerializer(deductions, many=True).data
+
         deductions = Deduction.objects.filter(
             employee=obj.employee,
             effective_date__lte=obj.period_end,
@@ -92,21 +182,21 @@ class PayrollSerializer(serializers.ModelSerializer):
         )
         return DeductionSerializer(deductions, many=True).data
 
-class PaySlipSerializer(serializers.ModelSerializer):
+class PaySlipSerializer(DynamicFieldsModelSerializer):
     payroll_details = PayrollSerializer(source='payroll', read_only=True)
 
     class Meta:
         model = PaySlip
         fields = '__all__'
 
-class JobPostingSerializer(serializers.ModelSerializer):
+class JobPostingSerializer(DynamicFieldsModelSerializer):
     posted_by_name = serializers.CharField(source='posted_by.get_full_name', read_only=True)
 
     class Meta:
         model = JobPosting
         fields = '__all__'
 
-class CandidateSerializer(serializers.ModelSerializer):
+class CandidateSerializer(DynamicFieldsModelSerializer):
     full_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -116,12 +206,12 @@ class CandidateSerializer(serializers.ModelSerializer):
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
 
-class BenefitSerializer(serializers.ModelSerializer):
+class BenefitSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Benefit
         fields = '__all__'
 
-class EmployeeBenefitSerializer(serializers.ModelSerializer):
+class EmployeeBenefitSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     benefit_name = serializers.CharField(source='benefit.name', read_only=True)
 
@@ -129,37 +219,35 @@ class EmployeeBenefitSerializer(serializers.ModelSerializer):
         model = EmployeeBenefit
         fields = '__all__'
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     approved_by_name = serializers.CharField(source='approved_by.get_full_name', read_only=True)
+    receipt_thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Expense
         fields = '__all__'
-        read_only_fields = ('employee', 'submitted_date', 'approved_by', 'approved_date')
+        read_only_fields = ('employee', 'department', 'submitted_date', 'approved_by', 'approved_date', 'receipt_hash', 'duplicate_of')
 
-class ProjectTeamSerializer(serializers.ModelSerializer):
+    def get_receipt_thumbnail(self, obj):
+        # Thumbnails are generated in the background, so they may not exist yet
+        if not obj.receipt_hash:
+            return None
+        name = receipt_thumbnail_name(obj.receipt_hash)
+        if not receipt_storage.exists(name):
+            return None
+        url = receipt_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class ProjectTeamSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
 
     class Meta:
         model = ProjectTeam
         fields = '__all__'
 
-class ProjectSerializer(serializers.ModelSerializer):
-    manager_name = serializers.CharField(source='manager.get_full_name', read_only=True)
-    team_members = ProjectTeamSerializer(many=True, read_only=True)
-    tasks = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Project
-        fields = '__all__'
-
-    def get_tasks(self, obj):
-        from .serializers import TaskSerializer  # Import here to avoid circular import
-        tasks = obj.tasks.all()
-        return TaskSerializer(tasks, many=True, context=self.context).data
-
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsModelSerializer):
     assigned_to_name = serializers.CharField(source='assigned_to.user.get_full_name', read_only=True)
     assigned_by_name = serializers.CharField(source='assigned_by.get_full_name', read_only=True)
     project_name = serializers.CharField(source='project.name', read_only=True)
@@ -168,14 +256,23 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = '__all__'
 
-class KPIMetricSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsModelSerializer):
+    manager_name = serializers.CharField(source='manager.get_full_name', read_only=True)
+    team_members = ProjectTeamSerializer(many=True, read_only=True)
+    tasks = TaskSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Project
+        fields = '__all__'
+
+class KPIMetricSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
 
     class Meta:
         model = KPIMetric
         fields = '__all__'
 
-class PerformanceReviewSerializer(serializers.ModelSerializer):
+class PerformanceReviewSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     reviewer_name = serializers.CharField(source='reviewer.get_full_name', read_only=True)
 
@@ -183,7 +280,7 @@ class PerformanceReviewSerializer(serializers.ModelSerializer):
         model = PerformanceReview
         fields = '__all__'
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     course_title = serializers.CharField(source='course.title', read_only=True)
 
@@ -191,21 +288,21 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         model = Enrollment
         fields = '__all__'
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsModelSerializer):
     enrollments = EnrollmentSerializer(many=True, read_only=True)
 
     class Meta:
         model = Course
         fields = '__all__'
 
-class TaxRecordSerializer(serializers.ModelSerializer):
+class TaxRecordSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
 
     class Meta:
         model = TaxRecord
         fields = '__all__'
 
-class LeaveRequestSerializer(serializers.ModelSerializer):
+class LeaveRequestSerializer(DynamicFieldsModelSerializer):
     employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
     approved_by_name = serializers.CharField(source='approved_by.get_full_name', read_only=True)
 
@@ -226,9 +323,53 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
             days_requested = (end_date - start_date).days + 1
             data['days_requested'] = days_requested
 
+        self.validate_no_overlap(data)
         return data
 
-class BudgetSerializer(serializers.ModelSerializer):
+    def get_request_employee(self):
+        if self.instance is not None:
+            return self.instance.employee
+        request = self.context.get('request')
+        if request is None:
+            return None
+        try:
+            return request.user.employee_profile
+        except (Employee.DoesNotExist, AttributeError):
+            return None
+
+    def validate_no_overlap(self, data):
+        """Reject leave that overlaps another pending/approved request of the same employee"""
+        instance = self.instance
+        start_date = data.get('start_date', instance.start_date if instance else None)
+        end_date = data.get('end_date', instance.end_date if instance else None)
+        status = data.get('status', instance.status if instance else 'pending')
+        if not start_date or not end_date or status not in LeaveRequest.ACTIVE_STATUSES:
+            return
+
+        employee = self.get_request_employee()
+        if employee is None:
+            return
+
+        # Served by the (employee, start_date, end_date) index
+        conflicts = LeaveRequest.objects.filter(employee=employee).active().overlapping(start_date, end_date)
+        if instance is not None:
+            conflicts = conflicts.exclude(pk=instance.pk)
+        conflict = conflicts.order_by('start_date').values('id', 'start_date', 'end_date').first()
+        if conflict:
+            raise serializers.ValidationError(
+                f"Leave overlaps an existing request (#{conflict['id']}: "
+                f"{conflict['start_date']} to {conflict['end_date']})."
+            )
+
+class LeaveBalanceSerializer(DynamicFieldsModelSerializer):
+    employee_name = serializers.CharField(source='employee.user.get_full_name', read_only=True)
+    available = serializers.DecimalField(max_digits=6, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = LeaveBalance
+        fields = '__all__'
+
+class BudgetSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Budget
         fields = '__all__'
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters VALUES ('bytes', 0), ('hits', 0), ('misses', 0), ('sets', 0), ('evictions', 0);
+-- Keeps the total size current without a SUM() over the table on every write
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE counters SET value = value + new.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE counters SET value = value + new.size - old.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE counters SET value = value - old.size WHERE name = 'bytes';
+END;
+"""
+
+# Paths whose schema this process has already checked
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+class SharedCache(BaseCache):
+    """Cache in a SQLite file in WAL mode, shared by every process on the host that points at it.
+
+    Readers never block the (short) writes. When the stored values pass OPTIONS['MAX_SIZE'] bytes,
+    expired entries and then the least recently used ones are removed until the cache is back
+    under CULL_TARGET of that. Reads refresh an entry's last-use time at most every
+    TOUCH_INTERVAL seconds, so hot keys don't turn every hit into a write.
+
+    Hit/miss counts are kept per process and added to the shared totals every STATS_INTERVAL
+    seconds; see stats() and `python manage.py cache_stats`.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = str(location)
+        self.max_size = options.get('MAX_SIZE', 64 * 1024 * 1024)
+        self.cull_target = options.get('CULL_TARGET', 0.9)
+        self.touch_interval = options.get('TOUCH_INTERVAL', 5)
+        self.stats_interval = options.get('STATS_INTERVAL', 10)
+        self.local = threading.local()
+
+    def connection(self):
+        local = self.local
+        # A connection must not be used across a fork, so a worker opens its own
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Losing the last writes on a power cut is fine for a cache
+            conn.execute('PRAGMA synchronous=OFF')
+            with _ready_lock:
+                if self.path not in _ready:
+                    conn.executescript(SCHEMA)
+                    _ready.add(self.path)
+            local.conn, local.pid = conn, os.getpid()
+            local.pending = {'hits': 0, 'misses': 0, 'sets': 0}
+            local.flushed_at = time.monotonic()
+        return local.conn
+
+    @contextmanager
+    def write(self):
+        conn = self.connection()
+        # IMMEDIATE takes the write lock up front, so read-modify-write steps like incr() are atomic
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            self.flush_stats(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def flush_stats(self, conn):
+        pending = self.local.pending
+        conn.executemany('UPDATE counters SET value = value + ? WHERE name = ?',
+                         [(count, name) for name, count in pending.items() if count])
+        self.local.pending = dict.fromkeys(pending, 0)
+        self.local.flushed_at = time.monotonic()
+
+    def count(self, name, amount=1):
+        self.local.pending[name] += amount
+        if time.monotonic() - self.local.flushed_at > self.stats_interval:
+            with self.write():
+                pass
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        conn = self.connection()
+        now = time.time()
+        rows = conn.execute(
+            f'SELECT key, value, expires, accessed FROM entries WHERE key IN ({",".join("?" * len(key_map))})',
+            list(key_map),
+        ).fetchall()
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key_map[key]] = pickle.loads(value)
+            if now - accessed > self.touch_interval:
+                stale.append((now, key))
+        if stale:
+            # Plain autocommit statement: the last-use time only steers eviction
+            conn.executemany('UPDATE entries SET accessed = ? WHERE key = ?', stale)
+        self.count('hits', len(found))
+        self.count('misses', len(key_map) - len(found))
+        return found
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.connection().execute('SELECT expires FROM entries WHERE key = ?', (key,)).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = []
+        for key, value in data.items():
+            key = self.make_and_validate_key(key, version=version)
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            rows.append((key, blob, len(key) + len(blob), expires, now))
+        with self.write() as conn:
+            # A value that could never fit is dropped, like memcached's item size limit
+            conn.executemany('DELETE FROM entries WHERE key = ?', [(row[0],) for row in rows if row[2] > self.max_size])
+            rows = [row for row in rows if row[2] <= self.max_size]
+            conn.executemany(
+                'INSERT INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, '
+                'expires = excluded.expires, accessed = excluded.accessed',
+                rows,
+            )
+            self.local.pending['sets'] += len(rows)
+            self.cull(conn, now)
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self.write() as conn:
+            # Only takes over an existing row if it has expired
+            cursor = conn.execute(
+                'INSERT INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, '
+                'expires = excluded.expires, accessed = excluded.accessed '
+                'WHERE entries.expires IS NOT NULL AND entries.expires <= excluded.accessed',
+                (key, blob, len(key) + len(blob), self.get_backend_timeout(timeout), now),
+            )
+            added = cursor.rowcount == 1
+            if added:
+                self.local.pending['sets'] += 1
+                self.cull(conn, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.write() as conn:
+            row = conn.execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found.")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            conn.execute('UPDATE entries SET value = ?, size = ?, accessed = ? WHERE key = ?',
+                         (blob, len(key) + len(blob), time.time(), key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self.write() as conn:
+            cursor = conn.execute(
+                'UPDATE entries SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            )
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        with self.write() as conn:
+            deleted = sum(conn.execute('DELETE FROM entries WHERE key = ?', key).rowcount for key in keys)
+        return deleted > 0
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version=version)
+
+    def clear(self):
+        with self.write() as conn:
+            conn.execute('DELETE FROM entries')
+
+    def cull(self, conn, now):
+        """Inside a write: bring the cache back under CULL_TARGET * MAX_SIZE if it went over MAX_SIZE"""
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_size:
+            return
+        target = self.max_size * self.cull_target
+        # Expired entries go first; culling well below the limit keeps this scan rare
+        conn.execute('DELETE FROM entries WHERE expires <= ?', (now,))
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (len(victims),))
+
+    def stats(self):
+        """Totals across all processes, including this one's unflushed counts"""
+        with self.write() as conn:
+            self.flush_stats(conn)
+            counters = dict(conn.execute('SELECT name, value FROM counters'))
+            entries = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'bytes': counters['bytes'],
+            'max_bytes': self.max_size,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': counters['hits'] / lookups if lookups else None,
+            'sets': counters['sets'],
+            'evictions': counters['evictions'],
+        }
+
+    def reset_stats(self):
+        with self.write() as conn:
+            self.local.pending = dict.fromkeys(self.local.pending, 0)
+            conn.execute("UPDATE counters SET value = 0 WHERE name IN ('hits', 'misses', 'sets', 'evictions')")
@@ -0,0 +1,80 @@
+from django.apps import apps
+from django.db import router
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+from .models import (
+    User, Employee, Expense, ExpenseRollup, ModelVersion, Change, RevokedToken, ArchiveWatermark,
+    ArchivedRecord, ArchivedAttendance, ArchivedPayroll,
+)
+
+
+@receiver(post_delete, sender=Expense)
+def remove_expense_from_rollup(sender, instance, **kwargs):
+    # Also covers cascades (e.g. deleting an employee), which bypass Expense.delete()
+    entry = getattr(instance, '_loaded_rollup_entry', None) or instance.rollup_entry()
+    ExpenseRollup.apply_changes([(entry, None)])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    # Covers password, role and is_active changes for CachedJWTAuthentication
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_authenticated_employee(sender, instance, **kwargs):
+    # The cached user carries their employee id
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Employee)
+def delete_archived_history(sender, instance, **kwargs):
+    # The hot rows went with the employee (CASCADE); the archive has no foreign keys to do the same
+    if ArchiveWatermark.objects.exists():
+        ArchivedAttendance.objects.filter(employee_id=instance.pk).delete()
+        ArchivedPayroll.objects.filter(employee_id=instance.pk).delete()
+
+
+def bump_model_version(sender, **kwargs):
+    # Invalidates cached responses that include this model (see ResponseCacheMixin)
+    ModelVersion.bump(sender)
+
+
+def start_version_epoch(sender, using, **kwargs):
+    # A fresh or flushed database must not reuse cache keys built against an earlier one
+    if not router.allow_migrate_model(using, ModelVersion):
+        return
+    try:
+        kwargs['apps'].get_model('hr_app', 'ModelVersion')
+    except LookupError:
+        # Migrated back to before the table existed
+        return
+    ModelVersion.start_epoch(using)
+
+
+post_migrate.connect(start_version_epoch, sender=apps.get_app_config('hr_app'))
+
+
+def record_change(sender, instance, **kwargs):
+    # Lets /api/changes/ send the row to clients syncing this resource
+    Change.record(sender, [instance])
+
+
+def record_deletion(sender, instance, **kwargs):
+    # Lets /api/changes/ tell clients that already have the row to drop it
+    Change.record(sender, [instance], deleted=True)
+
+
+# Connected per model rather than for every sender, so bookkeeping models (and other apps)
+# keep Django's fast-path bulk delete
+for model in apps.get_app_config('hr_app').get_models():
+    if model in (ModelVersion, Change, RevokedToken, ArchiveWatermark) or issubclass(model, ArchivedRecord):
+        continue
+    post_save.connect(bump_model_version, sender=model)
+    post_delete.connect(bump_model_version, sender=model)
+    if Change.is_tracked(model):
+        post_save.connect(record_change, sender=model)
+        post_delete.connect(record_deletion, sender=model)
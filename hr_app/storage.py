@@ -0,0 +1,48 @@
+import hashlib
+import os
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+RECEIPT_DIR = 'receipts'
+THUMBNAIL_DIR = 'receipts/thumbs'
+
+
+def hash_file(file):
+    """SHA-256 of an uploaded file, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_path(directory, digest, extension):
+    # Two levels of 256 directories keep any one directory small
+    return f'{directory}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def receipt_upload_to(instance, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return sharded_path(RECEIPT_DIR, instance.receipt_hash, extension)
+
+
+def receipt_thumbnail_name(digest):
+    return sharded_path(THUMBNAIL_DIR, digest, '.jpg')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage where the name is derived from the content, so identical uploads share one file"""
+
+    def get_available_name(self, name, max_length=None):
+        # A name collision means the same bytes are already stored; reuse them instead of renaming
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+receipt_storage = ContentAddressedStorage()
@@ -1,3 +1,1708 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from base64 import b64encode
+from concurrent.futures import Future
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections, models, transaction
+from django.db.utils import ConnectionHandler
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import msgpack
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from hr_backend.settings.database import SQLITE_PRAGMAS, sqlite_database
+from . import analytics, authentication, batch, revocation, throttling
+from .analytics import analytics_reads
+from .archive import ARCHIVES, archive_rows
+from .authentication import get_hash_executor, verify_password_bounded
+from .changes import encode_cursor, latest_cursor
+from .middleware import fingerprint
+from .mixins import _lookup_cache, get_related_lookups
+from .models import (
+    User, Employee, Attendance, Deduction, Payroll, PaySlip, JobPosting, Candidate, Benefit, EmployeeBenefit, Expense,
+    ExpenseRollup, Project, ProjectTeam, Task, PerformanceReview, Course, Enrollment, TaxRecord, Budget, LeaveRequest,
+    LeaveBalance, ModelVersion, Change, ArchiveWatermark, ArchivedAttendance, ArchivedPayroll,
+)
+from .renderers import FastJSONRenderer, StreamingExportRenderer, escape_formula
+from .routers import AnalyticsRouter
+from .serializers import PaySlipSerializer, ProjectSerializer
+from .shared_cache import SharedCache
+from .storage import receipt_storage, receipt_thumbnail_name
+from .thumbnails import _thumbnail_done, render_thumbnail
+from .throttling import PublicReadThrottle
+from .views import AttendanceViewSet, LeaveRequestViewSet
 
-# Create your tests here.
+# Tests keep their cache and throttle buckets in memory instead of the shared files next to the project
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+TEST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class HRTestMixin:
+    def make_user(self, username, role='employee', department='Engineering'):
+        user = User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='pass12345',
+            first_name=username.title(), last_name='Test', role=role, department=department,
+        )
+        employee = Employee.objects.create(user=user, position='Engineer', hire_date=date(2020, 1, 1), salary=5000)
+        return user, employee
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=TEST_HASHERS)
+class HRTestCase(HRTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(throttling, 'store', throttling.TokenBucketStore(None, settings.THROTTLE_STORE_SLOTS))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class BulkWriteTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+        self.expense = Expense.objects.create(
+            employee=self.employee, title='Taxi', description='Airport', amount='25.00', category='travel'
+        )
+        self.leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='annual', start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 3), days_requested=2, reason='Trip',
+        )
+        LeaveBalance.objects.create(employee=self.employee, leave_type='annual', year=2026, accrued=10)
+
+    def test_employee_cannot_bulk_approve_expenses(self):
+        response = self.client_for(self.user).patch(
+            '/api/expenses/bulk/', [{'id': self.expense.id, 'status': 'approved'}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.status, 'pending')
+
+    def test_manager_bulk_approval_stamps_expenses(self):
+        response = self.client_for(self.manager).patch(
+            '/api/expenses/bulk/', [{'id': self.expense.id, 'status': 'approved'}], format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.status, 'approved')
+        self.assertEqual(self.expense.approved_by, self.manager)
+        self.assertIsNotNone(self.expense.approved_date)
+
+    def test_employee_can_bulk_edit_own_expenses(self):
+        response = self.client_for(self.user).patch(
+            '/api/expenses/bulk/', [{'id': self.expense.id, 'title': 'Train'}], format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.title, 'Train')
+
+    def test_employee_cannot_bulk_approve_leave(self):
+        response = self.client_for(self.user).patch(
+            '/api/leave-requests/bulk/', [{'id': self.leave.id, 'status': 'approved'}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, 'pending')
+        self.assertEqual(LeaveBalance.objects.get().used, 0)
+
+    def test_manager_bulk_approval_stamps_leave_and_debits(self):
+        response = self.client_for(self.manager).patch(
+            '/api/leave-requests/bulk/', [{'id': self.leave.id, 'status': 'approved'}], format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.approved_by, self.manager)
+        self.assertEqual(LeaveBalance.objects.get().used, 2)
+
+
+    def test_booleans_are_not_ids(self):
+        admin, _ = self.make_user('admin', role='admin')
+        client = self.client_for(admin)
+        course = Course.objects.create(pk=1, title='Safety', description='Basics', duration_hours=1, category='other')
+
+        response = client.delete('/api/courses/bulk/', [True], format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.patch('/api/courses/bulk/', [{'id': True, 'title': 'Renamed'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        course.refresh_from_db()
+        self.assertEqual(course.title, 'Safety')
+
+class LeaveLedgerTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+        self.leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='annual', start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 4), days_requested=3, reason='Trip',
+        )
+        self.balance = LeaveBalance.objects.create(employee=self.employee, leave_type='annual', year=2026, accrued=10)
+
+    def approve(self):
+        return self.client_for(self.manager).patch(
+            f'/api/leave-requests/{self.leave.id}/', {'status': 'approved'}, format='json'
+        )
+
+    def test_approval_debits_once(self):
+        self.assertEqual(self.approve().status_code, 200)
+        self.assertEqual(self.approve().status_code, 200)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.used, 3)
+
+    def test_approval_from_stale_read_does_not_debit_twice(self):
+        # The second reviewer loaded the request while it was still pending
+        stale = LeaveRequest.objects.get(pk=self.leave.pk)
+        self.assertEqual(self.approve().status_code, 200)
+        with mock.patch.object(LeaveRequestViewSet, 'get_object', return_value=stale):
+            self.assertEqual(self.approve().status_code, 200)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.used, 3)
+
+    def test_rejecting_approved_leave_credits(self):
+        self.approve()
+        response = self.client_for(self.manager).patch(
+            f'/api/leave-requests/{self.leave.id}/', {'status': 'rejected'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.used, 0)
+
+    def test_insufficient_balance_rolls_back(self):
+        self.balance.accrued = 2
+        self.balance.save()
+        self.assertEqual(self.approve().status_code, 400)
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, 'pending')
+
+    def test_delete_from_stale_read_credits_stored_charge(self):
+        stale = LeaveRequest.objects.get(pk=self.leave.pk)
+        self.approve()
+        with mock.patch.object(LeaveRequestViewSet, 'get_object', return_value=stale):
+            response = self.client_for(self.manager).delete(f'/api/leave-requests/{self.leave.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.used, 0)
+
+
+class LeaveBalanceBackfillTests(HRTestCase):
+    """Migration 0006 opens the ledger for employees who had none"""
+
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+        self.year = date.today().year
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type='annual', start_date=date(self.year - 1, 6, 1),
+            end_date=date(self.year - 1, 6, 3), days_requested=3, reason='Trip', status='approved',
+        )
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type='sick', start_date=date(self.year, 1, 1),
+            end_date=date(self.year, 1, 1), days_requested=1, reason='Flu', status='approved',
+        )
+        self.pending = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='annual', start_date=date(self.year, 1, 5),
+            end_date=date(self.year, 1, 5), days_requested=1, reason='Errand',
+        )
+        backfill = import_module('hr_app.migrations.0006_leavebalance').backfill_balances
+        self.assertFalse(LeaveBalance.objects.exists())
+        backfill(django_apps, None)
+
+    def balance(self, leave_type, year):
+        return LeaveBalance.objects.get(employee=self.employee, leave_type=leave_type, year=year)
+
+    def test_rows_are_opened_with_this_years_accrual(self):
+        month = date.today().month
+        annual, sick = self.balance('annual', self.year), self.balance('sick', self.year)
+        self.assertEqual((annual.accrued, annual.used), (Decimal('1.75') * month, 0))
+        self.assertEqual((sick.accrued, sick.used), (Decimal('1.00') * month, 1))
+        self.assertEqual(annual.last_accrual_date, date.today().replace(day=1))
+        self.assertEqual(self.balance('annual', self.year - 1).used, 3)
+
+    def test_leave_can_be_requested_and_approved_afterwards(self):
+        response = self.client_for(self.user).post('/api/leave-requests/', {
+            'leave_type': 'annual', 'start_date': f'{self.year}-01-08', 'end_date': f'{self.year}-01-08',
+            'days_requested': 1, 'reason': 'Errand',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client_for(self.manager).patch(
+            f'/api/leave-requests/{self.pending.id}/', {'status': 'approved'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.balance('annual', self.year).used, 1)
+
+
+class BulkReviewTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+        self.expenses = [
+            Expense.objects.create(employee=self.employee, title=f'Taxi {i}', description='Airport',
+                                   amount='25.00', category='travel')
+            for i in range(3)
+        ]
+
+    def review(self, user, data):
+        return self.client_for(user).post('/api/expenses/bulk-review/', data, format='json')
+
+    def test_manager_approves_many(self):
+        ids = [expense.id for expense in self.expenses]
+        response = self.review(self.manager, {'status': 'approved', 'ids': ids + [ids[0]]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Expense.objects.filter(status='approved', approved_by=self.manager).count(), 3)
+        # Already reviewed items are reported, not reviewed again
+        response = self.review(self.manager, {'status': 'rejected', 'ids': ids[:1]})
+        self.assertEqual(response.json()['results'], [{'id': ids[0], 'ok': False, 'error': 'Already approved.'}])
+        self.assertEqual(Expense.objects.filter(status='approved').count(), 3)
+
+    def test_leave_review_debits_what_the_balance_allows(self):
+        LeaveBalance.objects.create(employee=self.employee, leave_type='annual', year=2026, accrued=5)
+        leaves = [
+            LeaveRequest.objects.create(employee=self.employee, leave_type='annual', start_date=date(2026, 4, day),
+                                        end_date=date(2026, 4, day + 2), days_requested=3, reason='Trip')
+            for day in (1, 10)
+        ]
+        response = self.client_for(self.manager).post(
+            '/api/leave-requests/bulk-review/', {'status': 'approved', 'ids': [leave.id for leave in leaves]},
+            format='json'
+        )
+        self.assertEqual([row['ok'] for row in response.json()['results']], [True, False])
+        self.assertEqual(LeaveBalance.objects.get().used, 3)
+
+    def test_employee_is_refused(self):
+        response = self.review(self.user, {'status': 'approved', 'ids': [self.expenses[0].id]})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Expense.objects.filter(status='approved').exists())
+
+    def test_ids_must_be_a_list_of_integers(self):
+        pk = self.expenses[0].id
+        for ids in [None, str(pk), [str(pk)], ['abc'], [True], [pk, 1.5], [], {'id': pk}]:
+            with self.subTest(ids=ids):
+                data = {'status': 'approved'}
+                if ids is not None:
+                    data['ids'] = ids
+                self.assertEqual(self.review(self.manager, data).status_code, 400)
+        self.assertFalse(Expense.objects.filter(status='approved').exists())
+
+    def test_status_must_be_a_review_outcome(self):
+        response = self.review(self.manager, {'status': 'reimbursed', 'ids': [self.expenses[0].id]})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExpenseRollupTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+
+    def assertRollupsMatch(self):
+        counts = {}
+        for expense in Expense.objects.all():
+            key = expense.rollup_entry()[:4]
+            count, total = counts.get(key, (0, 0))
+            counts[key] = (count + 1, total + expense.amount)
+        rollups = {
+            (row.department, row.category, row.month, row.status): (row.count, row.total)
+            for row in ExpenseRollup.objects.exclude(count=0)
+        }
+        self.assertEqual(rollups, counts)
+
+    def create_expense(self, amount='10.50'):
+        return Expense.objects.create(employee=self.employee, title='Taxi', description='Airport',
+                                      amount=amount, category='travel')
+
+    def test_api_changes_keep_rollups_in_step(self):
+        client, manager_client = self.client_for(self.user), self.client_for(self.manager)
+        ids = [
+            client.post('/api/expenses/', {'title': 'Taxi', 'description': 'Airport', 'amount': '10.50',
+                                           'category': 'travel'}, format='json').json()['id']
+            for _ in range(3)
+        ]
+        manager_client.patch(f'/api/expenses/{ids[0]}/', {'status': 'approved'}, format='json')
+        manager_client.post('/api/expenses/bulk-review/', {'ids': ids[1:], 'status': 'rejected'}, format='json')
+        client.patch(f'/api/expenses/{ids[0]}/', {'amount': '20.00'}, format='json')
+        Expense.objects.get(pk=ids[2]).delete()
+        self.assertRollupsMatch()
+
+        response = manager_client.get('/api/expenses/analytics/?group_by=status')
+        self.assertEqual(
+            {row['status']: row['count'] for row in response.json()['results'] if row['count']},
+            {'approved': 1, 'rejected': 1},
+        )
+        self.assertEqual(client.get('/api/expenses/analytics/').status_code, 403)
+
+    def test_save_from_stale_instance_moves_the_stored_entry(self):
+        expense = self.create_expense()
+        stale = Expense.objects.get(pk=expense.pk)
+        expense.status = 'approved'
+        expense.save()
+        # Writes the stale 'pending' status back over 'approved'
+        stale.amount = Decimal('12.00')
+        stale.save()
+        self.assertRollupsMatch()
+
+
+class RelatedLookupTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        for index in range(4):
+            approver, employee = self.make_user(f'approver{index}', role='manager')
+            Expense.objects.create(employee=employee, title='Taxi', description='Airport', amount='25.00',
+                                   category='travel', status='approved', approved_by=approver)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_for(self.admin).get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_expand_does_not_reuse_plain_lookups(self):
+        url = '/api/expenses/?expand=approved_by'
+        _lookup_cache.clear()
+        expected = self.count_queries(url)
+        _lookup_cache.clear()
+        self.count_queries('/api/expenses/')
+        self.assertEqual(self.count_queries(url), expected)
+
+
+class ResponseCacheTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.user, self.employee = self.make_user('employee')
+        self.other, _ = self.make_user('other')
+        Expense.objects.create(employee=self.employee, title='Taxi', description='Airport', amount='25.00',
+                               category='travel')
+
+    def get(self, user, url='/api/expenses/'):
+        return self.client_for(user).get(url)
+
+    def test_hits_until_a_model_changes(self):
+        self.assertEqual(self.get(self.user)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(self.user)['X-Cache'], 'HIT')
+        Expense.objects.create(employee=self.employee, title='Hotel', description='Night', amount='90.00',
+                               category='travel')
+        response = self.get(self.user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_related_model_changes_invalidate(self):
+        self.get(self.user)
+        self.employee.position = 'Lead'
+        self.employee.save()
+        self.assertEqual(self.get(self.user)['X-Cache'], 'MISS')
+
+    def test_entries_are_scoped_per_user(self):
+        self.get(self.user)
+        response = self.get(self.other)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_written_thumbnail_invalidates_expense_responses(self):
+        self.get(self.user)
+        future = Future()
+        future.set_result(True)
+        _thumbnail_done(threading.get_ident(), future)
+        self.assertEqual(self.get(self.user)['X-Cache'], 'MISS')
+
+    def test_skipped_thumbnail_keeps_entries(self):
+        self.get(self.user)
+        future = Future()
+        future.set_result(False)
+        _thumbnail_done(threading.get_ident(), future)
+        self.assertEqual(self.get(self.user)['X-Cache'], 'HIT')
+
+
+@override_settings(CHANGES_CURSOR_OVERLAP_SECONDS=0)
+class ChangesFeedTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.user, self.employee = self.make_user('employee')
+        self.other, self.other_employee = self.make_user('other')
+        self.since = encode_cursor(latest_cursor())
+
+    def get_changes(self, user, query=''):
+        response = self.client_for(user).get(f'/api/changes/?since={self.since}{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def changes(self, user, query=''):
+        return self.get_changes(user, query)['changes']
+
+    def create_expense(self, employee):
+        return Expense.objects.create(employee=employee, title='Taxi', description='Airport', amount='25.00',
+                                      category='travel')
+
+    def test_upserts_follow_the_caller_scope(self):
+        own, other = self.create_expense(self.employee), self.create_expense(self.other_employee)
+        ids = [row['id'] for row in self.changes(self.user, '&resources=expenses')['expenses']['upserts']]
+        self.assertEqual(ids, [own.id])
+        ids = [row['id'] for row in self.changes(self.admin, '&resources=expenses')['expenses']['upserts']]
+        self.assertEqual(sorted(ids), sorted([own.id, other.id]))
+
+    def test_deletions_follow_the_caller_scope(self):
+        own, other = self.create_expense(self.employee), self.create_expense(self.other_employee)
+        own_id, other_id = own.id, other.id
+        own.delete()
+        other.delete()
+        self.assertEqual(self.changes(self.user, '&resources=expenses')['expenses']['deleted'], [own_id])
+        self.assertEqual(self.changes(self.other, '&resources=expenses')['expenses']['deleted'], [other_id])
+        self.assertEqual(sorted(self.changes(self.admin, '&resources=expenses')['expenses']['deleted']),
+                         sorted([own_id, other_id]))
+
+    def test_employees_do_not_see_other_deletions(self):
+        other = self.create_expense(self.other_employee)
+        other.delete()
+        self.assertNotIn('expenses', self.changes(self.user, '&resources=expenses'))
+
+    def test_shared_resources_report_deletions_to_everyone(self):
+        benefit = Benefit.objects.create(name='Gym', description='Membership', category='health')
+        benefit_id = benefit.id
+        benefit.delete()
+        self.assertEqual(self.changes(self.user, '&resources=benefits')['benefits']['deleted'], [benefit_id])
+
+    def test_user_deletions_are_not_reported_to_employees(self):
+        removed, _ = self.make_user('removed')
+        removed.delete()
+        self.assertNotIn('users', self.changes(self.user, '&resources=users'))
+
+    def test_rows_committed_after_the_cursor_are_reported(self):
+        # A long transaction stamps updated_at well before it commits; the change log id is
+        # taken at write time, after any cursor handed out while the transaction was open
+        expense = self.create_expense(self.employee)
+        Expense.objects.filter(pk=expense.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        body = self.get_changes(self.user, '&resources=expenses')
+        self.assertEqual([row['id'] for row in body['changes']['expenses']['upserts']], [expense.id])
+        # The returned cursor moves past it
+        self.since = body['cursor']
+        self.assertEqual(self.changes(self.user), {})
+
+    def test_bulk_writes_are_reported(self):
+        expenses = [self.create_expense(self.employee) for _ in range(2)]
+        LeaveBalance.objects.create(employee=self.employee, leave_type='annual', year=2026, accrued=5)
+        self.since = encode_cursor(latest_cursor())
+        response = self.client_for(self.admin).post(
+            '/api/expenses/bulk-review/', {'status': 'approved', 'ids': [expense.id for expense in expenses]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(LeaveBalance.debit(self.employee.pk, 'annual', 2026, 2))
+        changes = self.changes(self.user, '&resources=expenses,leave-balances')
+        self.assertEqual([row['status'] for row in changes['expenses']['upserts']], ['approved', 'approved'])
+        self.assertEqual([row['used'] for row in changes['leave-balances']['upserts']], ['2.00'])
+
+    def test_cursor_errors(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(client.get('/api/changes/?since=zzz').status_code, 400)
+        self.assertEqual(client.get('/api/changes/?resources=nope').status_code, 400)
+        # Ahead of the log, e.g. after restoring a backup
+        ahead = encode_cursor(latest_cursor() + 1)
+        self.assertEqual(client.get(f'/api/changes/?since={ahead}').status_code, 410)
+        self.create_expense(self.employee)
+        self.create_expense(self.employee)
+        with override_settings(CHANGES_MAX_ROWS=1):
+            self.assertEqual(client.get(f'/api/changes/?since={self.since}').status_code, 410)
+        # Entries after the cursor were pruned
+        Change.objects.filter(id__lte=latest_cursor() - 1).delete()
+        self.assertEqual(client.get(f'/api/changes/?since={self.since}').status_code, 410)
+
+    def test_prune_keeps_the_newest_entry(self):
+        self.create_expense(self.employee)
+        latest = latest_cursor()
+        Change.objects.update(changed_at=timezone.now() - timedelta(days=settings.CHANGES_RETENTION_DAYS + 1))
+        call_command('prune_changes', stdout=io.StringIO())
+        self.assertEqual(list(Change.objects.values_list('id', flat=True)), [latest])
+        # A client that was up to date can carry on
+        self.since = encode_cursor(latest)
+        self.assertEqual(self.changes(self.admin), {})
+
+
+class ExportTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, self.employee = self.make_user('admin', role='admin')
+
+    def export(self, url):
+        response = self.client_for(self.admin).get(url)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_every_row(self):
+        Attendance.objects.bulk_create([
+            Attendance(employee=self.employee, date=date(2025, 1, 1) + timedelta(days=day), status='present')
+            for day in range(settings.EXPORT_CHUNK_SIZE + 3)
+        ])
+        rows = list(csv.reader(io.StringIO(self.export('/api/attendance/?format=csv&fields=id,date,status'))))
+        self.assertEqual(rows[0], ['id', 'date', 'status'])
+        self.assertEqual(len(rows), settings.EXPORT_CHUNK_SIZE + 4)
+
+    def test_ndjson_has_one_object_per_line(self):
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 1), status='present')
+        lines = self.export('/api/attendance/?format=ndjson&fields=id,date').splitlines()
+        self.assertEqual([set(json.loads(line)) for line in lines], [{'id', 'date'}])
+
+    def test_csv_cells_cannot_start_formulas(self):
+        Expense.objects.create(employee=self.employee, title='=HYPERLINK("http://example.com")',
+                               description='@SUM(A1:A2)', amount='-12.50', category='travel')
+        rows = list(csv.DictReader(io.StringIO(self.export('/api/expenses/?format=csv'))))
+        self.assertEqual(rows[0]['title'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[0]['description'], "'@SUM(A1:A2)")
+        self.assertEqual(rows[0]['amount'], '-12.50')
+        self.assertEqual(escape_formula('+1+cmd|calc'), "'+1+cmd|calc")
+        self.assertEqual(escape_formula('-'), "'-")
+        self.assertEqual(escape_formula(5), 5)
+
+    def test_streaming_renderers_must_render_rows(self):
+        class IncompleteRenderer(StreamingExportRenderer):
+            media_type = 'text/plain'
+
+        with self.assertRaises(TypeError):
+            IncompleteRenderer()
+
+
+class ThrottleTests(HRTestCase):
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        # Job postings allow 120/min per address; a fresh X-Forwarded-For per request must not reset it
+        statuses = [
+            self.client.get('/api/job-postings/', HTTP_X_FORWARDED_FOR=f'198.51.100.{index}',
+                            REMOTE_ADDR='203.0.113.7').status_code
+            for index in range(121)
+        ]
+        self.assertNotIn(429, statuses[:120])
+        self.assertEqual(statuses[120], 429)
+
+    def test_behind_a_proxy_the_last_forwarded_address_is_used(self):
+        request = APIRequestFactory().get('/', HTTP_X_FORWARDED_FOR='198.51.100.1, 192.0.2.9',
+                                          REMOTE_ADDR='10.0.0.1')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.assertEqual(PublicReadThrottle().get_ident(request), '192.0.2.9')
+        self.assertEqual(PublicReadThrottle().get_ident(request), '10.0.0.1')
+
+    def test_signed_in_users_are_not_limited_per_address(self):
+        user, _ = self.make_user('employee')
+        request = APIRequestFactory().get('/')
+        request.user = user
+        self.assertIsNone(PublicReadThrottle().get_cache_key(request, None))
+
+    def test_token_bucket_refills(self):
+        store = throttling.TokenBucketStore(None, 64)
+        self.assertEqual([store.take('key', 2, 1, now=100) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(store.take('key', 2, 1, now=100), 1)
+        self.assertEqual(store.take('key', 2, 1, now=101), 0)
+        self.assertEqual(store.take('other', 2, 1, now=100), 0)
+
+
+class SharedCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+
+    def make_cache(self, **options):
+        return SharedCache(self.path, {'OPTIONS': {'STATS_INTERVAL': 0, **options}})
+
+    def test_basic_operations(self):
+        shared = self.make_cache()
+        self.assertIsNone(shared.get('a'))
+        shared.set('a', {'x': 1})
+        self.assertEqual(shared.get('a'), {'x': 1})
+        self.assertFalse(shared.add('a', 2))
+        self.assertTrue(shared.add('b', 2))
+        self.assertEqual(shared.incr('b', 3), 5)
+        with self.assertRaises(ValueError):
+            shared.incr('missing')
+        self.assertEqual(shared.get_many(['a', 'b', 'missing']), {'a': {'x': 1}, 'b': 5})
+        self.assertTrue(shared.delete('a'))
+        self.assertFalse(shared.has_key('a'))
+        shared.set('expired', 1, 0)
+        self.assertIsNone(shared.get('expired'))
+
+    def test_processes_opening_the_file_share_entries(self):
+        self.make_cache().set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        shared = self.make_cache(MAX_SIZE=50_000, TOUCH_INTERVAL=0)
+        shared.set('hot', b'h' * 1000)
+        for index in range(100):
+            shared.set(f'key{index}', b'v' * 1000)
+            shared.get('hot')
+        self.assertIsNotNone(shared.get('hot'))
+        self.assertIsNone(shared.get('key0'))
+        self.assertIsNotNone(shared.get('key99'))
+        stats = shared.stats()
+        self.assertLessEqual(stats['bytes'], 50_000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertGreater(stats['hits'], 100)
+
+
+class ModelVersionTests(HRTestCase):
+    def test_migrate_starts_an_epoch(self):
+        self.assertTrue(ModelVersion.objects.filter(label=ModelVersion.EPOCH, version__gt=0).exists())
+
+    def test_versions_do_not_repeat_after_a_restore(self):
+        ModelVersion.bump(Expense)
+        issued = ModelVersion.objects.get(label='hr_app.expense').version
+        # A backup taken before that write is restored
+        ModelVersion.objects.filter(label='hr_app.expense').update(version=1)
+        ModelVersion.bump(Expense)
+        self.assertGreater(ModelVersion.objects.get(label='hr_app.expense').version, issued)
+
+    def test_new_database_epoch_changes_cache_keys(self):
+        admin, _ = self.make_user('admin', role='admin')
+        client = self.client_for(admin)
+        client.get('/api/benefits/')
+        self.assertEqual(client.get('/api/benefits/')['X-Cache'], 'HIT')
+        # A recreated database starts with the same (empty) counters but its own epoch
+        ModelVersion.objects.filter(label=ModelVersion.EPOCH).update(version=models.F('version') + 1)
+        self.assertEqual(client.get('/api/benefits/')['X-Cache'], 'MISS')
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=TEST_HASHERS)
+class AnalyticsRoutingTests(HRTestMixin, TransactionTestCase):
+    # Under test the 'analytics' connection mirrors 'default', so a fresh snapshot has its schema
+    databases = {'default', 'archive', 'analytics'}
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.snapshot = os.path.join(directory.name, 'analytics.sqlite3')
+        open(self.snapshot, 'wb').close()
+        override = override_settings(ANALYTICS_SNAPSHOT_PATH=self.snapshot)
+        override.enable()
+        self.addCleanup(override.disable)
+        analytics._freshness[0] = 0.0
+        self.addCleanup(analytics._freshness.__setitem__, 0, 0.0)
+        self.router = AnalyticsRouter()
+
+    def test_analytic_reads_use_a_fresh_snapshot(self):
+        self.assertIsNone(self.router.db_for_read(Employee))
+        with analytics_reads():
+            self.assertEqual(self.router.db_for_read(Employee), 'analytics')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with analytics_reads(), transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Employee))
+
+    def test_missing_snapshot_falls_back(self):
+        os.remove(self.snapshot)
+        with analytics_reads():
+            self.assertIsNone(self.router.db_for_read(Employee))
+
+    def test_old_snapshot_falls_back(self):
+        os.utime(self.snapshot, (0, 0))
+        with analytics_reads():
+            self.assertIsNone(self.router.db_for_read(Employee))
+
+    def test_snapshot_from_before_a_migrate_falls_back(self):
+        applied = {'default': (40, 40), 'analytics': (39, 39)}
+        with mock.patch.object(analytics, 'latest_migration', side_effect=applied.get), analytics_reads():
+            self.assertIsNone(self.router.db_for_read(Employee))
+
+    def test_dashboard_reads_the_snapshot_and_writes_do_not(self):
+        user, _ = self.make_user('admin', role='admin')
+        client = self.client_for(user)
+        with CaptureQueriesContext(connections['analytics']) as snapshot_queries:
+            self.assertEqual(client.get('/api/dashboard/stats/').status_code, 200)
+        self.assertGreater(len(snapshot_queries), 0)
+        with CaptureQueriesContext(connections['analytics']) as snapshot_queries:
+            client.post('/api/benefits/', {'name': 'Gym', 'description': 'Membership', 'category': 'health'},
+                        format='json')
+            client.get('/api/benefits/')
+        self.assertEqual(len(snapshot_queries), 0)
+        self.assertFalse(analytics.in_analytics_reads())
+
+
+class ArchiveTests(HRTestCase):
+    databases = {'default', 'archive'}
+    cutoff = date(2024, 1, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.admin, self.admin_employee = self.make_user('admin', role='admin', department='Ops')
+        self.user, self.employee = self.make_user('employee', department='Engineering')
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=date(2023, 1, 2) + timedelta(days=day),
+                       status='late' if day % 3 == 0 else 'present')
+            for employee in (self.admin_employee, self.employee) for day in range(0, 730, 9)
+        ])
+        payrolls = []
+        for month in range(24):
+            start = date(2023 + month // 12, month % 12 + 1, 1)
+            end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            payrolls.append(Payroll(
+                employee=self.employee, period_start=start, period_end=end, base_salary=1000 + month,
+                gross_salary=1100 + month, net_salary=900 + month * 7, status='paid' if month < 20 else 'pending',
+            ))
+        Payroll.objects.bulk_create(payrolls)
+        self.client = self.client_for(self.admin)
+
+    def list_all(self, url):
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            rows += response.json()['results']
+            url = response.json()['next']
+        return rows
+
+    def report(self, spec):
+        response = self.client.post('/api/reports/', spec, format='json')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(response.status_code, 200, body)
+        return json.loads(body)['results']
+
+    def archive(self):
+        return [archive_rows(model, self.cutoff, batch_size=25) for model in ARCHIVES]
+
+    def test_archive_rows_moves_closed_rows(self):
+        slipped = Payroll.objects.order_by('period_start').first()
+        PaySlip.objects.create(payroll=slipped)
+        hot_attendance = Attendance.objects.filter(date__lt=self.cutoff).count()
+
+        self.assertEqual(self.archive(), [hot_attendance, 11])
+        self.assertFalse(Attendance.objects.filter(date__lt=self.cutoff).exists())
+        self.assertEqual(ArchivedAttendance.objects.count(), hot_attendance)
+        # The rows were moved, not deleted, so the change feed reports nothing
+        self.assertFalse(Change.objects.filter(deleted=True).exists())
+        # Pay slips keep their payroll hot
+        self.assertTrue(Payroll.objects.filter(pk=slipped.pk).exists())
+        self.assertFalse(ArchivedPayroll.objects.filter(pk=slipped.pk).exists())
+        self.assertEqual(ArchiveWatermark.get(Attendance), self.cutoff)
+        self.assertEqual(ArchiveWatermark.get(Payroll), self.cutoff)
+        # Already archived rows are not moved twice
+        self.assertEqual(self.archive(), [0, 0])
+
+    def test_rows_that_reopen_during_the_move_stay_hot(self):
+        copy = ArchivedPayroll.copy
+
+        def copy_and_issue_slip(row):
+            PaySlip.objects.get_or_create(payroll_id=row.pk)
+            return copy(row)
+
+        with mock.patch.object(ArchivedPayroll, 'copy', side_effect=copy_and_issue_slip):
+            self.assertEqual(archive_rows(Payroll, self.cutoff), 0)
+        self.assertEqual(Payroll.objects.count(), 24)
+        self.assertFalse(ArchivedPayroll.objects.exists())
+
+    def test_lists_merge_archived_rows_in_keyset_order(self):
+        urls = [
+            '/api/attendance/?page_size=37',
+            '/api/attendance/?page_size=10&start=2023-03-01&end=2024-02-15',
+            '/api/payroll/?page_size=7',
+        ]
+        before = [self.list_all(url) for url in urls]
+        self.archive()
+        self.assertTrue(ArchivedAttendance.objects.exists())
+        for url, rows in zip(urls, before):
+            with self.subTest(url=url):
+                self.assertEqual(self.list_all(url), rows)
+
+    def test_archive_queries_are_explained_on_the_archive(self):
+        self.archive()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        log_path = os.path.join(directory.name, 'queries.jsonl')
+        with override_settings(QUERY_LOG_PATH=log_path):
+            self.list_all('/api/attendance/?page_size=100')
+        with open(log_path) as log:
+            aliases = {json.loads(line)['alias'] for line in log}
+        self.assertEqual(aliases, {'default', 'archive'})
+        output = io.StringIO()
+        call_command('explain_queries', log_path, '--all', stdout=output)
+        self.assertNotIn('Could not explain', output.getvalue())
+        self.assertIn('on the archive database', output.getvalue())
+
+    def test_exports_include_archived_rows(self):
+        urls = ['/api/attendance/?format=csv', '/api/attendance/?format=ndjson&end=2024-02-15', '/api/payroll/?format=csv']
+        before = [b''.join(self.client.get(url).streaming_content) for url in urls]
+        self.archive()
+        for url, content in zip(urls, before):
+            with self.subTest(url=url):
+                self.assertEqual(b''.join(self.client.get(url).streaming_content), content)
+
+    def test_recent_pages_skip_the_archive(self):
+        self.archive()
+        with CaptureQueriesContext(connections['archive']) as archive_queries:
+            self.client.get('/api/attendance/?page_size=5')
+            self.client.get('/api/attendance/?start=2024-06-01')
+        self.assertEqual(len(archive_queries), 0)
+        self.assertEqual(self.client.get('/api/attendance/?start=soon').status_code, 400)
+
+    def test_reports_merge_archived_groups(self):
+        specs = [
+            {'source': 'attendance', 'group_by': ['department', 'status'], 'measures': ['count']},
+            {'source': 'payroll', 'group_by': ['year', 'department'],
+             'measures': ['count', 'avg:net_salary', 'sum:gross_salary', 'min:base_salary', 'max:net_salary']},
+            {'source': 'payroll', 'measures': ['count', 'avg:net_salary']},
+        ]
+        before = [self.report(spec) for spec in specs]
+        self.archive()
+        for spec, expected in zip(specs, before):
+            with self.subTest(spec=spec):
+                results = self.report(spec)
+                self.assertEqual(len(results), len(expected))
+                for row, expected_row in zip(results, expected):
+                    self.assertEqual(set(row), set(expected_row))
+                    for name, value in expected_row.items():
+                        if name.startswith('avg'):
+                            self.assertAlmostEqual(float(row[name]), float(value), places=2)
+                        else:
+                            self.assertEqual(row[name], value, name)
+
+    def test_deleting_an_employee_removes_archived_rows(self):
+        self.archive()
+        self.employee.delete()
+        self.assertFalse(ArchivedPayroll.objects.exists())
+        self.assertFalse(ArchivedAttendance.objects.filter(employee_id=self.employee.pk).exists())
+
+
+class LeaveCalendarTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager, _ = self.make_user('manager', role='manager')
+        self.user, self.employee = self.make_user('employee')
+        self.other, self.other_employee = self.make_user('other', department='Sales')
+
+    def request_leave(self, user, start, end):
+        return self.client_for(user).post('/api/leave-requests/', {
+            'leave_type': 'emergency', 'start_date': start, 'end_date': end, 'days_requested': 1, 'reason': 'Away',
+        }, format='json')
+
+    def calendar(self, query):
+        response = self.client_for(self.manager).get(f'/api/leave-requests/calendar/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [entry['employee'] for entry in response.json()['leaves']]
+
+    def test_overlapping_requests_are_rejected(self):
+        self.assertEqual(self.request_leave(self.user, '2026-01-05', '2026-01-09').status_code, 201)
+        self.assertEqual(self.request_leave(self.user, '2026-01-09', '2026-01-12').status_code, 400)
+        self.assertEqual(self.request_leave(self.user, '2026-01-10', '2026-01-12').status_code, 201)
+        # Another employee's leave is not a conflict
+        self.assertEqual(self.request_leave(self.other, '2026-01-05', '2026-01-09').status_code, 201)
+
+    def test_rejected_leave_frees_the_dates(self):
+        self.request_leave(self.user, '2026-01-05', '2026-01-09')
+        LeaveRequest.objects.update(status='rejected')
+        self.assertEqual(self.request_leave(self.user, '2026-01-06', '2026-01-07').status_code, 201)
+
+    def test_calendar_lists_leave_in_range_and_department(self):
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type='annual', start_date=date(2026, 1, 30),
+            end_date=date(2026, 2, 3), days_requested=5, reason='Trip', status='approved',
+        )
+        LeaveRequest.objects.create(
+            employee=self.other_employee, leave_type='annual', start_date=date(2026, 1, 5),
+            end_date=date(2026, 1, 6), days_requested=2, reason='Trip', status='approved',
+        )
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type='sick', start_date=date(2026, 1, 12),
+            end_date=date(2026, 1, 12), days_requested=1, reason='Flu',
+        )
+        self.assertEqual(self.calendar('start=2026-01-01&end=2026-01-31'), [self.employee.pk])
+        self.assertEqual(self.calendar('start=2026-02-03&end=2026-02-28'), [self.employee.pk])
+        self.assertEqual(self.calendar('start=2026-02-04&end=2026-02-28'), [])
+        self.assertEqual(self.calendar('start=2026-01-01&end=2026-01-31&department=Sales'), [self.other_employee.pk])
+        self.assertEqual(
+            self.calendar('start=2026-01-01&end=2026-01-31&status=approved,pending'),
+            [self.employee.pk, self.employee.pk],
+        )
+
+    def test_calendar_requires_a_valid_range(self):
+        client = self.client_for(self.manager)
+        self.assertEqual(client.get('/api/leave-requests/calendar/?start=2026-01-01').status_code, 400)
+        self.assertEqual(
+            client.get('/api/leave-requests/calendar/?start=2026-02-01&end=2026-01-01').status_code, 400
+        )
+
+
+class ReceiptStorageTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root.name
+        self.user, self.employee = self.make_user('employee')
+
+    def upload(self, name, content, content_type='image/png'):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client_for(self.user).post('/api/expenses/', {
+                'title': 'Taxi', 'description': 'Airport', 'amount': '5', 'category': 'travel',
+                'receipt': SimpleUploadedFile(name, content, content_type),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(callbacks), 1)
+        return Expense.objects.get(pk=response.json()['id'])
+
+    def png(self, color='red'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 600), color).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_identical_receipts_share_one_file(self):
+        first = self.upload('a.PNG', self.png())
+        second = self.upload('b.png', self.png())
+        self.assertEqual(first.receipt_hash, hashlib.sha256(self.png()).hexdigest())
+        self.assertEqual(second.receipt.name, first.receipt.name)
+        self.assertTrue(first.receipt.name.endswith(f'/{first.receipt_hash}.png'))
+        self.assertEqual(second.duplicate_of_id, first.pk)
+        self.assertIsNone(first.duplicate_of_id)
+        self.assertEqual(len(self.stored_files()), 1)
+
+        third = self.upload('c.png', self.png('blue'))
+        self.assertNotEqual(third.receipt.name, first.receipt.name)
+        self.assertIsNone(third.duplicate_of_id)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_thumbnail_is_listed_once_rendered(self):
+        expense = self.upload('a.png', self.png())
+        url = f'/api/expenses/{expense.pk}/'
+        self.assertIsNone(self.client_for(self.user).get(url).json()['receipt_thumbnail'])
+
+        thumbnail_path = receipt_storage.path(receipt_thumbnail_name(expense.receipt_hash))
+        future = Future()
+        future.set_result(render_thumbnail(expense.receipt.path, thumbnail_path, (200, 200)))
+        _thumbnail_done(threading.get_ident(), future)
+        with Image.open(thumbnail_path) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 100))
+        self.assertTrue(self.client_for(self.user).get(url).json()['receipt_thumbnail'])
+
+    def test_non_image_receipts_get_no_thumbnail(self):
+        expense = self.upload('receipt.pdf', b'%PDF-1.4 not an image', 'application/pdf')
+        thumbnail_path = receipt_storage.path(receipt_thumbnail_name(expense.receipt_hash))
+        self.assertFalse(render_thumbnail(expense.receipt.path, thumbnail_path, (200, 200)))
+        self.assertFalse(os.path.exists(thumbnail_path))
+
+
+@override_settings(DEBUG=False)
+class QueryInstrumentationTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.user, self.employee = self.make_user('employee')
+        Attendance.objects.bulk_create(
+            Attendance(employee=self.employee, date=date(2026, 1, 1) + timedelta(days=day)) for day in range(5)
+        )
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'O''Neil' AND n > 10"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?',
+        )
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s)'), fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'))
+
+    def test_admins_get_query_headers(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_for(self.admin).get('/api/attendance/')
+        self.assertEqual(response['X-DB-Query-Count'], str(len(queries)))
+        self.assertGreaterEqual(float(response['X-DB-Time-Ms']), 0)
+        self.assertEqual(response['X-DB-Repeated-Queries'], '0')
+
+    def test_employees_do_not_get_query_headers(self):
+        response = self.client_for(self.user).get('/api/attendance/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-DB-Query-Count', response)
+
+    @override_settings(QUERY_REPEAT_WARNING_THRESHOLD=1)
+    def test_repeated_queries_are_logged(self):
+        def list_with_n_plus_one(view, *args, **kwargs):
+            for row in Attendance.objects.all():
+                Employee.objects.get(pk=row.employee_id)
+            return list_attendance(view, *args, **kwargs)
+
+        list_attendance = AttendanceViewSet.list
+        with mock.patch.object(AttendanceViewSet, 'list', list_with_n_plus_one):
+            with self.assertLogs('hr_app.middleware', 'WARNING') as logs:
+                response = self.client_for(self.admin).get('/api/attendance/')
+        self.assertEqual(response['X-DB-Repeated-Queries'], '5')
+        self.assertIn('GET /api/attendance/ ran the same query 5 times', logs.output[0])
+
+
+class AutoPrefetchTests(HRTestCase):
+    endpoints = [
+        'employees', 'attendance', 'payroll', 'deductions', 'pay-slips', 'job-postings', 'candidates', 'benefits',
+        'employee-benefits', 'expenses', 'projects', 'tasks', 'performance-reviews', 'courses', 'enrollments',
+        'tax-records', 'budgets', 'leave-requests', 'leave-balances', 'users',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.project = Project.objects.create(
+            name='Portal', description='Rebuild', manager=self.admin, start_date=date(2026, 1, 1)
+        )
+        self.course = Course.objects.create(title='Safety', description='Basics', duration_hours=1, category='other')
+        self.benefit = Benefit.objects.create(name='Gym', description='Membership', category='other')
+        self.job = JobPosting.objects.create(
+            title='Engineer', department='Engineering', location='Remote', employment_type='contract',
+            description='Build things', posted_by=self.admin,
+        )
+
+    def populate(self, count):
+        for _ in range(count):
+            user, employee = self.make_user(f'user{User.objects.count()}')
+            Attendance.objects.create(employee=employee, date=date(2026, 1, 1))
+            Deduction.objects.create(employee=employee, name='Pension', amount=1, effective_date=date(2025, 1, 1))
+            payroll = Payroll.objects.create(
+                employee=employee, period_start=date(2026, 1, 1), period_end=date(2026, 1, 31), base_salary=1
+            )
+            PaySlip.objects.create(payroll=payroll)
+            Candidate.objects.create(job_posting=self.job, first_name='Ann', last_name='Lee', email=f'{user.username}@cv.example')
+            EmployeeBenefit.objects.create(employee=employee, benefit=self.benefit)
+            Expense.objects.create(
+                employee=employee, title='Taxi', description='Airport', amount=1, category='other', approved_by=self.admin
+            )
+            ProjectTeam.objects.create(project=self.project, employee=employee, role='dev')
+            Task.objects.create(title='Ship', project=self.project, assigned_to=employee, assigned_by=self.admin)
+            PerformanceReview.objects.create(
+                employee=employee, reviewer=self.admin, review_period_start=date(2026, 1, 1),
+                review_period_end=date(2026, 1, 2), overall_rating=3,
+            )
+            Enrollment.objects.create(employee=employee, course=self.course)
+            TaxRecord.objects.create(employee=employee, tax_year=2025, gross_income=1, taxable_income=1, tax_due=1)
+            LeaveRequest.objects.create(
+                employee=employee, leave_type='other', start_date=date(2026, 1, 1), end_date=date(2026, 1, 1),
+                days_requested=1, reason='Away', approved_by=self.admin,
+            )
+            LeaveBalance.objects.create(employee=employee, leave_type='annual', year=2026)
+            Budget.objects.create(department='Engineering', fiscal_year=2026, total_budget=1, remaining_budget=1)
+
+    def query_counts(self):
+        client = self.client_for(self.admin)
+        counts = {}
+        for endpoint in self.endpoints:
+            # Measure rendering, not a cached response
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(f'/api/{endpoint}/')
+            self.assertEqual(response.status_code, 200, (endpoint, response.content))
+            counts[endpoint] = len(queries)
+        return counts
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self.populate(2)
+        few = self.query_counts()
+        self.populate(4)
+        many = self.query_counts()
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(many[endpoint], few[endpoint])
+
+    def test_lookups_follow_the_serializer(self):
+        select, prefetch = get_related_lookups(PaySlipSerializer())
+        self.assertIn('payroll__employee__user', select)
+        select, prefetch = get_related_lookups(ProjectSerializer())
+        self.assertIn('tasks', prefetch)
+
+
+class KeysetPaginationTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.employees = [self.make_user(f'user{number}')[1] for number in range(7)]
+        # Several rows share each date, so pages must break ties on id
+        Attendance.objects.bulk_create(
+            Attendance(employee=employee, date=date(2026, 1, 1) + timedelta(days=day))
+            for day in range(9) for employee in self.employees
+        )
+        self.client = self.client_for(self.admin)
+
+    def test_pages_visit_every_row_once_in_order(self):
+        rows, url = [], '/api/attendance/?page_size=10'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            rows += [(row['date'], row['id']) for row in response.json()['results']]
+            url = response.json()['next']
+        self.assertEqual(len(rows), 63)
+        self.assertEqual(len(set(rows)), 63)
+        self.assertEqual(rows, sorted(rows, reverse=True))
+
+    def test_rows_added_while_paging_do_not_shift_pages(self):
+        first = self.client.get('/api/attendance/?page_size=10').json()
+        Attendance.objects.create(employee=self.employees[0], date=date(2026, 2, 1))
+        second = self.client.get(first['next']).json()
+        expected = list(
+            Attendance.objects.filter(date__lt=date(2026, 2, 1)).order_by('-date', '-id').values_list('id', flat=True)[10:20]
+        )
+        self.assertEqual([row['id'] for row in second['results']], expected)
+
+    def test_last_page_has_no_next_link(self):
+        response = self.client.get('/api/attendance/?page_size=63').json()
+        self.assertEqual(len(response['results']), 63)
+        self.assertIsNone(response['next'])
+        self.assertEqual(self.client.get('/api/payroll/').json(), {'next': None, 'previous': None, 'results': []})
+
+    def test_invalid_cursors_are_not_found(self):
+        self.assertEqual(self.client.get('/api/attendance/?cursor=zzz').status_code, 404)
+        for position in (['2026-01-01'], ['soon', 1], {'date': '2026-01-01'}):
+            cursor = b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+            with self.subTest(position=position):
+                self.assertEqual(self.client.get('/api/attendance/', {'cursor': cursor}).status_code, 404)
+
+
+class RendererTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.user, self.employee = self.make_user('employee')
+        Expense.objects.create(
+            employee=self.employee, title='Hotel   night', description='Conference', amount='120.50', category='travel'
+        )
+        Attendance.objects.create(employee=self.employee, date=date(2026, 1, 5))
+        self.client = self.client_for(self.admin)
+
+    def test_fast_json_matches_the_stdlib_renderer(self):
+        data = {
+            'amount': Decimal('12.50'), 'when': timezone.now(), 'day': date(2026, 1, 5),
+            'text': 'line\u2028separator', 'nested': [{'ok': True, 'none': None}], 1: 'number key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        for endpoint in ('expenses', 'attendance', 'employees', 'dashboard/stats', 'expenses/analytics'):
+            with self.subTest(endpoint=endpoint):
+                response = self.client.get(f'/api/{endpoint}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_message_pack_is_negotiated(self):
+        expected = self.client.get('/api/expenses/').json()
+        response = self.client.get('/api/expenses/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+        self.assertEqual(self.client.get('/api/expenses/?format=msgpack')['Content-Type'], 'application/msgpack')
+        self.assertTrue(self.client.get('/api/expenses/')['Content-Type'].startswith('application/json'))
+
+
+class BatchTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, _ = self.make_user('admin', role='admin')
+        self.user, self.employee = self.make_user('employee')
+        self.other, self.other_employee = self.make_user('other')
+        self.expense = Expense.objects.create(
+            employee=self.other_employee, title='Taxi', description='Airport', amount='25.00', category='travel'
+        )
+
+    def batch(self, user, requests, **extra):
+        response = self.client_for(user).post('/api/batch/', {'requests': requests}, format='json', **extra)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['responses']
+
+    def test_entries_run_in_order(self):
+        responses = self.batch(self.admin, [
+            {'method': 'GET', 'path': '/api/dashboard/stats/'},
+            {'method': 'POST', 'path': '/api/benefits/', 'body': {'name': 'Gym', 'description': 'Membership', 'category': 'health'}},
+            {'method': 'GET', 'path': '/api/benefits/?fields=name'},
+            {'method': 'DELETE', 'path': '/api/benefits/999/'},
+        ])
+        self.assertEqual([entry['status'] for entry in responses], [200, 201, 200, 404])
+        # The read after the write sees it
+        self.assertEqual(responses[2]['body']['results'], [{'name': 'Gym'}])
+
+    def test_only_api_views_can_be_batched(self):
+        responses = self.batch(self.admin, [
+            {'method': 'GET', 'path': '/api/nope/'},
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'requests': []}},
+            {'method': 'GET', 'path': '/admin/'},
+        ])
+        self.assertEqual([entry['status'] for entry in responses], [404, 400, 400])
+
+    def test_entries_keep_the_caller_permissions(self):
+        responses = self.batch(self.user, [
+            {'method': 'GET', 'path': '/api/expenses/'},
+            {'method': 'PATCH', 'path': f'/api/expenses/{self.expense.pk}/', 'body': {'status': 'approved'}},
+            {'method': 'DELETE', 'path': f'/api/expenses/{self.expense.pk}/'},
+        ])
+        self.assertEqual(responses[0]['body']['results'], [])
+        self.assertEqual([entry['status'] for entry in responses[1:]], [404, 404])
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.status, 'pending')
+
+    def test_requests_are_validated(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(client.post('/api/batch/', {'requests': []}, format='json').status_code, 400)
+        too_many = [{'method': 'GET', 'path': '/api/benefits/'}] * (settings.BATCH_MAX_REQUESTS + 1)
+        self.assertEqual(client.post('/api/batch/', {'requests': too_many}, format='json').status_code, 400)
+        self.assertEqual(APIClient().post('/api/batch/', {'requests': []}, format='json').status_code, 401)
+
+    def test_batch_is_rendered_in_the_negotiated_format(self):
+        response = self.client_for(self.admin).post(
+            '/api/batch/', {'requests': [{'method': 'GET', 'path': '/api/benefits/'}]},
+            format='json', HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['responses'][0]['status'], 200)
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=TEST_HASHERS)
+class ThreadedBatchTests(HRTestMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_run_on_pool_threads(self):
+        admin, _ = self.make_user('admin', role='admin')
+        benefit = Benefit.objects.create(name='Gym', description='Membership', category='health')
+        paths = ['/api/benefits/', '/api/users/', '/api/dashboard/stats/', '/api/employees/', f'/api/benefits/{benefit.pk}/']
+        threads = set()
+        dispatch = batch.dispatch
+
+        def record_thread(request, item):
+            threads.add(threading.get_ident())
+            return dispatch(request, item)
+
+        with mock.patch.object(batch, 'dispatch', record_thread):
+            response = self.client_for(admin).post(
+                '/api/batch/', {'requests': [{'method': 'GET', 'path': path} for path in paths]}, format='json'
+            )
+        self.assertEqual([entry['status'] for entry in response.json()['responses']], [200] * len(paths))
+        self.assertEqual(response.json()['responses'][4]['body']['name'], 'Gym')
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class ReportTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, self.admin_employee = self.make_user('admin', role='admin', department='Ops')
+        self.user, self.employee = self.make_user('employee', department='Sales')
+        Attendance.objects.bulk_create(
+            Attendance(employee=employee, date=date(2026, 1, 1) + timedelta(days=day),
+                       status='late' if day % 3 == 0 else 'present')
+            for day in range(59) for employee in (self.admin_employee, self.employee)
+        )
+        Payroll.objects.create(
+            employee=self.admin_employee, period_start=date(2026, 1, 1), period_end=date(2026, 1, 31),
+            base_salary=100, gross_salary=100, net_salary=90, status='paid',
+        )
+        Payroll.objects.create(
+            employee=self.employee, period_start=date(2026, 2, 1), period_end=date(2026, 2, 28),
+            base_salary=200, gross_salary=200, net_salary=150,
+        )
+        self.client = self.client_for(self.admin)
+
+    def run_report(self, spec):
+        response = self.client.post('/api/reports/', spec, format='json')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(response.status_code, 200, body)
+        return response, json.loads(body)
+
+    def test_groups_and_filters(self):
+        _, report = self.run_report({
+            'source': 'attendance', 'group_by': ['department', 'status'], 'measures': ['count'],
+            'filters': {'start': '2026-02-01', 'department': ['Sales']},
+        })
+        expected = {'late': 0, 'present': 0}
+        for day in range(31, 59):
+            expected['late' if day % 3 == 0 else 'present'] += 1
+        self.assertEqual(
+            {row['status']: row['count'] for row in report['results']}, expected
+        )
+        self.assertTrue(all(row['department'] == 'Sales' for row in report['results']))
+        self.assertFalse(report['truncated'])
+
+    def test_measures(self):
+        _, report = self.run_report({
+            'source': 'payroll', 'group_by': [],
+            'measures': ['count', 'sum:net_salary', 'avg:gross_salary', 'min:base_salary', 'max:base_salary'],
+        })
+        [row] = report['results']
+        self.assertEqual(row['count'], 2)
+        self.assertEqual(Decimal(str(row['sum_net_salary'])), Decimal('240'))
+        self.assertEqual(Decimal(str(row['avg_gross_salary'])), Decimal('150'))
+        self.assertEqual((Decimal(str(row['min_base_salary'])), Decimal(str(row['max_base_salary']))), (100, 200))
+
+    def test_results_are_cached_until_a_source_table_changes(self):
+        spec = {'source': 'payroll', 'group_by': ['department'], 'measures': ['count']}
+        response, first = self.run_report(spec)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response, cached = self.run_report(spec)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(cached, first)
+        Payroll.objects.create(
+            employee=self.employee, period_start=date(2026, 3, 1), period_end=date(2026, 3, 31), base_salary=200
+        )
+        response, report = self.run_report(spec)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(sum(row['count'] for row in report['results']), 3)
+
+    @override_settings(REPORT_MAX_GROUPS=3)
+    def test_large_results_are_truncated(self):
+        _, report = self.run_report({'source': 'attendance', 'group_by': ['month', 'employee']})
+        self.assertEqual(len(report['results']), 3)
+        self.assertTrue(report['truncated'])
+
+    def test_only_whitelisted_names_are_accepted(self):
+        for spec in [
+            {'source': 'users'},
+            {'source': 'payroll', 'group_by': ['employee__user__password']},
+            {'source': 'payroll', 'measures': ['sum:employee']},
+            {'source': 'payroll', 'measures': ['max:employee__user__password']},
+            {'source': 'payroll', 'filters': {'employee__user__role': 'admin'}},
+            {'source': 'payroll', 'filters': {'start': 'soon'}},
+            [],
+        ]:
+            with self.subTest(spec=spec):
+                self.assertEqual(self.client.post('/api/reports/', spec, format='json').status_code, 400)
+
+    def test_reports_are_for_managers(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.get('/api/reports/').status_code, 403)
+        self.assertEqual(client.post('/api/reports/', {'source': 'payroll'}, format='json').status_code, 403)
+        self.assertIn('payroll', self.client.get('/api/reports/').json()['sources'])
+
+
+class CachedAuthenticationTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.employee = self.make_user('employee')
+        self.client = self.jwt_client(self.user)
+
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def update_user(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(self.user, name, value)
+            self.user.save()
+
+    def test_repeat_requests_do_not_load_the_user(self):
+        self.assertEqual(self.client.get('/api/expenses/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/expenses/').status_code, 200)
+        self.assertFalse(any('"hr_app_user"' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(any('FROM "hr_app_employee"' in query['sql'] for query in queries.captured_queries))
+
+    def test_changes_are_seen_on_the_next_request(self):
+        self.client.get('/api/users/')
+        self.update_user(role='manager')
+        [row] = self.client.get('/api/users/').json()['results']
+        self.assertEqual((row['role'], row['employee_id']), ('manager', self.employee.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.delete()
+        [row] = self.client.get('/api/users/').json()['results']
+        self.assertIsNone(row['employee_id'])
+
+    def test_deactivated_users_are_refused(self):
+        self.client.get('/api/expenses/')
+        self.update_user(is_active=False)
+        self.assertEqual(self.client.get('/api/expenses/').status_code, 401)
+
+    def test_deleted_users_are_refused(self):
+        self.client.get('/api/expenses/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get('/api/expenses/').status_code, 401)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get('/api/expenses/')
+        version = cache.get(authentication.version_key(self.user.pk))
+        entry = cache.get(f'hr:auth-user:{self.user.pk}:{version}')
+        self.assertIsNotNone(entry)
+        self.assertNotIn(self.user.password, repr(entry))
+        self.assertNotIn(self.user.email, repr(entry))
+        # The hash is loaded when a view needs it
+        response = self.client.post('/api/auth/change-password/',
+                                    {'current_password': 'pass12345', 'new_password': 'pass67890'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('pass67890'))
+        self.assertEqual(self.user.role, 'employee')
+
+    def test_evicted_versions_are_not_reissued(self):
+        self.client.get('/api/users/')
+        self.update_user(role='manager')
+        self.client.get('/api/users/')
+        # The version key is evicted, then the user changes again; neither earlier entry may come back
+        cache.delete(authentication.version_key(self.user.pk))
+        self.update_user(role='admin')
+        [row] = self.client.get('/api/users/').json()['results']
+        self.assertEqual(row['role'], 'admin')
+        cache.delete(authentication.version_key(self.user.pk))
+        [row] = self.client.get('/api/users/').json()['results']
+        self.assertEqual(row['role'], 'admin')
+
+
+class TokenRevocationTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(revocation, 'revocation_list', revocation.RevocationList())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user, self.employee = self.make_user('employee')
+
+    def login(self, user):
+        response = APIClient().post('/api/auth/login/', {'email': user.email, 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def bearer(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def refresh(self, token):
+        with self.captureOnCommitCallbacks(execute=True):
+            return APIClient().post('/api/auth/refresh/', {'refresh': token}, format='json')
+
+    def test_refresh_rotates_and_refuses_replays(self):
+        tokens = self.login(self.user)
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200, response.content)
+        rotated = response.json()
+        self.assertNotEqual(rotated['refresh'], tokens['refresh'])
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.bearer(rotated['access']).get('/api/users/').status_code, 200)
+        self.assertEqual(self.refresh(rotated['refresh']).status_code, 200)
+
+    def test_logout_ends_the_whole_session(self):
+        tokens = self.login(self.user)
+        rotated = self.refresh(tokens['refresh']).json()
+        other_session = self.login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.bearer(rotated['access']).post('/api/auth/logout/', {'refresh': rotated['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(self.bearer(tokens['access']).get('/api/users/').status_code, 401)
+        self.assertEqual(self.bearer(rotated['access']).get('/api/users/').status_code, 401)
+        self.assertEqual(self.refresh(rotated['refresh']).status_code, 401)
+        self.assertEqual(self.bearer(other_session['access']).get('/api/users/').status_code, 200)
+
+    def test_revocations_reach_processes_that_rebuild_their_filter(self):
+        tokens = self.login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bearer(tokens['access']).post('/api/auth/logout/', {}, format='json')
+        # Another process builds its filter from the table
+        revocation.revocation_list.bloom = None
+        self.assertEqual(self.bearer(tokens['access']).get('/api/users/').status_code, 401)
+
+    def test_logout_refuses_another_users_refresh_token(self):
+        other, _ = self.make_user('other')
+        victim = self.login(other)
+        tokens = self.login(self.user)
+        response = self.bearer(tokens['access']).post('/api/auth/logout/', {'refresh': victim['refresh']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.refresh(victim['refresh']).status_code, 200)
+
+    def test_unrevoked_tokens_skip_the_revocation_table(self):
+        client = self.bearer(self.login(self.user)['access'])
+        client.get('/api/users/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/users/').status_code, 200)
+        self.assertFalse(any('hr_app_revokedtoken' in query['sql'] for query in queries.captured_queries))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = revocation.BloomFilter(5000)
+        for number in range(5000):
+            bloom.add(f'token{number}')
+        self.assertTrue(all(f'token{number}' in bloom for number in range(5000)))
+        false_positives = sum(f'other{number}' in bloom for number in range(5000))
+        self.assertLess(false_positives / 5000, 0.03)
+
+
+class LoginTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.employee = self.make_user('employee')
+        self.client = APIClient()
+
+    def login(self, email, password='pass12345'):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+
+    def test_email_is_case_insensitive(self):
+        self.assertEqual(self.login('Employee@EXAMPLE.com').status_code, 200)
+
+    def test_unknown_emails_still_hash_and_look_like_bad_passwords(self):
+        with mock.patch('hr_app.serializers.verify_password_bounded', wraps=verify_password_bounded) as verify:
+            unknown = self.login('nobody@example.com')
+        verify.assert_called_once_with('pass12345', '')
+        wrong = self.login('employee@example.com', 'wrong-pass')
+        self.assertEqual((unknown.status_code, wrong.status_code), (400, 400))
+        self.assertEqual(unknown.json(), wrong.json())
+
+    def test_guessing_one_account_is_throttled(self):
+        codes = [self.login('EMPLOYEE@example.com' if attempt % 2 else 'employee@example.com', 'wrong-pass').status_code
+                 for attempt in range(11)]
+        self.assertEqual(codes, [400] * 10 + [429])
+        other, _ = self.make_user('other')
+        self.assertEqual(self.login(other.email).status_code, 200)
+
+    def test_full_hashing_queue_fails_fast(self):
+        get_hash_executor()
+        with mock.patch.object(authentication, '_hash_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            self.assertEqual(self.login('employee@example.com').status_code, 503)
+            slots.release()
+            self.assertEqual(self.login('employee@example.com').status_code, 200)
+
+    def test_outdated_hashes_are_upgraded(self):
+        hashers = ['django.contrib.auth.hashers.ScryptPasswordHasher', *TEST_HASHERS]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login('employee@example.com').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+
+class SQLiteTuningTests(unittest.TestCase):
+    # A throwaway file database, outside the test databases Django manages
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.connections = ConnectionHandler({'default': sqlite_database(os.path.join(directory.name, 'tuned.sqlite3'))})
+        self.addCleanup(self.connections.close_all)
+
+    def pragma(self, name):
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connections_get_the_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_read_then_write_transactions_wait_for_the_lock(self):
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+        self.connections['default'].close()
+        first_read = threading.Event()
+        errors = []
+
+        def increment(first):
+            if not first:
+                first_read.wait(5)
+            try:
+                with transaction.atomic(), self.connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT value FROM counter')
+                    value = cursor.fetchone()[0]
+                    if first:
+                        first_read.set()
+                        time.sleep(0.2)
+                    cursor.execute('UPDATE counter SET value = %s', [value + 1])
+            except DatabaseError as error:
+                errors.append(error)
+            finally:
+                first_read.set()
+                self.connections['default'].close()
+
+        # atomic() looks the alias up in django.db.connections
+        with mock.patch.object(transaction, 'get_connection', lambda using=None: self.connections['default']):
+            threads = [threading.Thread(target=increment, args=(first,)) for first in (True, False)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # A deferred BEGIN would let both read 0, and the second write would fail with
+        # "database is locked"; BEGIN IMMEDIATE makes the second wait for the first commit
+        self.assertEqual(errors, [])
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class ExplainQueriesTests(HRTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_path = os.path.join(directory.name, 'queries.jsonl')
+        self.admin, self.employee = self.make_user('admin', role='admin')
+        Attendance.objects.create(employee=self.employee, date=date.today())
+
+    def explain(self, *args):
+        output = io.StringIO()
+        call_command('explain_queries', self.log_path, *args, stdout=output)
+        return output.getvalue()
+
+    def test_requests_are_recorded_once_per_query_shape(self):
+        with override_settings(QUERY_LOG_PATH=self.log_path):
+            self.client_for(self.admin).get('/api/dashboard/stats/')
+        with open(self.log_path) as log:
+            entries = [json.loads(line) for line in log]
+        self.assertTrue(entries)
+        self.assertEqual(len({entry['fingerprint'] for entry in entries}), len(entries))
+        self.assertTrue(all(entry['request'] == 'GET /api/dashboard/stats/' for entry in entries))
+        self.assertTrue(all(entry['sql'].lstrip().upper().startswith(('SELECT', 'WITH')) for entry in entries))
+
+    def test_write_parameters_are_not_recorded(self):
+        with override_settings(QUERY_LOG_PATH=self.log_path):
+            response = self.client_for(self.admin).post(
+                '/api/auth/change-password/', {'current_password': 'pass12345', 'new_password': 'pass67890'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.admin.refresh_from_db()
+        with open(self.log_path) as log:
+            content = log.read()
+        self.assertNotIn(self.admin.password, content)
+        self.assertNotIn(self.admin.email, content)
+        [update] = [json.loads(line) for line in content.splitlines() if '"sql": "UPDATE \\"hr_app_user\\"' in line]
+        self.assertTrue(update['params'])
+        self.assertEqual(set(update['params']), {None})
+        # The statement can still be explained without its values
+        self.assertNotIn('Could not explain', self.explain('--all'))
+
+    def test_hot_filters_are_served_by_indexes(self):
+        with override_settings(QUERY_LOG_PATH=self.log_path):
+            client = self.client_for(self.admin)
+            for path in ('/api/dashboard/stats/', '/api/attendance/', '/api/payroll/?year=2026&month=1',
+                         '/api/candidates/?status=applied', '/api/tasks/'):
+                self.assertEqual(client.get(path).status_code, 200)
+        self.assertRegex(self.explain(), r'\n0 of [1-9]\d* query shapes')
+
+    def test_scans_and_sorts_are_flagged(self):
+        with open(self.log_path, 'w') as log:
+            log.write(json.dumps({
+                'request': 'GET /api/expenses/', 'fingerprint': 'expenses by description', 'count': 3,
+                'sql': 'SELECT id FROM hr_app_expense WHERE description = %s ORDER BY title', 'params': ['Taxi'],
+            }) + '\n')
+        output = self.explain()
+        self.assertIn('full table scan of hr_app_expense', output)
+        self.assertIn('sort without an index', output)
+        self.assertIn('1 of 1 query shapes', output)
+        self.assertNotIn('full table scan', self.explain('--min-rows', '1'))
+
+    def test_missing_log_is_an_error(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', self.log_path)
@@ -0,0 +1,163 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+try:
+    import fcntl
+except ImportError:  # Windows: the dev server is a single process anyway
+    fcntl = None
+
+# One bucket: key fingerprint (0 = free slot), tokens left, time of the last update
+SLOT = struct.Struct('<Qdd')
+# Slots a key may live in; a group is locked as a whole, so processes only contend on the same group
+GROUP_SLOTS = 8
+GROUP_BYTES = SLOT.size * GROUP_SLOTS
+
+
+class TokenBucketStore:
+    """Token buckets in a memory-mapped file, shared by every worker process that opens it.
+
+    The file is a fixed-size hash table: a key hashes to a group of GROUP_SLOTS slots, and a
+    new key takes a free slot or evicts the bucket that has been idle longest. Updates hold an
+    fcntl lock on just that group. With `path=None` the table is anonymous memory, private to
+    the process.
+    """
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.groups = max(slots // GROUP_SLOTS, 1)
+        self.lock = threading.Lock()
+        self.pid = None
+        self.fd = None
+        self.map = None
+
+    def open(self):
+        # Reopened after a fork, so a worker never shares the parent's thread lock state
+        if self.pid == os.getpid():
+            return
+        size = self.groups * GROUP_BYTES
+        if self.path is None:
+            self.fd, self.map = None, mmap.mmap(-1, size)
+        else:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+            self.map = mmap.mmap(self.fd, size)
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def take(self, key, capacity, refill_rate, now=None):
+        """Spend one token from `key`'s bucket; returns seconds until one is available, or 0 if allowed.
+
+        A bucket holds at most `capacity` tokens and regains `refill_rate` per second.
+        """
+        now = time.time() if now is None else now
+        fingerprint = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        group_start = fingerprint % self.groups * GROUP_BYTES
+
+        with self.lock:
+            self.open()
+            if self.fd is not None and fcntl is not None:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX, GROUP_BYTES, group_start)
+            try:
+                offset, tokens = self.find_slot(fingerprint, group_start, capacity, refill_rate, now)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                SLOT.pack_into(self.map, offset, fingerprint, tokens, now)
+            finally:
+                if self.fd is not None and fcntl is not None:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, GROUP_BYTES, group_start)
+
+        return 0 if allowed else (1 - tokens) / refill_rate
+
+    def find_slot(self, fingerprint, group_start, capacity, refill_rate, now):
+        """(offset, current tokens) for the key's bucket, claiming a slot if it has none"""
+        oldest_offset, oldest_updated = group_start, None
+        for offset in range(group_start, group_start + GROUP_BYTES, SLOT.size):
+            slot_key, tokens, updated = SLOT.unpack_from(self.map, offset)
+            if slot_key == fingerprint:
+                return offset, min(capacity, tokens + max(now - updated, 0) * refill_rate)
+            if slot_key == 0:
+                return offset, capacity
+            if oldest_updated is None or updated < oldest_updated:
+                oldest_offset, oldest_updated = offset, updated
+        # Group full: the idlest bucket is most likely refilled already, so dropping it loses least
+        return oldest_offset, capacity
+
+    def clear(self):
+        with self.lock:
+            self.open()
+            self.map[:] = bytes(len(self.map))
+
+
+store = TokenBucketStore(settings.THROTTLE_STORE_PATH, settings.THROTTLE_STORE_SLOTS)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle on a token bucket in the shared store instead of a cached request history.
+
+    A rate of N/period allows a burst of N, then one request every period/N. The limit holds
+    across all worker processes on the host.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.wait_time = store.take(self.key, self.num_requests, self.num_requests / self.duration)
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
+
+
+class AnonRouteThrottle(TokenBucketThrottle):
+    """One bucket per client IP and route, for endpoints open to anonymous callers.
+
+    Signed-in users are not limited here.
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else type(view).__name__
+        return f'throttle_{self.scope}_{route}_{self.get_ident(request)}'
+
+
+class PublicReadThrottle(AnonRouteThrottle):
+    """Job posting list/detail, which scrapers like to walk"""
+    scope = 'public_read'
+
+
+class ApplicationThrottle(AnonRouteThrottle):
+    """Job applications (candidate creation)"""
+    scope = 'application'
+
+
+class LoginIPThrottle(AnonRouteThrottle):
+    """Login attempts per client IP; generous, since a whole office can share one address"""
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """Login attempts per account, which stops password guessing against one user"""
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
+
+
+class RegisterThrottle(AnonRouteThrottle):
+    scope = 'register'
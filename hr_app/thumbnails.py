@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.db import connection
+from PIL import Image, UnidentifiedImageError
+from .models import Expense, ModelVersion
+from .storage import receipt_storage, receipt_thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    # Created lazily so each gunicorn worker gets its own pool after forking
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.RECEIPT_THUMBNAIL_WORKERS)
+    return _executor
+
+
+def render_thumbnail(source_path, thumbnail_path, size):
+    """Runs in a pool process: write a JPEG thumbnail, returns False for non-image receipts"""
+    if os.path.exists(thumbnail_path):
+        return True
+    try:
+        with Image.open(source_path) as image:
+            image.thumbnail(size)
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            # Write to a temp name first so readers never see a half-written file
+            temp_path = f'{thumbnail_path}.{os.getpid()}.tmp'
+            image.convert('RGB').save(temp_path, 'JPEG', quality=80)
+            os.replace(temp_path, thumbnail_path)
+        return True
+    except (UnidentifiedImageError, OSError):
+        return False
+
+
+def _thumbnail_done(scheduled_from, future):
+    if future.exception() is not None:
+        logger.warning('Receipt thumbnail generation failed: %s', future.exception())
+        return
+    if not future.result():
+        return
+    # Cached expense responses built before the file existed list no thumbnail
+    ModelVersion.bump(Expense)
+    if threading.get_ident() != scheduled_from:
+        # Callbacks normally run on the executor's own thread, which opened a connection for this
+        connection.close()
+
+
+def schedule_thumbnail(receipt_name, digest):
+    """Queue thumbnail generation for a stored receipt without blocking the request"""
+    future = get_executor().submit(
+        render_thumbnail,
+        receipt_storage.path(receipt_name),
+        receipt_storage.path(receipt_thumbnail_name(digest)),
+        tuple(settings.RECEIPT_THUMBNAIL_SIZE),
+    )
+    future.add_done_callback(partial(_thumbnail_done, threading.get_ident()))
+    return future
@@ -21,14 +21,20 @@ router.register(r'enrollments', views.EnrollmentViewSet)
 router.register(r'tax-records', views.TaxRecordViewSet)
 router.register(r'budgets', views.BudgetViewSet)
 router.register(r'leave-requests', views.LeaveRequestViewSet)
+router.register(r'leave-balances', views.LeaveBalanceViewSet)
 router.register(r'users', views.UserViewSet)
 
 urlpatterns = [
     path('auth/login/', views.login_view, name='login'),
     path('auth/register/', views.register_view, name='register'),
+    path('auth/refresh/', views.refresh_view, name='token-refresh'),
+    path('auth/logout/', views.logout_view, name='logout'),
     path('auth/change-password/', views.change_password, name='change-password'),
     path('auth/update-profile/', views.update_profile, name='update-profile'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('batch/', views.batch_view, name='batch'),
+    path('changes/', views.changes_view, name='changes'),
+    path('reports/', views.reports_view, name='reports'),
     path('employees/<int:employee_id>/calculate-salary/', views.calculate_employee_salary, name='calculate-employee-salary'),
     path('payroll/<int:payroll_id>/generate-pay-slip/', views.generate_pay_slip_pdf, name='generate-pay-slip-pdf'),
     path('', include(router.urls)),
@@ -1,36 +1,53 @@
-from rest_framework import status, generics, viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import status, generics, viewsets, serializers
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth import authenticate
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from .models import (
     User, Employee, Attendance, Payroll, Deduction, PaySlip, JobPosting, Candidate,
-    Benefit, EmployeeBenefit, Expense, Project, Task,
-    PerformanceReview, Course, Enrollment, TaxRecord, Budget, LeaveRequest
+    Benefit, EmployeeBenefit, Expense, ExpenseRollup, Project, Task,
+    PerformanceReview, Course, Enrollment, TaxRecord, Budget, LeaveRequest, LeaveBalance, ModelVersion, Change
 )
 from .serializers import (
-    UserSerializer, LoginSerializer, EmployeeSerializer, AttendanceSerializer,
+    UserSerializer, LoginSerializer, BatchSerializer, EmployeeSerializer, AttendanceSerializer,
     PayrollSerializer, DeductionSerializer, PaySlipSerializer, JobPostingSerializer, CandidateSerializer,
     BenefitSerializer, EmployeeBenefitSerializer, ExpenseSerializer,
     ProjectSerializer, TaskSerializer, PerformanceReviewSerializer,
     CourseSerializer, EnrollmentSerializer, TaxRecordSerializer, BudgetSerializer,
-    LeaveRequestSerializer
+    LeaveRequestSerializer, LeaveBalanceSerializer, recurring_deductions_prefetch, parse_field_list
+)
+from .mixins import (
+    ArchiveReadMixin, AutoPrefetchMixin, BulkWriteMixin, ChangeFeedMixin, ResponseCacheMixin, SparseFieldsMixin,
+    StreamingExportMixin, is_pk
+)
+from .pagination import KeysetPagination
+from .analytics import analytics_reads
+from .batch import run_batch
+from .authentication import get_cached_user, start_session
+from .revocation import is_revoked, revoke, token_ids
+from .throttling import ApplicationThrottle, LoginAccountThrottle, LoginIPThrottle, PublicReadThrottle, RegisterThrottle
+from .reports import compile_report, describe_sources, report_response
+from .changes import (
+    CursorExpired, collect_changes, decode_cursor, encode_cursor, get_tracked_resources, latest_cursor,
 )
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginAccountThrottle])
 def login_view(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = start_session(user)
         user_data = UserSerializer(user).data
         return Response({
             'refresh': str(refresh),
@@ -41,12 +58,60 @@ def login_view(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+def refresh_view(request):
+    """New access token for a refresh token; with rotation on, the refresh token is replaced too"""
+    if not request.data.get('refresh'):
+        return Response({'error': 'refresh is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        refresh = RefreshToken(request.data['refresh'])
+    except TokenError as e:
+        return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    if is_revoked(refresh):
+        return Response({'error': 'Token has been revoked'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = get_cached_user(refresh.get(jwt_settings.USER_ID_CLAIM))
+    if user is None or not user.is_active:
+        return Response({'error': 'User not found or inactive'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = {'access': str(refresh.access_token)}
+    if jwt_settings.ROTATE_REFRESH_TOKENS:
+        if jwt_settings.BLACKLIST_AFTER_ROTATION:
+            # The old refresh token can't be replayed; the session itself stays valid
+            revoke([refresh[jwt_settings.JTI_CLAIM]], datetime.fromtimestamp(refresh['exp'], tz=dt_timezone.utc))
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data['refresh'] = str(refresh)
+    return Response(data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_view(request):
+    """Revoke the caller's login session, so its refresh token and every access token from it stop working"""
+    ids = token_ids(request.auth) if request.auth is not None else []
+    if request.data.get('refresh'):
+        try:
+            refresh = RefreshToken(request.data['refresh'])
+        except TokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(refresh.get(jwt_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            return Response({'error': 'Refresh token belongs to another user'}, status=status.HTTP_400_BAD_REQUEST)
+        ids += token_ids(refresh)
+    if not ids:
+        return Response({'error': 'No token to revoke'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # No token of this session can outlive a refresh token issued now
+    revoke(ids, timezone.now() + jwt_settings.REFRESH_TOKEN_LIFETIME)
+    return Response({'message': 'Logged out successfully'})
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([RegisterThrottle])
 @csrf_exempt
 def register_view(request):
     serializer = UserSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = start_session(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -57,6 +122,7 @@ def register_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@analytics_reads()
 def dashboard_stats(request):
     user = request.user
 
@@ -106,25 +172,39 @@ def dashboard_stats(request):
         'activities': activities[:5]  # Last 5 activities
     })
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class HRModelViewSet(BulkWriteMixin, ChangeFeedMixin, StreamingExportMixin, ResponseCacheMixin, SparseFieldsMixin,
+                     AutoPrefetchMixin, viewsets.ModelViewSet):
+    """Base for the hr_app ViewSets"""
+
+class HRReadOnlyModelViewSet(ChangeFeedMixin, StreamingExportMixin, ResponseCacheMixin, SparseFieldsMixin,
+                             AutoPrefetchMixin, viewsets.ReadOnlyModelViewSet):
+    """Read-only counterpart of HRModelViewSet"""
+
+class EmployeeViewSet(HRModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated]
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ArchiveReadMixin, HRModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    # Append-heavy table: page by (date, id) instead of OFFSET/COUNT
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
 
-class DeductionViewSet(viewsets.ModelViewSet):
+class DeductionViewSet(HRModelViewSet):
     queryset = Deduction.objects.all()
     serializer_class = DeductionSerializer
     permission_classes = [IsAuthenticated]
 
-class PayrollViewSet(viewsets.ModelViewSet):
-    queryset = Payroll.objects.all()
+class PayrollViewSet(ArchiveReadMixin, HRModelViewSet):
+    queryset = Payroll.objects.prefetch_related(recurring_deductions_prefetch())
     serializer_class = PayrollSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-period_start', '-id')
+    archive_date_field = 'period_start'
 
     def perform_create(self, serializer):
         payroll = serializer.save()
@@ -143,24 +223,31 @@ class PayrollViewSet(viewsets.ModelViewSet):
             payroll.net_salary = payroll.base_salary
             payroll.save()
 
-class PaySlipViewSet(viewsets.ModelViewSet):
-    queryset = PaySlip.objects.all()
+class PaySlipViewSet(HRModelViewSet):
+    queryset = PaySlip.objects.prefetch_related(recurring_deductions_prefetch('payroll__employee__deductions'))
     serializer_class = PaySlipSerializer
     permission_classes = [IsAuthenticated]
 
-class JobPostingViewSet(viewsets.ModelViewSet):
+class JobPostingViewSet(HRModelViewSet):
     queryset = JobPosting.objects.all()
     serializer_class = JobPostingSerializer
+    # Public listing, identical for every caller
+    cache_scope = 'global'
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    def get_throttles(self):
+        if self.action in ['list', 'retrieve']:
+            return [PublicReadThrottle()]
+        return super().get_throttles()
+
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user)
 
-class CandidateViewSet(viewsets.ModelViewSet):
+class CandidateViewSet(HRModelViewSet):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
 
@@ -169,17 +256,95 @@ class CandidateViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAuthenticated()]
 
-class BenefitViewSet(viewsets.ModelViewSet):
+    def get_throttles(self):
+        if self.action == 'create':
+            return [ApplicationThrottle()]
+        return super().get_throttles()
+
+class BenefitViewSet(HRModelViewSet):
     queryset = Benefit.objects.all()
     serializer_class = BenefitSerializer
     permission_classes = [IsAuthenticated]
+    # Reference data, identical for every caller
+    cache_scope = 'global'
 
-class EmployeeBenefitViewSet(viewsets.ModelViewSet):
+class EmployeeBenefitViewSet(HRModelViewSet):
     queryset = EmployeeBenefit.objects.all()
     serializer_class = EmployeeBenefitSerializer
     permission_classes = [IsAuthenticated]
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class BulkReviewMixin:
+    """Adds POST <endpoint>/bulk-review/ to approve or reject many pending items at once"""
+    bulk_review_limit = 500
+
+    def before_bulk_review(self, items, new_status):
+        """Hook for side effects of the review; returns {pk: error} for items to leave untouched"""
+        return {}
+
+    def after_bulk_review(self, items):
+        """Hook run inside the transaction once the reviewed items are written"""
+
+    @action(detail=False, methods=['post'], url_path='bulk-review')
+    def bulk_review(self, request):
+        user = request.user
+        # Role is checked once for the whole batch rather than per item
+        if user.role not in ['admin', 'manager']:
+            return Response({'error': 'Only managers and admins can approve/reject.'}, status=status.HTTP_403_FORBIDDEN)
+
+        new_status = request.data.get('status')
+        if new_status not in ['approved', 'rejected']:
+            return Response({'error': 'status must be "approved" or "rejected"'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(is_pk(pk) for pk in ids):
+            return Response({'error': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if not ids or len(ids) > self.bulk_review_limit:
+            return Response({'error': f'Provide between 1 and {self.bulk_review_limit} ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = {}
+        with transaction.atomic():
+            # Related rows aren't serialized here, and joins don't mix with FOR UPDATE
+            queryset = self.get_queryset().select_related(None).prefetch_related(None)
+            items = queryset.select_for_update().in_bulk(ids)
+
+            pending = []
+            for pk in ids:
+                item = items.get(pk)
+                if item is None:
+                    outcomes[pk] = 'Not found.'
+                elif item.status != 'pending':
+                    outcomes[pk] = f'Already {item.status}.'
+                else:
+                    pending.append(item)
+
+            outcomes.update(self.before_bulk_review(pending, new_status))
+
+            now = timezone.now()
+            reviewed = []
+            for item in pending:
+                if item.pk in outcomes:
+                    continue
+                item.status = new_status
+                item.approved_by = user
+                item.approved_date = now
+                item.updated_at = now
+                reviewed.append(item)
+            queryset.model.objects.bulk_update(reviewed, ['status', 'approved_by', 'approved_date', 'updated_at'])
+            # bulk_update sends no post_save, so invalidate cached responses and log the change explicitly
+            ModelVersion.bump(queryset.model)
+            Change.record(queryset.model, reviewed)
+            self.after_bulk_review(reviewed)
+
+        return Response({
+            'updated': len(reviewed),
+            'results': [
+                {'id': pk, 'ok': False, 'error': outcomes[pk]} if pk in outcomes
+                else {'id': pk, 'ok': True, 'status': new_status}
+                for pk in ids
+            ]
+        })
+
+class ExpenseViewSet(BulkReviewMixin, HRModelViewSet):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
@@ -187,14 +352,29 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.role in ['admin', 'manager']:
-            return Expense.objects.all()
+            return super().get_queryset()
         else:
             # Employees can only see their own expenses
             try:
                 employee = user.employee_profile
-                return Expense.objects.filter(employee=employee)
+                return super().get_queryset().filter(employee=employee)
             except Employee.DoesNotExist:
-                return Expense.objects.none()
+                return super().get_queryset().none()
+
+    def get_cache_scope(self):
+        # Admins and managers all get the unfiltered queryset, so they can share entries
+        if self.request.user.role in ['admin', 'manager']:
+            return 'managers'
+        return super().get_cache_scope()
+
+    def get_change_filter(self):
+        if self.request.user.role in ['admin', 'manager']:
+            return super().get_change_filter()
+        # Employees only hear about changes to their own expenses
+        try:
+            return Q(owner=self.request.user.employee_profile.pk)
+        except Employee.DoesNotExist:
+            return Q(pk__in=[])
 
     def perform_create(self, serializer):
         try:
@@ -204,17 +384,49 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             # If user doesn't have an employee profile, they can't create expenses
             raise serializers.ValidationError("Employee profile not found. Contact administrator.")
 
+    def after_bulk_review(self, items):
+        # bulk_update bypasses Expense.save(), so post the rollup deltas here
+        Expense.sync_rollups(items)
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Expense counts and totals served from ExpenseRollup only"""
+        if request.user.role not in ['admin', 'manager']:
+            return Response({'error': 'Only managers and admins can view expense analytics.'}, status=status.HTTP_403_FORBIDDEN)
+
+        dimensions = ['department', 'category', 'month', 'status']
+        group_by = request.query_params.get('group_by', 'month').split(',')
+        if not group_by or any(field not in dimensions for field in group_by):
+            return Response({'error': f'group_by must be a comma separated subset of {", ".join(dimensions)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = ExpenseRollup.objects.exclude(count=0)
+        try:
+            if 'start' in request.query_params:
+                rollups = rollups.filter(month__gte=datetime.strptime(request.query_params['start'], '%Y-%m').date())
+            if 'end' in request.query_params:
+                rollups = rollups.filter(month__lte=datetime.strptime(request.query_params['end'], '%Y-%m').date())
+        except ValueError:
+            return Response({'error': 'start and end must be in YYYY-MM format'}, status=status.HTTP_400_BAD_REQUEST)
+        for field in ['department', 'category', 'status']:
+            if field in request.query_params:
+                rollups = rollups.filter(**{f'{field}__in': request.query_params[field].split(',')})
+
+        rows = rollups.values(*group_by).annotate(count=Sum('count'), total=Sum('total')).order_by(*group_by)
+        return Response({'group_by': group_by, 'results': list(rows)})
+
     def perform_update(self, serializer):
         user = self.request.user
-        instance = self.get_object()
+        # Also called per item by PATCH bulk/, so read the item's own instance and data
+        instance = serializer.instance
+        data = serializer.validated_data
 
         # Only allow status updates for managers and admins
-        if 'status' in self.request.data:
+        if 'status' in data:
             if user.role not in ['admin', 'manager']:
                 raise serializers.ValidationError("Only managers and admins can approve/reject expense claims.")
 
             # Set approved_by when status is changed to approved or rejected
-            if self.request.data['status'] in ['approved', 'rejected']:
+            if data['status'] in ['approved', 'rejected']:
                 serializer.save(approved_by=user, approved_date=timezone.now())
             else:
                 serializer.save()
@@ -228,14 +440,14 @@ class ExpenseViewSet(viewsets.ModelViewSet):
                     raise serializers.ValidationError("Employee profile not found.")
             serializer.save()
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(HRModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # All authenticated users can see all projects
-        return Project.objects.all()
+        return super().get_queryset()
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -243,32 +455,34 @@ class ProjectViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError("Only managers and admins can create projects.")
         serializer.save(manager=user)
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(HRModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
 
-class PerformanceReviewViewSet(viewsets.ModelViewSet):
+class PerformanceReviewViewSet(HRModelViewSet):
     queryset = PerformanceReview.objects.all()
     serializer_class = PerformanceReviewSerializer
     permission_classes = [IsAuthenticated]
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(HRModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    # Reference data, identical for every caller
+    cache_scope = 'global'
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(HRModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated]
 
-class TaxRecordViewSet(viewsets.ModelViewSet):
+class TaxRecordViewSet(HRModelViewSet):
     queryset = TaxRecord.objects.all()
     serializer_class = TaxRecordSerializer
     permission_classes = [IsAuthenticated]
 
-class LeaveRequestViewSet(viewsets.ModelViewSet):
+class LeaveRequestViewSet(BulkReviewMixin, HRModelViewSet):
     queryset = LeaveRequest.objects.all()
     serializer_class = LeaveRequestSerializer
     permission_classes = [IsAuthenticated]
@@ -276,37 +490,99 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.role in ['admin', 'manager']:
-            return LeaveRequest.objects.all()
+            return super().get_queryset()
         else:
             # Employees can only see their own leave requests
             try:
                 employee = user.employee_profile
-                return LeaveRequest.objects.filter(employee=employee)
+                return super().get_queryset().filter(employee=employee)
             except Employee.DoesNotExist:
-                return LeaveRequest.objects.none()
+                return super().get_queryset().none()
+
+    def get_cache_scope(self):
+        # Admins and managers all get the unfiltered queryset, so they can share entries
+        if self.request.user.role in ['admin', 'manager']:
+            return 'managers'
+        return super().get_cache_scope()
+
+    def get_change_filter(self):
+        if self.request.user.role in ['admin', 'manager']:
+            return super().get_change_filter()
+        # Employees only hear about changes to their own leave requests
+        try:
+            return Q(owner=self.request.user.employee_profile.pk)
+        except Employee.DoesNotExist:
+            return Q(pk__in=[])
 
     def perform_create(self, serializer):
         try:
             employee = self.request.user.employee_profile
-            serializer.save(employee=employee)
         except Employee.DoesNotExist:
             # If user doesn't have an employee profile, they can't create leave requests
             raise serializers.ValidationError("Employee profile not found. Contact administrator.")
 
+        # Single ledger row read instead of summing the employee's approved leave
+        data = serializer.validated_data
+        available = LeaveBalance.get_available(employee.id, data['leave_type'], data['start_date'].year)
+        if available is not None and data['days_requested'] > available:
+            raise serializers.ValidationError(
+                f"Insufficient {data['leave_type']} leave balance: {available} days available."
+            )
+        serializer.save(employee=employee)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Who is out over a date range, optionally narrowed to a department"""
+        try:
+            start_date = datetime.strptime(request.query_params['start'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.query_params['end'], '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            return Response({'error': 'start and end are required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date > end_date:
+            return Response({'error': 'end must be on or after start'}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = request.query_params.get('status', 'approved').split(',')
+        leaves = self.get_queryset().filter(status__in=statuses).overlapping(start_date, end_date)
+
+        # Managers see their own department unless they ask for another one
+        department = request.query_params.get('department', request.user.department)
+        if department:
+            leaves = leaves.for_department(department)
+
+        entries = leaves.order_by('start_date', 'id').values(
+            'id', 'employee_id', 'employee__user__first_name', 'employee__user__last_name',
+            'leave_type', 'start_date', 'end_date', 'status'
+        )
+        return Response({
+            'start': start_date,
+            'end': end_date,
+            'department': department,
+            'leaves': [{
+                'id': entry['id'],
+                'employee': entry['employee_id'],
+                'employee_name': f"{entry['employee__user__first_name']} {entry['employee__user__last_name']}".strip(),
+                'leave_type': entry['leave_type'],
+                'start_date': entry['start_date'],
+                'end_date': entry['end_date'],
+                'status': entry['status'],
+            } for entry in entries]
+        })
+
     def perform_update(self, serializer):
         user = self.request.user
-        instance = self.get_object()
+        # Also called per item by PATCH bulk/, so read the item's own instance and data
+        instance = serializer.instance
+        data = serializer.validated_data
+        save_kwargs = {}
 
         # Only allow status updates for managers and admins
-        if 'status' in self.request.data:
+        if 'status' in data:
             if user.role not in ['admin', 'manager']:
                 raise serializers.ValidationError("Only managers and admins can approve/reject leave requests.")
 
             # Set approved_by when status is changed to approved or rejected
-            if self.request.data['status'] in ['approved', 'rejected']:
-                serializer.save(approved_by=user, approved_date=timezone.now())
-            else:
-                serializer.save()
+            if data['status'] in ['approved', 'rejected']:
+                save_kwargs = {'approved_by': user, 'approved_date': timezone.now()}
         else:
             # Regular updates (only by the employee who created it)
             if user.role == 'employee':
@@ -315,21 +591,114 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
                         raise serializers.ValidationError("You can only update your own leave requests.")
                 except Employee.DoesNotExist:
                     raise serializers.ValidationError("Employee profile not found.")
-            serializer.save()
 
-class BudgetViewSet(viewsets.ModelViewSet):
+        with transaction.atomic():
+            # Re-read under the row lock: a concurrent review may have changed the status since
+            # the request loaded it, and the ledger delta must start from what is stored
+            serializer.instance = LeaveRequest.objects.select_for_update().get(pk=instance.pk)
+            previous_entry = serializer.instance.ledger_entry()
+            leave = serializer.save(**save_kwargs)
+            current_entry = leave.ledger_entry()
+            if previous_entry != current_entry:
+                # Move the charge on the ledger; a failed debit rolls the status change back
+                if previous_entry:
+                    LeaveBalance.credit(*previous_entry)
+                if current_entry and not LeaveBalance.debit(*current_entry):
+                    raise serializers.ValidationError("Insufficient leave balance to approve this request.")
+
+    def before_bulk_review(self, items, new_status):
+        if new_status != 'approved':
+            return {}
+
+        # Group the charges per ledger row so each row takes one guarded debit
+        charges = {}
+        for leave in items:
+            if LeaveBalance.tracks(leave.leave_type):
+                key = (leave.employee_id, leave.leave_type, leave.start_date.year)
+                charges.setdefault(key, []).append(leave)
+        if not charges:
+            return {}
+
+        balances = {
+            (row.employee_id, row.leave_type, row.year): row.available
+            for row in LeaveBalance.objects.filter(
+                employee_id__in={key[0] for key in charges},
+                leave_type__in={key[1] for key in charges},
+                year__in={key[2] for key in charges},
+            )
+        }
+
+        errors = {}
+        for key, leaves in charges.items():
+            remaining = balances.get(key, 0)
+            approved = []
+            for leave in leaves:
+                if leave.days_requested > remaining:
+                    errors[leave.pk] = f'Insufficient {leave.leave_type} leave balance: {remaining} days available.'
+                else:
+                    remaining -= leave.days_requested
+                    approved.append(leave)
+            total = sum(leave.days_requested for leave in approved)
+            if total and not LeaveBalance.debit(*key, total):
+                # The balance moved since it was read; leave these untouched
+                for leave in approved:
+                    errors[leave.pk] = 'Leave balance changed, please retry.'
+        return errors
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Credit what the stored row holds, not what was loaded before the lock
+            instance = LeaveRequest.objects.select_for_update().get(pk=instance.pk)
+            entry = instance.ledger_entry()
+            instance.delete()
+            if entry:
+                LeaveBalance.credit(*entry)
+
+class LeaveBalanceViewSet(HRReadOnlyModelViewSet):
+    queryset = LeaveBalance.objects.all()
+    serializer_class = LeaveBalanceSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role in ['admin', 'manager']:
+            return super().get_queryset()
+        # Employees can only see their own balances
+        return super().get_queryset().filter(employee__user=user)
+
+    def get_cache_scope(self):
+        # Admins and managers all get the unfiltered queryset, so they can share entries
+        if self.request.user.role in ['admin', 'manager']:
+            return 'managers'
+        return super().get_cache_scope()
+
+    def get_change_filter(self):
+        if self.request.user.role in ['admin', 'manager']:
+            return super().get_change_filter()
+        # Employees only hear about their own balances
+        try:
+            return Q(owner=self.request.user.employee_profile.pk)
+        except Employee.DoesNotExist:
+            return Q(pk__in=[])
+
+class BudgetViewSet(HRModelViewSet):
     queryset = Budget.objects.all()
     serializer_class = BudgetSerializer
     permission_classes = [IsAuthenticated]
+    # Reference data, identical for every caller
+    cache_scope = 'global'
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(HRModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Users can only see/modify their own profile
-        return User.objects.filter(id=self.request.user.id)
+        return super().get_queryset().filter(id=self.request.user.id)
+
+    def get_change_filter(self):
+        return Q(object_id=self.request.user.id)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -556,3 +925,54 @@ def update_profile(request):
         serializer.save()
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_view(request):
+    """Run several API calls in one round trip, authenticated once; responses come back in order"""
+    serializer = BatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'responses': run_batch(request, serializer.validated_data['requests'])})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def changes_view(request):
+    """Rows changed or deleted since `since`; without it, just a cursor to start syncing from"""
+    resources = get_tracked_resources()
+    requested = parse_field_list(request.query_params.get('resources'))
+    unknown = requested - set(resources)
+    if unknown:
+        return Response({'error': f"Unknown resources: {', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST)
+    if requested:
+        resources = {prefix: viewset for prefix, viewset in resources.items() if prefix in requested}
+
+    token = request.query_params.get('since')
+    if not token:
+        return Response({'cursor': encode_cursor(latest_cursor()), 'changes': {}})
+    since = decode_cursor(token)
+    if since is None:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cursor, changes = collect_changes(request, since, resources)
+    except CursorExpired as e:
+        # The client should reload its lists and start again from a fresh cursor
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+    return Response({'cursor': encode_cursor(cursor), 'changes': changes})
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@analytics_reads()
+def reports_view(request):
+    """GET lists what a report may use; POST runs a report spec as one aggregate query"""
+    if request.user.role not in ['admin', 'manager']:
+        return Response({'error': 'Only managers and admins can run reports.'}, status=status.HTTP_403_FORBIDDEN)
+    if request.method == 'GET':
+        return Response({'sources': describe_sources()})
+
+    try:
+        spec, queryset = compile_report(request.data)
+    except serializers.ValidationError as e:
+        return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    return report_response(spec, queryset)
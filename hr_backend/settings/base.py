@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
+from .database import sqlite_database, sqlite_snapshot_database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hr_app.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,13 +82,40 @@ WSGI_APPLICATION = 'hr_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Analytics snapshot (hr_app.analytics): written by `manage.py refresh_analytics_snapshot` (run it
+# every few minutes), and ignored once older than this many seconds, when analytic reads go back
+# to the main database
+ANALYTICS_SNAPSHOT_PATH = BASE_DIR / 'analytics.sqlite3'
+ANALYTICS_SNAPSHOT_MAX_AGE = 900
+
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+    # Attendance and payroll history moved out by `manage.py archive_history`
+    'archive': sqlite_database(BASE_DIR / 'archive.sqlite3'),
+    # Read-only copy of 'default' for dashboard, report and export queries
+    'analytics': sqlite_snapshot_database(ANALYTICS_SNAPSHOT_PATH),
+}
+
+DATABASE_ROUTERS = ['hr_app.routers.ArchiveRouter', 'hr_app.routers.AnalyticsRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# One SQLite file shared by all gunicorn workers on the host, so a response cached by one
+# worker serves the others and invalidations reach every worker (see hr_app.shared_cache)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'hr_app.shared_cache.SharedCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'OPTIONS': {'MAX_SIZE': 64 * 1024 * 1024},
     }
 }
 
+# API response cache: entries are invalidated by model version counters, not by expiry
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,14 +164,33 @@ AUTH_USER_MODEL = 'hr_app.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'hr_app.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'hr_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'hr_app.renderers.MessagePackRenderer',
+        'hr_app.renderers.CSVRenderer',
+        'hr_app.renderers.NDJSONRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app; throttles key on the address the nearest one saw.
+    # 0 uses REMOTE_ADDR and ignores X-Forwarded-For, which clients can set to anything
+    'NUM_PROXIES': 0,
+    'DEFAULT_THROTTLE_RATES': {
+        # Token buckets shared by all workers (see hr_app.throttling); a rate of N/period also
+        # allows a burst of N. An office behind one NAT shares the per-IP budgets.
+        'public_read': '120/min',
+        'application': '10/hour',
+        'login_ip': '300/min',
+        'login_account': '10/min',
+        'register': '20/hour',
+    },
 }
 
 # JWT settings
@@ -151,7 +199,7 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
 
@@ -184,4 +232,61 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3001",
 ]
 
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+
+# Let the SPA read the per-request DB instrumentation headers
+CORS_EXPOSE_HEADERS = ['X-DB-Query-Count', 'X-DB-Time-Ms', 'X-DB-Repeated-Queries', 'X-Cache']
+
+# Expense receipts: thumbnails are rendered by a per-process pool in the background
+RECEIPT_THUMBNAIL_SIZE = (320, 320)
+RECEIPT_THUMBNAIL_WORKERS = 2
+
+# Query instrumentation: log a warning when one SQL shape runs more often than this in a request
+QUERY_REPEAT_WARNING_THRESHOLD = 10
+# Append every request's distinct queries to this file for `manage.py explain_queries`; off when unset
+QUERY_LOG_PATH = os.environ.get('QUERY_LOG_PATH')
+
+# /api/batch/: largest accepted batch, and threads used to run its independent GETs
+BATCH_MAX_REQUESTS = 25
+BATCH_MAX_WORKERS = 4
+
+# /api/changes/: most rows per response, and how long the change log is kept (older cursors must reload)
+CHANGES_MAX_ROWS = 2000
+CHANGES_RETENTION_DAYS = 30
+
+# <resource>/bulk/: most items per request, and rows per INSERT/UPDATE statement
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 200
+
+# ?format=csv / ?format=ndjson exports: rows read and serialized per chunk while streaming
+EXPORT_CHUNK_SIZE = 500
+
+# /api/reports/: most groups a report returns (the rest is cut off and flagged as truncated)
+REPORT_MAX_GROUPS = 10000
+
+# CachedJWTAuthentication: where authenticated users are cached, and the most seconds an entry
+# can outlive a change made by another process if that cache is ever per-process
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# Token revocation (logout, refresh rotation): each process keeps a bloom filter of revoked ids,
+# rebuilt at least this often (seconds) and whenever another process revokes through the shared cache
+REVOCATION_CACHE_ALIAS = 'default'
+REVOCATION_FILTER_MAX_AGE = 60
+# Room for ids revoked in this process between rebuilds before false positives climb
+REVOCATION_FILTER_HEADROOM = 10000
+
+# Login password checks: hashing threads per process, and how many more logins may wait for
+# one before new ones get a 503
+LOGIN_HASH_WORKERS = 2
+LOGIN_HASH_QUEUE = 32
+
+# Throttle token buckets: a memory-mapped file shared by the worker processes on this host
+# (None keeps them in per-process memory), and how many buckets it holds (24 bytes each)
+THROTTLE_STORE_PATH = BASE_DIR / 'throttle_buckets.bin'
+THROTTLE_STORE_SLOTS = 65536
+
+# Cold data: `manage.py archive_history` moves attendance and paid payrolls older than this many
+# days (rounded down to a month start) into the archive database, this many rows per transaction
+ARCHIVE_AFTER_DAYS = 730
+ARCHIVE_BATCH_SIZE = 1000
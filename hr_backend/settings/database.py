@@ -0,0 +1,62 @@
+"""
+SQLite configuration shared by the base and production settings.
+
+Django's defaults (rollback journal, a new connection per request, deferred transactions)
+serialize readers behind writers and turn concurrent writes into "database is locked" errors.
+Compare with `python scripts/bench_sqlite.py`.
+"""
+from pathlib import Path
+
+# Run on every new connection
+SQLITE_PRAGMAS = {
+    # Readers no longer wait for the writer, and a commit is one append to the WAL file
+    'journal_mode': 'WAL',
+    # In WAL mode this is still safe against application crashes; only a power cut can lose
+    # the last transactions
+    'synchronous': 'NORMAL',
+    # Milliseconds a connection waits for the write lock before giving up with "database is locked"
+    'busy_timeout': 10000,
+    # Read the database through a shared memory map instead of read() calls
+    'mmap_size': 256 * 1024 * 1024,
+    # Page cache per connection, in KiB (negative means KiB rather than pages)
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_database(name, conn_max_age=600):
+    """A DATABASES entry for a tuned SQLite file"""
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        # Keep connections (and their page cache) across requests instead of reconnecting each time
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {pragma}={value}' for pragma, value in SQLITE_PRAGMAS.items()),
+            # Take the write lock at BEGIN: a deferred transaction that read first cannot wait
+            # for the lock when it later writes, and fails at once if another writer got there
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def sqlite_snapshot_database(path, conn_max_age=60):
+    """A DATABASES entry reading the analytics snapshot (hr_app.analytics) read-only.
+
+    immutable=1 skips locking and change detection: a refresh renames a new file over the
+    snapshot instead of writing to it, so a connection keeps reading the copy it opened
+    until CONN_MAX_AGE recycles it.
+    """
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'{Path(path).resolve().as_uri()}?mode=ro&immutable=1',
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {pragma}={SQLITE_PRAGMAS[pragma]}'
+                                     for pragma in ('mmap_size', 'cache_size', 'temp_store')),
+        },
+        # Tests read the test database instead
+        'TEST': {'MIRROR': 'default'},
+    }
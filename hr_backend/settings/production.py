@@ -1,4 +1,5 @@
 from .base import *
+from .database import sqlite_database, sqlite_snapshot_database
 import os
 
 DEBUG = False
@@ -14,12 +15,14 @@ ALLOWED_HOSTS = [
 
 # Database - Using SQLite for simplicity
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': sqlite_database(os.path.join(BASE_DIR, 'db.sqlite3')),
+    'archive': sqlite_database(os.path.join(BASE_DIR, 'archive.sqlite3')),
+    'analytics': sqlite_snapshot_database(ANALYTICS_SNAPSHOT_PATH),
 }
 
+# Render terminates TLS at one load balancer, which appends the client address to X-Forwarded-For
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1))}
+
 # CORS settings for production
 CORS_ALLOWED_ORIGINS = [
     "https://hr-management-pearl-gamma.vercel.app",  # Frontend domain
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark for the login endpoint.
+Fires bursts of concurrent POST /api/auth/login/ requests through the full Django stack and
+reports logins per second, how many were shed with a 503, and the latency of a cheap endpoint
+(/api/job-postings/) measured while the burst runs. Uses a throwaway test database; the
+throttles are lifted so only password hashing limits throughput.
+
+Usage: python scripts/bench_login.py [--users 40] [--concurrency 1 8 32]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hr_backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+from hr_app.models import User
+from hr_app.throttling import TokenBucketThrottle
+
+PASSWORD = 'bench-password-123'
+
+
+def create_users(count):
+    user = User(username='template')
+    user.set_password(PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'Bench{i}@Company.com', password=user.password) for i in range(count)
+    ])
+
+
+def login(i):
+    # Mixed case on purpose: the lookup is case-insensitive
+    response = APIClient().post('/api/auth/login/', {'email': f'bench{i}@company.COM', 'password': PASSWORD}, format='json')
+    return response.status_code
+
+
+def probe_latency(stop, samples):
+    client = APIClient()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/api/job-postings/')
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def run_burst(users, concurrency):
+    stop, samples = threading.Event(), []
+    prober = threading.Thread(target=probe_latency, args=(stop, samples))
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = list(pool.map(login, range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    return statuses, elapsed, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    TokenBucketThrottle.THROTTLE_RATES = {scope: '1000000/s' for scope in ('public_read', 'login_ip', 'login_account', 'register')}
+    try:
+        create_users(args.users)
+        print(f'hash workers: {settings.LOGIN_HASH_WORKERS}, queue: {settings.LOGIN_HASH_QUEUE}, '
+              f'cpus: {os.cpu_count()}')
+        print(f"{'concurrency':>12}{'logins/s':>10}{'ok':>6}{'503':>6}{'probe p50 ms':>14}{'probe max ms':>14}")
+        for concurrency in args.concurrency:
+            statuses, elapsed, samples = run_burst(args.users, concurrency)
+            ok = statuses.count(200)
+            p50 = statistics.median(samples) * 1000 if samples else 0
+            worst = max(samples) * 1000 if samples else 0
+            print(f'{concurrency:>12}{ok / elapsed:>10.1f}{ok:>6}{statuses.count(503):>6}{p50:>14.1f}{worst:>14.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
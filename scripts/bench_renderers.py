@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark for the API renderers.
+Renders representative Payroll, Attendance and Task list pages with DRF's JSONRenderer,
+FastJSONRenderer and MessagePackRenderer and reports encode time and payload size.
+No database is needed: rows are built in memory and serialized with the real serializers.
+
+Usage: python scripts/bench_renderers.py [--rows 20 500] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hr_backend.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+from hr_app.models import User, Employee, Attendance, Payroll, Project, Task
+from hr_app.renderers import FastJSONRenderer, MessagePackRenderer
+from hr_app.serializers import AttendanceSerializer, PayrollSerializer, TaskSerializer
+
+
+def make_employees(count):
+    employees = []
+    for i in range(count):
+        user = User(id=i + 1, username=f'user{i}', first_name='Employee', last_name=f'Number {i}',
+                    email=f'user{i}@company.com', department='Engineering')
+        employee = Employee(id=i + 1, user=user, position='Software Engineer', hire_date=date(2020, 1, 1),
+                            salary=Decimal('85000.00'), address='1 Long Street\nSome City')
+        employee.recurring_deductions = []
+        employees.append(employee)
+    return employees
+
+
+def payroll_page(rows):
+    return PayrollSerializer([
+        Payroll(id=i + 1, employee=employee, period_start=date(2026, 1, 1), period_end=date(2026, 1, 31),
+                base_salary=Decimal('7083.33'), overtime_hours=Decimal('4.50'), overtime_rate=Decimal('55.00'),
+                bonus=Decimal('250.00'), allowances=Decimal('100.00'), gross_salary=Decimal('7680.83'),
+                total_deductions=Decimal('910.12'), net_salary=Decimal('6770.71'), status='processed',
+                processed_date=datetime(2026, 2, 1, 9, 30, tzinfo=timezone.utc))
+        for i, employee in enumerate(make_employees(rows))
+    ], many=True).data
+
+
+def attendance_page(rows):
+    return AttendanceSerializer([
+        Attendance(id=i + 1, employee=employee, date=date(2026, 1, 1) + timedelta(days=i % 28),
+                   check_in=time(9, 2), check_out=time(17, 45), status='present', notes='')
+        for i, employee in enumerate(make_employees(rows))
+    ], many=True).data
+
+
+def task_page(rows):
+    manager = User(id=9999, username='manager', first_name='Manager', last_name='User')
+    project = Project(id=1, name='HR Platform', description='Internal tooling', manager=manager, start_date=date(2026, 1, 1))
+    return TaskSerializer([
+        Task(id=i + 1, title=f'Task {i}', description='Implement the thing described in the ticket.',
+             project=project, assigned_to=employee, assigned_by=manager, priority='high', status='in_progress',
+             due_date=date(2026, 3, 1), created_date=datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc))
+        for i, employee in enumerate(make_employees(rows))
+    ], many=True).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20, 500])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    renderers = [
+        ('JSONRenderer', JSONRenderer()),
+        ('FastJSONRenderer', FastJSONRenderer()),
+        ('MessagePackRenderer', MessagePackRenderer()),
+    ]
+    pages = [('payroll', payroll_page), ('attendance', attendance_page), ('tasks', task_page)]
+
+    print(f"{'page':<12}{'rows':>6}  {'renderer':<22}{'encode µs':>12}{'bytes':>10}{'speedup':>9}{'size':>7}")
+    for name, build in pages:
+        for rows in args.rows:
+            data = {'count': rows, 'next': None, 'previous': None, 'results': build(rows)}
+            baseline_time = baseline_size = None
+            for label, renderer in renderers:
+                payload = renderer.render(data)
+                elapsed = min(timeit.repeat(lambda: renderer.render(data), number=args.repeat, repeat=3)) / args.repeat
+                baseline_time = baseline_time or elapsed
+                baseline_size = baseline_size or len(payload)
+                print(f'{name:<12}{rows:>6}  {label:<22}{elapsed * 1e6:>12.1f}{len(payload):>10}'
+                      f'{baseline_time / elapsed:>8.1f}x{len(payload) / baseline_size:>6.0%}')
+
+
+if __name__ == '__main__':
+    main()
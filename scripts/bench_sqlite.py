@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Concurrency benchmark for the SQLite configuration.
+Runs the same request mix from several worker processes (like gunicorn workers) against a
+seeded copy of the schema, once with Django's default SQLite settings and once with
+hr_backend/settings/database.py, and reports reads/s, writes/s and "database is locked" errors.
+A read is one attendance page; a write reads an attendance row and updates it in a transaction.
+
+Usage: python scripts/bench_sqlite.py [--workers 1 4 8] [--seconds 5] [--write-share 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hr_backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from hr_app.models import User, Employee, Attendance
+from hr_backend.settings.database import sqlite_database
+
+EMPLOYEES = 200
+DAYS = 20
+
+
+def database_config(mode, name):
+    if mode == 'default':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    return sqlite_database(name)
+
+
+def use_database(mode, name):
+    connections.close_all()
+    settings.DATABASES['default'] = database_config(mode, name)
+    # The handler has already read DATABASES; make it build a new connection from the new entry
+    connections.settings = connections.configure_settings(settings.DATABASES)
+    if hasattr(connections._connections, 'default'):
+        del connections['default']
+
+
+def seed(name):
+    use_database('default', name)
+    call_command('migrate', verbosity=0)
+    User.objects.bulk_create([User(username=f'bench{i}', email=f'bench{i}@company.com') for i in range(EMPLOYEES)])
+    Employee.objects.bulk_create([
+        Employee(user=user, position='Engineer', hire_date=date(2020, 1, 1), salary=5000)
+        for user in User.objects.filter(username__startswith='bench')
+    ])
+    Attendance.objects.bulk_create([
+        Attendance(employee=employee, date=date(2026, 1, 1) + timedelta(days=day))
+        for employee in Employee.objects.all() for day in range(DAYS)
+    ])
+    connection.close()
+
+
+def worker(mode, name, seconds, write_share, seed_value):
+    use_database(mode, name)
+    rng = random.Random(seed_value)
+    employee_ids = list(Employee.objects.values_list('pk', flat=True))
+    close_old_connections()
+    reads = writes = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_share:
+                with transaction.atomic():
+                    record = Attendance.objects.get(employee_id=rng.choice(employee_ids), date=date(2026, 1, 1))
+                    record.notes = f'checked {started}'
+                    record.save()
+                writes += 1
+            else:
+                list(Attendance.objects.select_related('employee__user').filter(employee_id=rng.choice(employee_ids))[:20])
+                reads += 1
+        except OperationalError:
+            errors += 1
+        finally:
+            # What Django does at the end of every request
+            close_old_connections()
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return reads, writes, errors, latencies
+
+
+def run(mode, source, workers, seconds, write_share):
+    directory = tempfile.mkdtemp()
+    try:
+        name = os.path.join(directory, 'bench.sqlite3')
+        shutil.copy(source, name)
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers) as pool:
+            results = pool.starmap(worker, [(mode, name, seconds, write_share, i) for i in range(workers)])
+    finally:
+        shutil.rmtree(directory)
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    errors = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    return reads / seconds, writes / seconds, errors, statistics.median(latencies) * 1000, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-share', type=float, default=0.2)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, 'seed.sqlite3')
+        seed(source)
+        print(f'{EMPLOYEES * DAYS} attendance rows, {args.write_share:.0%} writes, {args.seconds:g}s per run, '
+              f'cpus: {os.cpu_count()}')
+        print(f"{'config':>8}{'workers':>9}{'reads/s':>10}{'writes/s':>10}{'locked':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        for workers in args.workers:
+            for mode in ('default', 'tuned'):
+                reads, writes, errors, p50, p95 = run(mode, source, workers, args.seconds, args.write_share)
+                print(f'{mode:>8}{workers:>9}{reads:>10.0f}{writes:>10.0f}{errors:>8}{p50:>9.2f}{p95:>9.2f}')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,8 @@ def run_migrations():
     print("🔄 Running database migrations...")
     try:
         execute_from_command_line(['manage.py', 'migrate', '--verbosity=1'])
+        # Archived attendance/payroll history (see hr_app.archive)
+        execute_from_command_line(['manage.py', 'migrate', '--database=archive', '--verbosity=1'])
         print("✅ Migrations completed successfully!")
     except Exception as e:
         print(f"❌ Migration failed: {e}")